@@ -14,19 +14,94 @@ Beispiele:
     python label_mapper.py labels_bcc_mounting.json --backup --output labeled_tree.json
 """
 
+import io
 import json
+import logging
+import os
 import sys
+import time
 import argparse
+import traceback
 from pathlib import Path
 from datetime import datetime
 import shutil
 import re
 import glob
-from schema_search import find_products_by_schema, parse_multiple_schemas, parse_pattern_filter, parse_position_filter, parse_group_start_filter, parse_group_filter, parse_group_position_filter
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+# orjson (optional): deutlich schnelleres Laden/Speichern großer Bäume, sonst Standard-json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# fcntl (nur Unix): Backups per Reflink (FICLONE) statt Byte-Kopie
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# ijson (optional): Mapping-Dateien beim Verzeichnis-Scan nur anlesen statt komplett zu parsen
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+from schema_search import build_product_index, find_products_by_schema, load_json_file, parse_multiple_schemas, parse_pattern_filter, parse_position_filter, parse_group_start_filter, parse_group_filter, parse_group_position_filter
+
+logger = logging.getLogger(__name__)
+
+
+class _RecordAccess:
+    """Dict-kompatibler Zugriff (record['feld'], record.get('feld')) für die Statistik-Records."""
+    __slots__ = ()
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            # Nur Felder, nicht die Tupel-Methoden (count, index) zurückgeben
+            if key in self._fields:
+                return getattr(self, key)
+            raise KeyError(key)
+        return tuple.__getitem__(self, key)
+    
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+
+# Schlanke Records für stats['nodes_labeled'] in apply_labels_to_tree (statt eines Dicts pro Knoten)
+class NodeLabel(_RecordAccess, namedtuple('NodeLabel', 'node_path family position code node_code old_label old_label_en new_label new_label_en full_typecode full_code match_type applied type')):
+    __slots__ = ()
+
+
+class NodeGroup(_RecordAccess, namedtuple('NodeGroup', 'node_path family position code old_group new_group full_typecode applied type')):
+    __slots__ = ()
+
+
+# Records für apply_general_mappings bzw. apply_global_group_mappings
+class NodeGeneral(_RecordAccess, namedtuple('NodeGeneral', 'node_path family position code old_label new_label pictures links full_typecode applied type')):
+    __slots__ = ()
+
+
+class NodeGlobalGroup(_RecordAccess, namedtuple('NodeGlobalGroup', 'node_path family full_typecode old_group new_group description applied')):
+    __slots__ = ()
 
 # Wo das Label-Mapping angewendet wird
 JSONFILE = "./baum.json"
 
+# Obergrenze (Summe der Dateigrößen) bis zu der beim Verzeichnis-Scan geparste Mappings im RAM bleiben
+MAPPING_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Zeichenklassen für 'allowed' in special_mappings (einmalig kompiliert)
+_ALLOWED_CHAR_PATTERNS = {
+    "0-9": re.compile(r'^[0-9]+$'),
+    "A-Z": re.compile(r'^[A-Za-z]+$'),
+    "0-Z": re.compile(r'^[A-Za-z0-9]+$'),
+}
+
+
 def parse_label(label_data):
     """
     Parst ein Label aus String oder erweitertem Objekt-Format.
@@ -70,12 +145,13 @@ def label_to_string(label_obj):
 # JSONFILE = "output/variantenbaum.json"
 # JSONFILE = "output/variantenbaum_with_dates.json"
 
-def load_mapping_file(mapping_file):
+def load_mapping_file(mapping_file, data=None):
     """
     Lädt eine Label-Mapping-Datei.
     
     Args:
         mapping_file: Pfad zur JSON-Datei mit filter_criteria und code_mappings
+        data: Optional bereits geparster Inhalt (z.B. aus find_mapping_files), spart erneutes Laden
         
     Returns:
         dict: Geladene Daten oder None bei Fehlern
@@ -114,8 +190,8 @@ def load_mapping_file(mapping_file):
     }
     """
     try:
-        with open(mapping_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if data is None:
+            data = load_tree_json(mapping_file)
         
         # Validiere Struktur
         if 'filter_criteria' not in data:
@@ -233,7 +309,7 @@ def build_group_lookup(group_mappings):
         group_mappings: Liste von Group-Mapping-Objekten
         
     Returns:
-        dict: {position: {code: group}} Struktur
+        dict: {(position, code): group} Struktur
     """
     lookup = {}
     
@@ -249,11 +325,8 @@ def build_group_lookup(group_mappings):
             print(f"⚠️  Warnung: Codes und Groups haben unterschiedliche Längen bei Position {position}")
             continue
         
-        if position not in lookup:
-            lookup[position] = {}
-        
         for code, group in zip(codes, groups):
-            lookup[position][code] = group
+            lookup[(position, code)] = group
     
     return lookup
 
@@ -266,7 +339,7 @@ def build_code_lookup(code_mappings):
         code_mappings: Liste von Code-Mapping-Objekten
         
     Returns:
-        dict: {position: {code: label}} Struktur
+        dict: {(position, code): label} Struktur
     """
     lookup = {}
     
@@ -301,12 +374,9 @@ def build_code_lookup(code_mappings):
         
         # Wende die Codes/Labels auf alle angegebenen Positionen an
         for position in positions:
-            if position not in lookup:
-                lookup[position] = {}
-            
             for i, (code, label) in enumerate(zip(codes, labels)):
                 label_en = labels_en[i] if has_english and i < len(labels_en) else ''
-                lookup[position][code] = {
+                lookup[(position, code)] = {
                     'label': label,
                     'label-en': label_en
                 }
@@ -314,6 +384,22 @@ def build_code_lookup(code_mappings):
     return lookup
 
 
+def count_codes_per_position(lookup):
+    """
+    Zählt die Codes je Position in einer flachen (Position, Code)-Lookup-Tabelle.
+    
+    Args:
+        lookup: {(position, code): wert} Struktur aus build_code_lookup/build_group_lookup
+        
+    Returns:
+        dict: {position: anzahl} in Reihenfolge des ersten Auftretens
+    """
+    counts = {}
+    for position, _ in lookup:
+        counts[position] = counts.get(position, 0) + 1
+    return counts
+
+
 def extract_code_at_position(full_typecode, code_parts, position):
     """
     Extrahiert den Code an einer bestimmten Position.
@@ -509,14 +595,7 @@ def apply_special_mappings(
     def _allowed_to_regex(allowed):
         if not allowed:
             return None
-        a = allowed.strip().upper()
-        if a == "0-9":
-            return re.compile(r'^[0-9]+$')
-        if a == "A-Z":
-            return re.compile(r'^[A-Za-z]+$')
-        if a == "0-Z":
-            return re.compile(r'^[A-Za-z0-9]+$')
-        return None
+        return _ALLOWED_CHAR_PATTERNS.get(allowed.strip().upper())
 
     for mapping in special_mappings:
         group_num = mapping.get('group')
@@ -832,7 +911,7 @@ def apply_relative_group_mappings(tree_data, matching_products, relative_group_m
             applied = False
 
         # Statistik-Update
-        stats['codes_matched'].add(f"{group_num}:{position}:{code}")
+        stats['codes_matched'].add((group_num, position, code))
         stats['nodes_labeled'].append({
             'node_path': node_path,
             'family': target_family,
@@ -1340,7 +1419,42 @@ def find_nodes_by_group_position(
 #     return found_nodes
 
 
-def apply_name_mappings(tree_data, matching_products, name_mappings, target_family, dry_run=False):
+def build_matching_product_codes(matching_products):
+    """
+    Erstellt die Menge der Typcodes aller gefilterten Produkte.
+    
+    Wird in main() einmal pro Mapping berechnet und an die apply_*-Funktionen
+    weitergereicht, statt dass jede Funktion die Produktliste erneut durchläuft.
+    
+    Args:
+        matching_products: Liste der gefundenen Produkte (Dicts mit 'full_typecode' oder Strings)
+        
+    Returns:
+        frozenset: Typcode-Strings der gefilterten Produkte
+    """
+    return frozenset(
+        product['full_typecode'] if isinstance(product, dict) else product
+        for product in matching_products
+        if (isinstance(product, dict) and 'full_typecode' in product) or isinstance(product, str)
+    )
+
+
+def _code_path(path_ref):
+    """
+    Baut den Knoten-Pfad ('FAM/CODE/...') aus einer verketteten (parent_ref, code)-Referenz.
+    Leere Präfixe werden wie bei der schrittweisen Pfadbildung übersprungen.
+    """
+    codes = []
+    while path_ref is not None:
+        path_ref, code = path_ref
+        codes.append(code)
+    path = ""
+    for code in reversed(codes):
+        path = f"{path}/{code}" if path else code
+    return path
+
+
+def apply_name_mappings(tree_data, matching_products, name_mappings, target_family, dry_run=False, matching_product_codes=None, descendant_match_index=None):
     """
     Wendet Name-Mappings auf Knoten basierend auf ihrer Ebene im Baum an.
     KORRIGIERT: Respektiert jetzt die Filter und wendet Namen nur auf gefilterte Produktbäume an.
@@ -1351,6 +1465,8 @@ def apply_name_mappings(tree_data, matching_products, name_mappings, target_fami
         name_mappings: Liste von Name-Mapping-Objekten
         target_family: Ziel-Produktfamilie (z.B. "BCC")
         dry_run: Wenn True, werden keine Änderungen gemacht
+        matching_product_codes: Optional vorberechnete Typcode-Menge (siehe build_matching_product_codes)
+        descendant_match_index: Optional vorberechneter Index (siehe build_descendant_match_index)
         
     Returns:
         dict: Statistiken über angewendete Namen
@@ -1366,12 +1482,12 @@ def apply_name_mappings(tree_data, matching_products, name_mappings, target_fami
         return stats
 
     # Erstelle Set der passenden Produkt-Codes für Filterung
-    matching_product_codes = set()
-    for product in matching_products:
-        if isinstance(product, dict) and 'full_typecode' in product:
-            matching_product_codes.add(product['full_typecode'])
-        elif isinstance(product, str):
-            matching_product_codes.add(product)
+    if matching_product_codes is None:
+        matching_product_codes = build_matching_product_codes(matching_products)
+    # Einmalig vorberechnen, welche Knoten gefilterte Nachkommen haben (oder vom Aufrufer übernehmen)
+    has_match = descendant_match_index
+    if has_match is None:
+        has_match = build_descendant_match_index(tree_data, matching_product_codes)
 
     # Für jedes Name-Mapping, finde alle Knoten auf dieser Ebene
     for mapping in name_mappings:
@@ -1384,7 +1500,17 @@ def apply_name_mappings(tree_data, matching_products, name_mappings, target_fami
         stats['levels_processed'].add(level)
         
         # Finde alle Knoten der Familie auf dieser Ebene, die zu gefilterten Produkten gehören
-        def find_and_name_nodes(node, current_family=None, path="", current_level=0, depth=0):
+        def find_and_name_nodes(root):
+            # Iterative Tiefensuche mit explizitem Stack statt Rekursion
+            # Stack-Einträge: (node, current_family, path_ref, current_level, depth)
+            nodes_named = 0
+            stack = deque([(root, None, None, 0, 0)])
+            while stack:
+                node, current_family, path_ref, current_level, depth = stack.pop()
+                nodes_named += _name_node(node, current_family, path_ref, current_level, depth, stack)
+            return nodes_named
+        
+        def _name_node(node, current_family, path_ref, current_level, depth, stack):
             nodes_named = 0
             
             # Update Familie und Level wenn neuer Familien-Knoten gefunden
@@ -1414,7 +1540,7 @@ def apply_name_mappings(tree_data, matching_products, name_mappings, target_fami
                 if 'full_typecode' in node and node['full_typecode'] in matching_product_codes:
                     should_apply_name = True
                 # Wenn nicht, prüfe ob er Nachkommen hat, die zu gefilterten Produkten gehören
-                elif has_matching_descendants(node, matching_product_codes):
+                elif has_match[id(node)]:
                     should_apply_name = True
                 
                 if should_apply_name:
@@ -1439,7 +1565,7 @@ def apply_name_mappings(tree_data, matching_products, name_mappings, target_fami
                     
                     # Statistik
                     stats['nodes_named'].append({
-                        'node_path': path,
+                        'node_path': _code_path(path_ref),
                         'level': level,
                         'family': target_family,
                         'old_name': node.get('name', ''),
@@ -1450,28 +1576,20 @@ def apply_name_mappings(tree_data, matching_products, name_mappings, target_fami
                     
                     nodes_named += 1
             
-            # Rekursiv durch Children
+            # Teilbäume fremder Familien können nie matchen (Familie ändert sich darunter nicht mehr)
+            if depth >= 1 and current_family is not None and current_family != target_family:
+                return nodes_named
+            
+            # Children auf den Stack legen (umgekehrt, damit die Reihenfolge der Rekursion erhalten bleibt)
+            # Der Pfad wird nur als (parent_ref, code)-Kette weitergereicht und erst bei einem Treffer formatiert
             if 'children' in node:
-                for child in node['children']:
-                    child_path = f"{path}/{child.get('code', '')}" if path else child.get('code', '')
-                    nodes_named += find_and_name_nodes(child, current_family, child_path, current_level, depth + 1)
+                for child in reversed(node['children']):
+                    stack.append((child, current_family, (path_ref, child.get('code', '')), current_level, depth + 1))
                     
             return nodes_named
         
-        def has_matching_descendants(node, matching_codes):
-            """Prüft ob ein Knoten Nachkommen hat, die zu den gefilterten Produkten gehören"""
-            if 'full_typecode' in node and node['full_typecode'] in matching_codes:
-                return True
-            
-            if 'children' in node:
-                for child in node['children']:
-                    if has_matching_descendants(child, matching_codes):
-                        return True
-            
-            return False
-        
         # Finde und benenne alle passenden Knoten
-        find_and_name_nodes(tree_data, depth=0)
+        find_and_name_nodes(tree_data)
     
     return stats
 
@@ -1483,8 +1601,8 @@ def apply_labels_to_tree(tree_data, matching_products, code_lookup, group_lookup
     Args:
         tree_data: JSON-Baum-Daten (werden modifiziert)
         matching_products: Liste der gefundenen Produkte
-        code_lookup: Code → Label Lookup-Tabelle
-        group_lookup: Code → Group Lookup-Tabelle
+        code_lookup: (Position, Code) → Label Lookup-Tabelle
+        group_lookup: (Position, Code) → Group Lookup-Tabelle
         target_family: Ziel-Produktfamilie (z.B. "A", "B", "BCC")
         dry_run: Wenn True, werden keine Änderungen gemacht
         
@@ -1498,199 +1616,212 @@ def apply_labels_to_tree(tree_data, matching_products, code_lookup, group_lookup
         'groups_applied': 0,
         'groups_updated': 0,
         'positions_processed': set(),
-        'codes_matched': set(),
+        'codes_matched': set(),  # (position, code)-Tupel
         'products_with_labels': [],
         'nodes_labeled': []
     }
     
-    # Für jede Position und jeden Code in den Mappings,
+    # Verarbeitete Positionen einmalig aus den Schlüsseln bestimmen
+    stats['positions_processed'].update(position for position, _ in code_lookup)
+    stats['positions_processed'].update(position for position, _ in group_lookup)
+    
+    # Für jede (Position, Code)-Kombination in den Mappings,
     # finde alle entsprechenden Knoten im Baum der angegebenen Familie
-    for position, code_map in code_lookup.items():
-        stats['positions_processed'].add(position)
+    for (position, code), label_data in code_lookup.items():
+        # Finde alle Knoten mit dieser Position und diesem Code in der Ziel-Familie
+        target_nodes = find_node_at_position(tree_data, target_family, position, code)
         
-        for code, label_data in code_map.items():
-            # Finde alle Knoten mit dieser Position und diesem Code in der Ziel-Familie
-            target_nodes = find_node_at_position(tree_data, target_family, position, code)
+        for node_info in target_nodes:
+            node = node_info['node']
+            node_path = node_info['path']
             
-            for node_info in target_nodes:
-                node = node_info['node']
-                node_path = node_info['path']
-                
-                # Extract labels basierend auf neuer Datenstruktur
-                if isinstance(label_data, dict):
-                    # Neue Struktur mit separaten deutsch/englisch Labels
-                    label_de = label_data.get('label', '')
-                    label_en = label_data.get('label-en', '')
-                else:
-                    # Rückwärts-Kompatibilität: alte Struktur nur mit deutschen Labels
-                    label_de = label_data
-                    label_en = ''
+            # Extract labels basierend auf neuer Datenstruktur
+            if isinstance(label_data, dict):
+                # Neue Struktur mit separaten deutsch/englisch Labels
+                label_de = label_data.get('label', '')
+                label_en = label_data.get('label-en', '')
+            else:
+                # Rückwärts-Kompatibilität: alte Struktur nur mit deutschen Labels
+                label_de = label_data
+                label_en = ''
+            
+            # Anwenden der Labels (falls nicht dry-run)
+            if not dry_run:
+                # Verwende vorhandene label/label-en Felder
+                old_label = node.get('label', '')
+                old_label_en = node.get('label-en', '')
                 
-                # Anwenden der Labels (falls nicht dry-run)
-                if not dry_run:
-                    # Verwende vorhandene label/label-en Felder
-                    old_label = node.get('label', '')
-                    old_label_en = node.get('label-en', '')
-                    
-                    # Setze deutsche Labels (anhängen falls vorhanden)
-                    if label_de:
-                        if old_label and old_label.strip():
-                            # print("sidvsdvubsdiuvsidvbsdbvshdbvshdbvsjvbhsdhvbsdhvbjshdvbhsdvjhfvb")
-                            # Anhängen mit doppeltem Line Feed
-                            node['label'] = old_label + '\n\n' + label_de
-                            stats['labels_updated'] += 1
-                        else:
-                            # print("sidvsdvubsdiuvsidvbsdbvshdbvshdbvsjvbhsdhvbsdhvbjshdvbhsdvjhfvb")
-                            # Neues Label setzen
-                            node['label'] = label_de
-                            stats['labels_applied'] += 1
-                    
-                    # Setze englische Labels (anhängen falls vorhanden)
-                    if label_en:
-                        if old_label_en and old_label_en.strip():
-                            # Anhängen mit doppeltem Line Feed  
-                            node['label-en'] = old_label_en + '\n\n' + label_en
-                            stats['labels_updated'] += 1
-                        else:
-                            # Neues Label setzen
-                            node['label-en'] = label_en
-                            stats['labels_applied'] += 1
-                else:
-                    # Dry-Run: Statistik trotzdem berechnen
-                    old_label = node.get('label', '')
-                    old_label_en = node.get('label-en', '')
-                    
-                    if label_de:
-                        if old_label and old_label.strip():
-                            stats['labels_updated'] += 1
-                        else:
-                            stats['labels_applied'] += 1
-                    
-                    if label_en:
-                        if old_label_en and old_label_en.strip():
-                            stats['labels_updated'] += 1
-                        else:
-                            stats['labels_applied'] += 1
+                # Setze deutsche Labels (anhängen falls vorhanden)
+                if label_de:
+                    if old_label and old_label.strip():
+                        # Anhängen mit doppeltem Line Feed
+                        node['label'] = old_label + '\n\n' + label_de
+                        stats['labels_updated'] += 1
+                    else:
+                        # Neues Label setzen
+                        node['label'] = label_de
+                        stats['labels_applied'] += 1
                 
-                # Statistik
-                stats['codes_matched'].add(f"{position}:{code}")
+                # Setze englische Labels (anhängen falls vorhanden)
+                if label_en:
+                    if old_label_en and old_label_en.strip():
+                        # Anhängen mit doppeltem Line Feed  
+                        node['label-en'] = old_label_en + '\n\n' + label_en
+                        stats['labels_updated'] += 1
+                    else:
+                        # Neues Label setzen
+                        node['label-en'] = label_en
+                        stats['labels_applied'] += 1
+            else:
+                # Dry-Run: Statistik trotzdem berechnen
+                old_label = node.get('label', '')
+                old_label_en = node.get('label-en', '')
                 
-                # Bestimme Match-Typ
-                match_type = node_info.get('match_type', 'unknown')
-                full_code = node_info.get('full_code', node.get('code', ''))
+                if label_de:
+                    if old_label and old_label.strip():
+                        stats['labels_updated'] += 1
+                    else:
+                        stats['labels_applied'] += 1
                 
-                stats['nodes_labeled'].append({
-                    'node_path': node_path,
-                    'family': target_family,
-                    'position': position,
-                    'code': code,
-                    'node_code': node.get('code', ''),  # Der tatsächliche Node-Code
-                    'old_label': node.get('label', ''),
-                    'old_label_en': node.get('label-en', ''),
-                    'new_label': label_de,
-                    'new_label_en': label_en,
-                    'full_typecode': node.get('full_typecode', ''),
-                    'full_code': full_code,
-                    'match_type': match_type,
-                    'applied': not dry_run,
-                    'type': 'label'
-                })
-    
-    # Für jede Position und jeden Code in den Group-Mappings
-    for position, code_map in group_lookup.items():
-        stats['positions_processed'].add(position)
-        
-        for code, group in code_map.items():
-            # Finde alle Knoten mit dieser Position und diesem Code in der Ziel-Familie
-            target_nodes = find_node_at_position(tree_data, target_family, position, code)
+                if label_en:
+                    if old_label_en and old_label_en.strip():
+                        stats['labels_updated'] += 1
+                    else:
+                        stats['labels_applied'] += 1
             
-            for node_info in target_nodes:
-                node = node_info['node']
-                node_path = node_info['path']
+            # Statistik
+            stats['codes_matched'].add((position, code))
+            
+            # Bestimme Match-Typ
+            match_type = node_info.get('match_type', 'unknown')
+            full_code = node_info.get('full_code', node.get('code', ''))
+            
+            stats['nodes_labeled'].append(NodeLabel(
+                node_path=node_path,
+                family=target_family,
+                position=position,
+                code=code,
+                node_code=node.get('code', ''),  # Der tatsächliche Node-Code
+                old_label=node.get('label', ''),
+                old_label_en=node.get('label-en', ''),
+                new_label=label_de,
+                new_label_en=label_en,
+                full_typecode=node.get('full_typecode', ''),
+                full_code=full_code,
+                match_type=match_type,
+                applied=not dry_run,
+                type='label'
+            ))
+
+    # Für jede (Position, Code)-Kombination in den Group-Mappings
+    for (position, code), group in group_lookup.items():
+        # Finde alle Knoten mit dieser Position und diesem Code in der Ziel-Familie
+        target_nodes = find_node_at_position(tree_data, target_family, position, code)
+        
+        for node_info in target_nodes:
+            node = node_info['node']
+            node_path = node_info['path']
+            
+            # Anwenden der Group (falls nicht dry-run)
+            if not dry_run:
+                # Verwende vorhandenes group Feld
+                old_group = node.get('group', '')
                 
-                # Anwenden der Group (falls nicht dry-run)
-                if not dry_run:
-                    # Verwende vorhandenes group Feld
-                    old_group = node.get('group', '')
-                    
-                    # Setze die Group
-                    node['group'] = group
-                    
-                    if old_group != group:
-                        if old_group:
-                            stats['groups_updated'] += 1
-                        else:
-                            stats['groups_applied'] += 1
+                # Setze die Group
+                node['group'] = group
                 
-                # Statistik
-                stats['codes_matched'].add(f"{position}:{code}")
-                stats['nodes_labeled'].append({
-                    'node_path': node_path,
-                    'family': target_family,
-                    'position': position,
-                    'code': code,
-                    'old_group': node.get('group', ''),
-                    'new_group': group,
-                    'full_typecode': node.get('full_typecode', ''),
-                    'applied': not dry_run,
-                    'type': 'group'
-                })
-    
+                if old_group != group:
+                    if old_group:
+                        stats['groups_updated'] += 1
+                    else:
+                        stats['groups_applied'] += 1
+            
+            # Statistik
+            stats['codes_matched'].add((position, code))
+            stats['nodes_labeled'].append(NodeGroup(
+                node_path=node_path,
+                family=target_family,
+                position=position,
+                code=code,
+                old_group=node.get('group', ''),
+                new_group=group,
+                full_typecode=node.get('full_typecode', ''),
+                applied=not dry_run,
+                type='group'
+            ))
+
     # Erstelle Produkt-Liste für Anzeige basierend auf gefundenen Labels
     stats['products_processed'] = len(matching_products)
+    
+    # Index: full_typecode -> [(Reihenfolge, node_info), ...]
+    # Ein Knoten betrifft ein Produkt, wenn sein Typcode ein Präfix des Produkt-Typcodes ist.
+    # Statt jedes Produkt gegen alle Knoten zu prüfen, werden nur die Präfixe nachgeschlagen.
+    typecode_idx = {}
+    for idx, node_info in enumerate(stats['nodes_labeled']):
+        typecode_idx.setdefault(node_info.full_typecode, []).append((idx, node_info))
+    
     for product in matching_products:
         labels_for_product = {}
         full_typecode = product['full_typecode']
         
-        # Prüfe ob das Produkt Labels erhält
-        for node_info in stats['nodes_labeled']:
-            if node_info['full_typecode'] == full_typecode or full_typecode.startswith(node_info['full_typecode']):
-                position = node_info['position'] 
-                key = f'position_{position}_{node_info["type"]}'
-                
-                # Extrahiere den tatsächlichen Code des Produkts an dieser Position
-                product_code_at_position = "?"
-                try:
-                    # Verwende den vollständigen Typecode OHNE Familie-Entfernung
-                    if position <= len(full_typecode):
-                        product_code_at_position = full_typecode[position-1]  # 1-basierte Position
-                except:
-                    product_code_at_position = node_info.get('node_code', node_info['code'])
-                
-                # Nur hinzufügen wenn der Mapping-Code mit dem Produktcode übereinstimmt
-                # oder wenn es ein Substring-Match ist (für multi-character codes)
-                mapping_code = node_info['code']
-                if (len(mapping_code) == 1 and product_code_at_position == mapping_code) or \
-                   (len(mapping_code) > 1 and product_code_at_position.startswith(mapping_code)):
-                
-                    if node_info['type'] == 'label':
-                        labels_for_product[key] = {
-                            'code': product_code_at_position,
-                            'mapping_code': mapping_code,
-                            'label': node_info['new_label'],
-                            'position': position,
-                            'type': 'label'
-                        }
-                    elif node_info['type'] == 'group':
-                        labels_for_product[key] = {
-                            'code': product_code_at_position,
-                            'mapping_code': mapping_code,
-                            'group': node_info['new_group'],
-                            'position': position,
-                            'type': 'group'
-                        }
+        candidates = []
+        for i in range(len(full_typecode) + 1):
+            entries = typecode_idx.get(full_typecode[:i])
+            if entries:
+                candidates.extend(entries)
+        # Ursprüngliche Reihenfolge beibehalten (spätere Knoten überschreiben frühere)
+        candidates.sort(key=lambda entry: entry[0])
         
+        # Prüfe ob das Produkt Labels erhält
+        for _, node_info in candidates:
+            position = node_info.position 
+            key = f'position_{position}_{node_info.type}'
+            
+            # Extrahiere den tatsächlichen Code des Produkts an dieser Position
+            product_code_at_position = "?"
+            try:
+                # Verwende den vollständigen Typecode OHNE Familie-Entfernung
+                if position <= len(full_typecode):
+                    product_code_at_position = full_typecode[position-1]  # 1-basierte Position
+            except:
+                product_code_at_position = node_info.get('node_code', node_info.code)
+            
+            # Nur hinzufügen wenn der Mapping-Code mit dem Produktcode übereinstimmt
+            # oder wenn es ein Substring-Match ist (für multi-character codes)
+            mapping_code = node_info.code
+            if (len(mapping_code) == 1 and product_code_at_position == mapping_code) or \
+               (len(mapping_code) > 1 and product_code_at_position.startswith(mapping_code)):
+            
+                if node_info.type == 'label':
+                    labels_for_product[key] = {
+                        'code': product_code_at_position,
+                        'mapping_code': mapping_code,
+                        'label': node_info.new_label,
+                        'position': position,
+                        'type': 'label'
+                    }
+                elif node_info.type == 'group':
+                    labels_for_product[key] = {
+                        'code': product_code_at_position,
+                        'mapping_code': mapping_code,
+                        'group': node_info.new_group,
+                        'position': position,
+                        'type': 'group'
+                    }
+    
         if labels_for_product:
             stats['products_with_labels'].append({
                 'full_typecode': full_typecode,
                 'code_path': product['code_path'],
                 'labels': labels_for_product
             })
-    print( f"Angewendete Labels auf {stats['products_processed']} Produkte in Familie '{target_family}'." )
-    # Die genauen Produkte:
-    print( f"Produkte mit angewendeten Labels: {[p['full_typecode'] for p in stats['products_with_labels']]}" )
-    # Die genauen Knoten:
-    print( f"Knoten mit angewendeten Labels/Groups: {[n['node_path'] for n in stats['nodes_labeled']]}" )
+    # Detaillisten nur im Debug-Logging aufbauen (bei großen Bäumen sonst reiner Overhead)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Angewendete Labels auf %d Produkte in Familie '%s'.", stats['products_processed'], target_family)
+        # Die genauen Produkte:
+        logger.debug("Produkte mit angewendeten Labels: %s", [p['full_typecode'] for p in stats['products_with_labels']])
+        # Die genauen Knoten:
+        logger.debug("Knoten mit angewendeten Labels/Groups: %s", [n.node_path for n in stats['nodes_labeled']])
     
     return stats
 
@@ -1702,26 +1833,30 @@ def print_mapping_summary(mapping_data):
     group_mappings = mapping_data.get('group_mappings', [])
     metadata = mapping_data.get('metadata', {})
     
-    print("=== LABEL-MAPPING KONFIGURATION ===")
+    # Ausgabe sammeln und am Ende in einem Rutsch schreiben
+    buf = io.StringIO()
+    p = buf.write
+    
+    p("=== LABEL-MAPPING KONFIGURATION ===\n")
     
     # Metadata
     if metadata:
         if 'description' in metadata:
-            print(f"Beschreibung: {metadata['description']}")
+            p(f"Beschreibung: {metadata['description']}\n")
         if 'version' in metadata:
-            print(f"Version: {metadata['version']}")
+            p(f"Version: {metadata['version']}\n")
         if 'created' in metadata:
-            print(f"Erstellt: {metadata['created']}")
-        print()
+            p(f"Erstellt: {metadata['created']}\n")
+        p("\n")
     
     # Filter-Kriterien
-    print("FILTER-KRITERIEN:")
+    p("FILTER-KRITERIEN:\n")
     for key, value in filter_criteria.items():
-        print(f"  {key}: {value}")
-    print()
+        p(f"  {key}: {value}\n")
+    p("\n")
     
     # Code-Mappings
-    print("CODE-MAPPINGS:")
+    p("CODE-MAPPINGS:\n")
     for i, mapping in enumerate(code_mappings, 1):
         position = mapping.get('position', '?')
         codes = mapping.get('codes', [])
@@ -1730,11 +1865,11 @@ def print_mapping_summary(mapping_data):
         
         has_english = len(labels_en) > 0 and any(label.strip() for label in labels_en)
         
-        print(f"  {i}. Position {position}:")
-        print(f"     Codes: {len(codes)} ({', '.join(codes[:3])}{'...' if len(codes) > 3 else ''})")
-        print(f"     Labels (DE): {len(labels)} Einträge")
+        p(f"  {i}. Position {position}:\n")
+        p(f"     Codes: {len(codes)} ({', '.join(codes[:3])}{'...' if len(codes) > 3 else ''})\n")
+        p(f"     Labels (DE): {len(labels)} Einträge\n")
         if has_english:
-            print(f"     Labels (EN): {len(labels_en)} Einträge")
+            p(f"     Labels (EN): {len(labels_en)} Einträge\n")
         
         if labels and len(labels) > 0:
             # Zeige ersten deutschen Label gekürzt
@@ -1744,9 +1879,9 @@ def print_mapping_summary(mapping_data):
             first_label_text = label_to_string(first_label_obj)
             first_label = first_label_text[:100] + "..." if len(first_label_text) > 100 else first_label_text
             first_label_lines = first_label.split('\n')[:2]
-            print(f"     Beispiel (DE): {first_label_lines[0]}")
+            p(f"     Beispiel (DE): {first_label_lines[0]}\n")
             if len(first_label_lines) > 1:
-                print(f"                    {first_label_lines[1]}")
+                p(f"                    {first_label_lines[1]}\n")
         
         if has_english and labels_en and len(labels_en) > 0:
             # Zeige ersten englischen Label gekürzt
@@ -1756,10 +1891,10 @@ def print_mapping_summary(mapping_data):
             first_label_en_text = label_to_string(first_label_en_obj)
             first_label_en = first_label_en_text[:100] + "..." if len(first_label_en_text) > 100 else first_label_en_text
             first_label_en_lines = first_label_en.split('\n')[:2]
-            print(f"     Beispiel (EN): {first_label_en_lines[0]}")
+            p(f"     Beispiel (EN): {first_label_en_lines[0]}\n")
             if len(first_label_en_lines) > 1:
-                print(f"                    {first_label_en_lines[1]}")
-        print()
+                p(f"                    {first_label_en_lines[1]}\n")
+        p("\n")
     
     # Group-Mappings (unterscheide neue und alte)
     if group_mappings:
@@ -1767,7 +1902,7 @@ def print_mapping_summary(mapping_data):
         absolute_mappings = [m for m in group_mappings if 'position' in m and 'groups' in m]
         
         if relative_mappings:
-            print("RELATIVE GROUP-MAPPINGS (fuer Labels):")
+            p("RELATIVE GROUP-MAPPINGS (fuer Labels):\n")
             for i, mapping in enumerate(relative_mappings, 1):
                 group = mapping.get('group', '?')
                 position = mapping.get('position', '?')
@@ -1776,9 +1911,9 @@ def print_mapping_summary(mapping_data):
                 labels = mapping.get('labels', [])
                 
                 pos_str = f"{position}" if not end_position or end_position == position else f"{position}-{end_position}"
-                print(f"  {i}. Gruppe {group}, Position {pos_str}:")
-                print(f"     Codes: {len(codes)} ({', '.join(codes[:3])}{'...' if len(codes) > 3 else ''})")
-                print(f"     Labels: {len(labels)} Einträge")
+                p(f"  {i}. Gruppe {group}, Position {pos_str}:\n")
+                p(f"     Codes: {len(codes)} ({', '.join(codes[:3])}{'...' if len(codes) > 3 else ''})\n")
+                p(f"     Labels: {len(labels)} Einträge\n")
                 if labels and len(labels) > 0:
                     # Zeige ersten Label gekürzt
                     first_label_raw = labels[0]
@@ -1787,136 +1922,143 @@ def print_mapping_summary(mapping_data):
                     first_label_text = label_to_string(first_label_obj)
                     first_label = first_label_text[:100] + "..." if len(first_label_text) > 100 else first_label_text
                     first_label_lines = first_label.split('\n')[:2]
-                    print(f"     Beispiel: {first_label_lines[0]}")
+                    p(f"     Beispiel: {first_label_lines[0]}\n")
                     if len(first_label_lines) > 1:
-                        print(f"               {first_label_lines[1]}")
-                print()
+                        p(f"               {first_label_lines[1]}\n")
+                p("\n")
         
         if absolute_mappings:
-            print("ABSOLUTE GROUP-MAPPINGS (deprecated, fuer group-Attribut):")
+            p("ABSOLUTE GROUP-MAPPINGS (deprecated, fuer group-Attribut):\n")
             for i, mapping in enumerate(absolute_mappings, 1):
                 position = mapping.get('position', '?')
                 codes = mapping.get('codes', [])
                 groups = mapping.get('groups', [])
                 
-                print(f"  {i}. Position {position}:")
-                print(f"     Codes: {len(codes)} ({', '.join(codes[:3])}{'...' if len(codes) > 3 else ''})")
-                print(f"     Groups: {len(groups)} Einträge")
+                p(f"  {i}. Position {position}:\n")
+                p(f"     Codes: {len(codes)} ({', '.join(codes[:3])}{'...' if len(codes) > 3 else ''})\n")
+                p(f"     Groups: {len(groups)} Einträge\n")
                 if groups and len(groups) > 0:
                     # Zeige ersten Group gekürzt
                     first_group = groups[0][:50] + "..." if len(groups[0]) > 50 else groups[0]
-                    print(f"     Beispiel: {first_group}")
-                print()
+                    p(f"     Beispiel: {first_group}\n")
+                p("\n")
     
     # Global Group-Mappings
     global_group_mappings = mapping_data.get('global_group_mappings', [])
     if global_group_mappings:
-        print("GLOBAL GROUP-MAPPINGS:")
+        p("GLOBAL GROUP-MAPPINGS:\n")
         for i, mapping in enumerate(global_group_mappings, 1):
             group = mapping.get('group', '?')
             description = mapping.get('description', 'Keine Beschreibung')
             
-            print(f"  {i}. Group: {group}")
-            print(f"     Beschreibung: {description}")
-            print(f"     Anwendung: Alle gefilterten Produkte")
-            print()
+            p(f"  {i}. Group: {group}\n")
+            p(f"     Beschreibung: {description}\n")
+            p(f"     Anwendung: Alle gefilterten Produkte\n")
+            p("\n")
     
     # Name-Mappings
     name_mappings = mapping_data.get('name_mappings', [])
     if name_mappings:
-        print("NAME-MAPPINGS:")
+        p("NAME-MAPPINGS:\n")
         for i, mapping in enumerate(name_mappings, 1):
             level = mapping.get('level', '?')
             name = mapping.get('name', '')
             
-            print(f"  {i}. Level {level}:")
-            print(f"     Name: {name}")
-            print(f"     Anwendung: Alle Knoten auf Ebene {level}")
-            print()
+            p(f"  {i}. Level {level}:\n")
+            p(f"     Name: {name}\n")
+            p(f"     Anwendung: Alle Knoten auf Ebene {level}\n")
+            p("\n")
     
     # Special-Mappings
     special_mappings = mapping_data.get('special_mappings', [])
     if special_mappings:
-        print("SPECIAL-MAPPINGS:")
+        p("SPECIAL-MAPPINGS:\n")
         for i, mapping in enumerate(special_mappings, 1):
             group = mapping.get('group', '?')
             position = mapping.get('position', 'entire group')
             allowed = mapping.get('allowed', '')
             labels_raw = mapping.get('labels', [])
             
-            print(f"  {i}. Gruppe {group}, Position {position}:")
+            p(f"  {i}. Gruppe {group}, Position {position}:\n")
             if allowed:
-                print(f"     Allowed: {allowed}")
-            print(f"     Labels: {len(labels_raw)} Einträge")
+                p(f"     Allowed: {allowed}\n")
+            p(f"     Labels: {len(labels_raw)} Einträge\n")
             if labels_raw and len(labels_raw) > 0:
                 first_label_obj = parse_label(labels_raw[0])
                 first_label_text = label_to_string(first_label_obj)
-                print(f"     Beispiel: {first_label_text[:80]}...")
+                p(f"     Beispiel: {first_label_text[:80]}...\n")
                 if first_label_obj.get('pictures'):
-                    print(f"     Bilder: {len(first_label_obj['pictures'])}")
-            print()
+                    p(f"     Bilder: {len(first_label_obj['pictures'])}\n")
+            p("\n")
     
     # General-Mappings
     general_mappings = mapping_data.get('general_mappings', [])
     if general_mappings:
-        print("GENERAL-MAPPINGS:")
+        p("GENERAL-MAPPINGS:\n")
         for i, mapping in enumerate(general_mappings, 1):
             codes = mapping.get('codes', [])
             labels_raw = mapping.get('labels', [])
             strict = mapping.get('strict', False)
             
-            print(f"  {i}. Codes: {len(codes)} ({', '.join(codes[:3])}{'...' if len(codes) > 3 else ''})")
-            print(f"     Labels: {len(labels_raw)} Einträge")
+            p(f"  {i}. Codes: {len(codes)} ({', '.join(codes[:3])}{'...' if len(codes) > 3 else ''})\n")
+            p(f"     Labels: {len(labels_raw)} Einträge\n")
             if strict:
-                print(f"     Strict Mode: {strict}")
+                p(f"     Strict Mode: {strict}\n")
             if labels_raw and len(labels_raw) > 0:
                 first_label_obj = parse_label(labels_raw[0])
                 first_label_text = label_to_string(first_label_obj)
-                print(f"     Beispiel: {first_label_text[:80]}...")
+                p(f"     Beispiel: {first_label_text[:80]}...\n")
                 if first_label_obj.get('pictures'):
-                    print(f"     Bilder: {len(first_label_obj['pictures'])}")
-            print()
+                    p(f"     Bilder: {len(first_label_obj['pictures'])}\n")
+            p("\n")
+    
+    sys.stdout.write(buf.getvalue())
 
 
 def print_application_results(stats, dry_run=False):
     """Druckt die Ergebnisse der Label-Anwendung."""
     action = "VORSCHAU" if dry_run else "ANGEWENDET"
-    print(f"=== LABELS {action} ===")
     
-    print(f"Verarbeitete Produkte: {stats['products_processed']}")
-    print(f"Produkte mit Labels: {len(stats['products_with_labels'])}")
+    # Ausgabe sammeln und am Ende in einem Rutsch schreiben
+    buf = io.StringIO()
+    p = buf.write
+    
+    p(f"=== LABELS {action} ===\n")
+    
+    p(f"Verarbeitete Produkte: {stats['products_processed']}\n")
+    p(f"Produkte mit Labels: {len(stats['products_with_labels'])}\n")
     
     if dry_run:
-        print(f"Labels würden hinzugefügt werden: {stats['labels_applied']}")
-        print(f"Labels würden aktualisiert werden: {stats['labels_updated']}")
-        print(f"Groups würden hinzugefügt werden: {stats['groups_applied']}")
-        print(f"Groups würden aktualisiert werden: {stats['groups_updated']}")
+        p(f"Labels würden hinzugefügt werden: {stats['labels_applied']}\n")
+        p(f"Labels würden aktualisiert werden: {stats['labels_updated']}\n")
+        p(f"Groups würden hinzugefügt werden: {stats['groups_applied']}\n")
+        p(f"Groups würden aktualisiert werden: {stats['groups_updated']}\n")
         if 'global_groups_applied' in stats:
-            print(f"Globale Groups würden hinzugefügt werden: {stats['global_groups_applied']}")
-            print(f"Globale Groups würden aktualisiert werden: {stats['global_groups_updated']}")
+            p(f"Globale Groups würden hinzugefügt werden: {stats['global_groups_applied']}\n")
+            p(f"Globale Groups würden aktualisiert werden: {stats['global_groups_updated']}\n")
         if 'names_applied' in stats:
-            print(f"Namen würden hinzugefügt werden: {stats['names_applied']}")
-            print(f"Namen würden aktualisiert werden: {stats['names_updated']}")
+            p(f"Namen würden hinzugefügt werden: {stats['names_applied']}\n")
+            p(f"Namen würden aktualisiert werden: {stats['names_updated']}\n")
     else:
-        print(f"Labels hinzugefügt: {stats['labels_applied']}")
-        print(f"Labels aktualisiert: {stats['labels_updated']}")
-        print(f"Groups hinzugefügt: {stats['groups_applied']}")
-        print(f"Groups aktualisiert: {stats['groups_updated']}")
+        p(f"Labels hinzugefügt: {stats['labels_applied']}\n")
+        p(f"Labels aktualisiert: {stats['labels_updated']}\n")
+        p(f"Groups hinzugefügt: {stats['groups_applied']}\n")
+        p(f"Groups aktualisiert: {stats['groups_updated']}\n")
         if 'global_groups_applied' in stats:
-            print(f"Globale Groups hinzugefügt: {stats['global_groups_applied']}")
-            print(f"Globale Groups aktualisiert: {stats['global_groups_updated']}")
+            p(f"Globale Groups hinzugefügt: {stats['global_groups_applied']}\n")
+            p(f"Globale Groups aktualisiert: {stats['global_groups_updated']}\n")
         if 'names_applied' in stats:
-            print(f"Namen hinzugefügt: {stats['names_applied']}")
-            print(f"Namen aktualisiert: {stats['names_updated']}")
+            p(f"Namen hinzugefügt: {stats['names_applied']}\n")
+            p(f"Namen aktualisiert: {stats['names_updated']}\n")
     
-    print(f"Verarbeitete Positionen: {len(stats['positions_processed'])}")
-    print(f"Gematchte Codes: {len(stats['codes_matched'])}")
-    print(f"Gelabelte Knoten: {len(stats.get('nodes_labeled', []))}")
-    print()
+    p(f"Verarbeitete Positionen: {len(stats['positions_processed'])}\n")
+    p(f"Gematchte Codes: {len(stats['codes_matched'])}\n")
+    p(f"Gelabelte Knoten: {len(stats.get('nodes_labeled', []))}\n")
+    p("\n")
     
     # Zeige gelabelte Knoten (die tatsächlichen Labels im Baum)
     if 'nodes_labeled' in stats and stats['nodes_labeled']:
-        print("GELABELTE KNOTEN IM BAUM:")
+        p("GELABELTE KNOTEN IM BAUM:\n")
         unique_nodes = {}
         for node_info in stats['nodes_labeled']:
             # Handhabe verschiedene Mapping-Typen
@@ -1952,95 +2094,227 @@ def print_application_results(stats, dry_run=False):
             }.get(match_type, 'FRAGE')
             
             if mapping_type == 'relative_group_mapping':
-                print(f"  {i}. {family} {position_str}: '{code}' (relative group) {match_indicator}")
+                p(f"  {i}. {family} {position_str}: '{code}' (relative group) {match_indicator}\n")
             elif mapping_type == 'general':
-                print(f"  {i}. {family} GENERAL: '{code}' (position-unabhängig)")
+                p(f"  {i}. {family} GENERAL: '{code}' (position-unabhängig)\n")
             else:
-                print(f"  {i}. {family} Position {position_str}: '{code}' ({mapping_type}) {match_indicator}")
+                p(f"  {i}. {family} Position {position_str}: '{code}' ({mapping_type}) {match_indicator}\n")
             
             if node_info.get('full_code'):
-                print(f"     Node-Code: {node_info['full_code']}")
+                p(f"     Node-Code: {node_info['full_code']}\n")
             if node_info['full_typecode']:
-                print(f"     Beispiel-Produkt: {node_info['full_typecode']}")
-            print(f"     Knoten-Pfad: {node_info['node_path']}")
+                p(f"     Beispiel-Produkt: {node_info['full_typecode']}\n")
+            p(f"     Knoten-Pfad: {node_info['node_path']}\n")
             
             if mapping_type in ['label', 'relative_group_mapping']:
                 label_preview = node_info['new_label'][:80] + "..." if len(node_info['new_label']) > 80 else node_info['new_label']
-                print(f"     Label (DE): {label_preview.split(chr(10))[0]}")  # Erste Zeile
+                p(f"     Label (DE): {label_preview.split(chr(10))[0]}\n")  # Erste Zeile
                 
                 if node_info.get('new_label_en'):
                     label_en_preview = node_info['new_label_en'][:80] + "..." if len(node_info['new_label_en']) > 80 else node_info['new_label_en']
-                    print(f"     Label (EN): {label_en_preview.split(chr(10))[0]}")
+                    p(f"     Label (EN): {label_en_preview.split(chr(10))[0]}\n")
                 
                 if len(unique_nodes) <= 5:  # Zeige Details nur bei wenigen Knoten
                     if node_info.get('old_label'):
-                        print(f"     (Ersetzt vorheriges deutsches Label)")
+                        p(f"     (Ersetzt vorheriges deutsches Label)\n")
                     else:
-                        print(f"     (Neues deutsches Label)")
+                        p(f"     (Neues deutsches Label)\n")
                     
                     if node_info.get('new_label_en'):
                         if node_info.get('old_label_en'):
-                            print(f"     (Ersetzt vorheriges englisches Label)")
+                            p(f"     (Ersetzt vorheriges englisches Label)\n")
                         else:
-                            print(f"     (Neues englisches Label)")
+                            p(f"     (Neues englisches Label)\n")
                             
             elif mapping_type == 'group':
                 group_preview = node_info['new_group'][:50] + "..." if len(node_info['new_group']) > 50 else node_info['new_group']
-                print(f"     Group: {group_preview}")
+                p(f"     Group: {group_preview}\n")
                 if len(unique_nodes) <= 5:  # Zeige Details nur bei wenigen Knoten
                     if node_info.get('old_group'):
-                        print(f"     (Ersetzt vorherige Group)")
+                        p(f"     (Ersetzt vorherige Group)\n")
                     else:
-                        print(f"     (Neue Group)")
-            print()
+                        p(f"     (Neue Group)\n")
+            p("\n")
         
         if total_count > max_examples:
-            print(f"     ... und {total_count - max_examples} weitere Knoten")
+            p(f"     ... und {total_count - max_examples} weitere Knoten\n")
     
     # Zeige Beispiel-Produkte
     if stats['products_with_labels']:
-        print("BEISPIELE DER BETROFFENEN PRODUKTE:")
+        p("BEISPIELE DER BETROFFENEN PRODUKTE:\n")
         max_product_examples = 50
         total_products = len(stats['products_with_labels'])
         
         for i, product in enumerate(stats['products_with_labels'][:max_product_examples], 1):
-            print(f"  {i}. {product['full_typecode']}")
+            p(f"  {i}. {product['full_typecode']}\n")
             for label_key, label_info in product['labels'].items():
                 pos = label_info['position']
                 code = label_info['code']
                 mapping_type = label_info['type']
                 if mapping_type == 'label':
-                    print(f"     Position {pos} (Produkt: {code}, via Mapping: {label_info['mapping_code']}) wird gelabelt")
+                    p(f"     Position {pos} (Produkt: {code}, via Mapping: {label_info['mapping_code']}) wird gelabelt\n")
                 elif mapping_type == 'group':
-                    print(f"     → Position {pos} (Produkt: {code}, via Mapping: {label_info['mapping_code']}) bekommt Group '{label_info['group']}'")
-            print()
+                    p(f"     → Position {pos} (Produkt: {code}, via Mapping: {label_info['mapping_code']}) bekommt Group '{label_info['group']}'\n")
+            p("\n")
         
         if total_products > max_product_examples:
-            print(f"     ... und {total_products - max_product_examples} weitere Produkte")
+            p(f"     ... und {total_products - max_product_examples} weitere Produkte\n")
+    
+    sys.stdout.write(buf.getvalue())
+
+
+def load_tree_json(file_path):
+    """
+    Lädt eine JSON-Datei (Variantenbaum oder Mapping-Datei). Nutzt orjson falls installiert,
+    bei nicht striktem JSON (z.B. NaN) mit Rückfall auf Standard-json (siehe load_json_file).
+    
+    Args:
+        file_path: Pfad zur JSON-Datei
+        
+    Returns:
+        Geladene JSON-Daten
+    """
+    return load_json_file(file_path)
+
+
+def write_json_chunked(tree_data, f, dumps, indent=True):
+    """
+    Schreibt den Baum stückweise in eine Binär-Datei: jedes Kind der Wurzel (Produktfamilie)
+    wird einzeln serialisiert und sofort geschrieben. So liegt nie der komplette Baum als ein
+    einziges bytes-Objekt im Speicher. Das Ergebnis ist bytegleich zu dumps(tree_data)
+    mit demselben Serialisierer (nicht zur Ausgabe von json.dump, siehe save_tree_json).
+    
+    Args:
+        tree_data: JSON-Baum-Daten
+        f: In Binär-Modus geöffnete Datei
+        dumps: Serialisierer value -> bytes (z.B. orjson.dumps mit Optionen)
+        indent: True wenn dumps mit 2 Leerzeichen einrückt
+    """
+    children = tree_data.get('children') if isinstance(tree_data, dict) else None
+    if not isinstance(children, list) or not children or not all(isinstance(key, str) for key in tree_data):
+        f.write(dumps(tree_data))
+        return
+    
+    if indent:
+        open_obj, item_sep, key_sep, close_obj = b'{\n  ', b',\n  ', b': ', b'\n}'
+        open_list, child_sep, close_list = b'[\n    ', b',\n    ', b'\n  ]'
+    else:
+        open_obj, item_sep, key_sep, close_obj = b'{', b',', b':', b'}'
+        open_list, child_sep, close_list = b'[', b',', b']'
+    
+    def nested(value, prefix):
+        # Eingebettete Werte um die Einrückung ihrer Ebene verschieben
+        # (Zeilenumbrüche in JSON-Strings sind immer escaped)
+        data = dumps(value)
+        return data.replace(b'\n', b'\n' + prefix) if indent else data
+    
+    f.write(open_obj)
+    for i, (key, value) in enumerate(tree_data.items()):
+        if i:
+            f.write(item_sep)
+        f.write(dumps(key) + key_sep)
+        if value is children:
+            f.write(open_list)
+            for j, child in enumerate(children):
+                if j:
+                    f.write(child_sep)
+                f.write(nested(child, b'    '))
+            f.write(close_list)
+        else:
+            f.write(nested(value, b'  '))
+    f.write(close_obj)
+
+
+def save_tree_json(tree_data, file_path, compact=False):
+    """
+    Speichert den Variantenbaum als JSON (UTF-8, 2 Leerzeichen Einrückung). Nutzt orjson falls installiert.
+    
+    Die orjson-Ausgabe ist inhaltlich gleich, aber nicht bytegleich zur json.dump-Ausgabe:
+    Floats werden je nach orjson-Version anders formatiert (z.B. 1e20 statt 1e+20), NaN/Infinity als null.
+    
+    Args:
+        tree_data: JSON-Baum-Daten
+        file_path: Ziel-Pfad
+        compact: Ohne Einrückung speichern (deutlich kleinere Datei, schneller geschrieben)
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS if compact else orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        with open(file_path, 'wb') as f:
+            write_json_chunked(tree_data, f, lambda value: orjson.dumps(value, option=option), indent=not compact)
+        return
+    # json.dump schreibt bereits stückweise (iterencode)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        if compact:
+            json.dump(tree_data, f, ensure_ascii=False, separators=(',', ':'))
+        else:
+            json.dump(tree_data, f, ensure_ascii=False, indent=2)
+
+
+# ioctl-Nummer für Reflink-Kopien unter Linux (aus linux/fs.h)
+FICLONE = 0x40049409
+
+
+def fast_copy(src, dst):
+    """
+    Kopiert eine Datei inkl. Metadaten (wie shutil.copy2).
+    
+    Unter Linux wird zuerst ein Reflink (FICLONE) versucht: auf btrfs/XFS teilen sich
+    Original und Kopie dann die Datenblöcke, es werden keine Bytes kopiert. Unterstützt
+    das Dateisystem das nicht, wird auf shutil.copy2 zurückgefallen.
+    
+    Args:
+        src: Quell-Pfad
+        dst: Ziel-Pfad
+    """
+    if FCNTL_AVAILABLE and sys.platform.startswith('linux'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            # Kein Reflink möglich (z.B. ext4, anderes Dateisystem) -> normale Kopie
+            pass
+    shutil.copy2(src, dst)
 
 
 def create_backup(file_path):
     """Erstellt ein Backup der JSON-Datei."""
     backup_path = f"{file_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    shutil.copy2(file_path, backup_path)
+    fast_copy(file_path, backup_path)
     print(f"📁 Backup erstellt: {backup_path}")
     return backup_path
 
 
-def validate_saved_file(file_path):
+def validate_saved_file(file_path, tree_data=None):
     """
     Schnelle Validierung einer gespeicherten JSON-Datei.
     
+    Ist der gerade gespeicherte Baum (tree_data) bekannt, wird die Datei nicht erneut
+    geparst: die Struktur wird am Baum im Speicher geprüft und von der Datei nur Anfang
+    und Ende gelesen (erkennt leere oder abgeschnittene Dateien).
+    
     Args:
         file_path: Pfad zur JSON-Datei
+        tree_data: Optional der Baum, der in file_path gespeichert wurde
         
     Returns:
         bool: True wenn gültig, False bei Problemen
     """
     try:
-        # Grundlegende JSON-Syntax prüfen
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if tree_data is None:
+            # Grundlegende JSON-Syntax prüfen
+            data = load_tree_json(file_path)
+        else:
+            with open(file_path, 'rb') as f:
+                head = f.read(64).lstrip()
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - 64))
+                tail = f.read().rstrip()
+            # Gespeichertes Objekt muss vollständig sein: beginnt mit '{' und endet mit '}'
+            if not head.startswith(b'{') or not tail.endswith(b'}'):
+                return False
+            data = tree_data
         
         # Grundstruktur prüfen
         if not isinstance(data, dict) or "children" not in data:
@@ -2070,7 +2344,27 @@ def validate_saved_file(file_path):
         return False
 
 
-def apply_global_group_mappings(tree_data, matching_products, global_group_mappings, target_family, dry_run=False):
+# Vorformatierte Pfad-Segmente für übliche Kind-Indizes (größere Indizes werden bei Bedarf formatiert)
+_CHILD_TOKENS = tuple(f"children[{i}]" for i in range(1024))
+
+
+def _children_path(path_ref):
+    """
+    Baut den Knoten-Pfad ('children[0]/children[3]/...') aus einer verketteten
+    (parent_ref, index)-Referenz. Der String wird so nur für tatsächlich
+    getroffene Knoten erzeugt statt für jeden besuchten Knoten.
+    """
+    parts = []
+    tokens = _CHILD_TOKENS
+    token_count = len(tokens)
+    while path_ref is not None:
+        path_ref, index = path_ref
+        parts.append(tokens[index] if index < token_count else f"children[{index}]")
+    parts.reverse()
+    return "/".join(parts)
+
+
+def apply_global_group_mappings(tree_data, matching_products, global_group_mappings, target_family, dry_run=False, matching_product_codes=None, descendant_match_index=None):
     """
     Wendet globale Group-Mappings auf alle Produkte an, die das Filter-Kriterium erfüllen.
     
@@ -2080,6 +2374,8 @@ def apply_global_group_mappings(tree_data, matching_products, global_group_mappi
         global_group_mappings: Liste von globalen Group-Mapping-Objekten
         target_family: Ziel-Produktfamilie
         dry_run: Ob es ein Dry-Run ist
+        matching_product_codes: Optional vorberechnete Typcode-Menge (siehe build_matching_product_codes)
+        descendant_match_index: Optional vorberechneter Index (siehe build_descendant_match_index)
         
     Returns:
         dict: Statistiken über angewendete globale Groups
@@ -2095,70 +2391,87 @@ def apply_global_group_mappings(tree_data, matching_products, global_group_mappi
         return stats
     
     # Erstelle Set der passenden Produkt-Codes für schnelle Suche
-    matching_product_codes = set()
-    for product in matching_products:
-        if isinstance(product, dict) and 'full_typecode' in product:
-            matching_product_codes.add(product['full_typecode'])
-        elif isinstance(product, str):
-            matching_product_codes.add(product)
-    
-    def apply_global_groups_recursive(node, current_family=None, path="", depth=0):
-        # Update Familie - DYNAMISCH: Verwende depth 1 Check
-        if depth == 1 and 'code' in node:
-            current_family = node['code']
-        
-        # Prüfe ob dieser Knoten zu einem passenden Produkt gehört
-        if (current_family == target_family and 
-            'full_typecode' in node and 
-            node['full_typecode'] in matching_product_codes):
+    if matching_product_codes is None:
+        matching_product_codes = build_matching_product_codes(matching_products)
+    has_match = descendant_match_index
+    if has_match is None:
+        has_match = build_descendant_match_index(tree_data, matching_product_codes)
+    
+    def apply_global_groups_iterative(root):
+        # Iterative Tiefensuche mit explizitem Stack statt Rekursion; der Knoten-Rumpf
+        # steht direkt in der Schleife (kein zusätzlicher Funktionsaufruf pro Knoten)
+        # Stack-Einträge: (node, current_family, path_ref, depth)
+        stack = deque([(root, None, None, 0)])
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node, current_family, path_ref, depth = pop()
             
-            # Wende alle globalen Group-Mappings an
-            for global_mapping in global_group_mappings:
-                global_group = global_mapping.get('group', '')
-                append_mode = global_mapping.get('append', False)
-                description = global_mapping.get('description', '')
+            # Update Familie - DYNAMISCH: Verwende depth 1 Check
+            if depth == 1 and 'code' in node:
+                current_family = node['code']
+            
+            # Knoten fremder Familien oder ohne gefilterte Produkte (und deren Teilbäume) können nie matchen
+            if depth >= 1 and (current_family != target_family or not has_match[id(node)]):
+                continue
+            
+            # Prüfe ob dieser Knoten zu einem passenden Produkt gehört
+            if (current_family == target_family and 
+                'full_typecode' in node and 
+                node['full_typecode'] in matching_product_codes):
                 
-                if global_group:
-                    old_group = node.get('group', '')
-                    
-                    # Anwenden der globalen Group
-                    if not dry_run:
-                        if append_mode and old_group:
-                            # Hänge an bestehende Group an
-                            node['group'] = f"{old_group} {global_group}"
-                            stats['global_groups_updated'] += 1
-                        else:
-                            # Setze globale Group
-                            node['group'] = global_group
-                            if old_group != global_group:
-                                if old_group:
-                                    stats['global_groups_updated'] += 1
-                                else:
-                                    stats['global_groups_applied'] += 1
-                    
-                    # Statistik
-                    stats['nodes_with_global_groups'].append({
-                        'node_path': path,
-                        'family': current_family,
-                        'full_typecode': node.get('full_typecode', ''),
-                        'old_group': old_group,
-                        'new_group': global_group,
-                        'description': description,
-                        'applied': not dry_run
-                    })
-        
-        # Rekursiv durch Children
-        if 'children' in node:
-            for i, child in enumerate(node['children']):
-                child_path = f"{path}/children[{i}]" if path else f"children[{i}]"
-                apply_global_groups_recursive(child, current_family, child_path, depth + 1)
+                path = _children_path(path_ref)
+                
+                # Wende alle globalen Group-Mappings an
+                for global_group, append_mode, description in parsed_global_mappings:
+                    if global_group:
+                        old_group = node.get('group', '')
+                        
+                        # Anwenden der globalen Group
+                        if not dry_run:
+                            if append_mode and old_group:
+                                # Hänge an bestehende Group an
+                                node['group'] = f"{old_group} {global_group}"
+                                stats['global_groups_updated'] += 1
+                            else:
+                                # Setze globale Group
+                                node['group'] = global_group
+                                if old_group != global_group:
+                                    if old_group:
+                                        stats['global_groups_updated'] += 1
+                                    else:
+                                        stats['global_groups_applied'] += 1
+                        
+                        # Statistik
+                        stats['nodes_with_global_groups'].append(NodeGlobalGroup(
+                            node_path=path,
+                            family=current_family,
+                            full_typecode=node.get('full_typecode', ''),
+                            old_group=old_group,
+                            new_group=global_group,
+                            description=description,
+                            applied=not dry_run
+                        ))
+            
+            # Children auf den Stack legen (umgekehrt, damit die Reihenfolge der Rekursion erhalten bleibt)
+            children = node.get('children')
+            if children:
+                next_depth = depth + 1
+                for i in range(len(children) - 1, -1, -1):
+                    push((children[i], current_family, (path_ref, i), next_depth))
+    
+    # Mapping-Felder einmalig auslesen statt pro Knoten
+    parsed_global_mappings = [
+        (global_mapping.get('group', ''), global_mapping.get('append', False), global_mapping.get('description', ''))
+        for global_mapping in global_group_mappings
+    ]
     
     # Starte Anwendung
-    apply_global_groups_recursive(tree_data)
+    apply_global_groups_iterative(tree_data)
     return stats
 
 
-def apply_general_mappings(tree_data, matching_products, general_mappings, target_family, dry_run=False, verbose=False):
+def apply_general_mappings(tree_data, matching_products, general_mappings, target_family, dry_run=False, verbose=False, matching_product_codes=None, descendant_match_index=None, first_match_only=False):
     """
     Wendet General-Mappings an - Labels für Codes die ÜBERALL im Typcode vorkommen können.
     Im Gegensatz zu code_mappings benötigen general_mappings keine Positions-Angabe.
@@ -2170,6 +2483,10 @@ def apply_general_mappings(tree_data, matching_products, general_mappings, targe
         target_family: Ziel-Produktfamilie
         dry_run: Ob es ein Dry-Run ist
         verbose: Zeige detaillierte Ausgaben
+        matching_product_codes: Optional vorberechnete Typcode-Menge (siehe build_matching_product_codes)
+        descendant_match_index: Optional vorberechneter Index (siehe build_descendant_match_index)
+        first_match_only: Durchlauf beenden, sobald jeder Mapping-Code mindestens einmal
+                          angewendet wurde (weitere Vorkommen bleiben dann ungelabelt)
 
     Format von general_mappings:
         [
@@ -2194,7 +2511,7 @@ def apply_general_mappings(tree_data, matching_products, general_mappings, targe
         return stats
 
     # Baue Code-zu-Label Lookup
-    # Jetzt: code_to_label[code] = {'label': label_obj, 'strict': bool}
+    # Jetzt: code_to_label[code] = {'label': label_obj, 'strict': bool, 'text': str, 'pictures': [...], 'links': [...]}
     code_to_label = {}
     for mapping in general_mappings:
         codes = mapping.get('codes', [])
@@ -2211,124 +2528,174 @@ def apply_general_mappings(tree_data, matching_products, general_mappings, targe
 
         for code, label in zip(codes, labels):
             # Überschreiben erlaubt; letzter Eintrag gewinnt
-            code_to_label[code] = {'label': label, 'strict': bool(strict_mode)}
+            code_to_label[code] = {
+                'label': label,
+                'strict': bool(strict_mode),
+                # Pro Mapping invariant -> einmalig vorberechnen statt pro Knoten
+                'text': label_to_string(label),
+                'pictures': label.get('pictures', []),
+                'links': label.get('links', [])
+            }
 
     if not code_to_label:
         return stats
 
+    # Internierte Strings: Vergleiche mit den (internierten) Baum-Codes werden zum Pointer-Vergleich
+    if isinstance(target_family, str):
+        target_family = sys.intern(target_family)
+    code_to_label = {sys.intern(code): meta for code, meta in code_to_label.items()}
+
     if verbose:
         print(f"  General-Mappings für {len(code_to_label)} Codes")
 
     # Erstelle Set der passenden Produkt-Codes
-    matching_product_codes = set()
-    for product in matching_products:
-        if isinstance(product, dict) and 'full_typecode' in product:
-            matching_product_codes.add(product['full_typecode'])
-        elif isinstance(product, str):
-            matching_product_codes.add(product)
-
-    def _matches_with_strict_rule(node_code: str, mapping_code: str, strict_flag: bool) -> bool:
+    if matching_product_codes is None:
+        matching_product_codes = build_matching_product_codes(matching_products)
+    # Einmalig vorberechnen, welche Knoten gefilterte Nachkommen haben (oder vom Aufrufer übernehmen)
+    has_match = descendant_match_index
+    if has_match is None:
+        has_match = build_descendant_match_index(tree_data, matching_product_codes)
+
+    # Präfix-Trie über die Mapping-Codes: Da nur exakte oder Präfix-Treffer zählen,
+    # genügt ein Abstieg entlang des Knoten-Codes statt alle Mappings zu prüfen.
+    # Der Schlüssel None markiert das Ende eines Mapping-Codes (kollidiert nicht mit Zeichen).
+    mapping_order = {mapping_code: i for i, mapping_code in enumerate(code_to_label)}
+    mapping_trie = {}
+    for mapping_code in code_to_label:
+        trie_node = mapping_trie
+        for ch in mapping_code:
+            trie_node = trie_node.setdefault(ch, {})
+        trie_node[None] = mapping_code
+
+    # Ergebnis-Cache je Knoten-Code: derselbe Code kommt im Baum vielfach vor
+    first_match_cache = {}
+
+    def _first_match(node_code):
         """
-        Prüft, ob node_code zum mapping_code passt.
+        Liefert (mapping_code, meta) des ersten passenden Mappings (in Mapping-Reihenfolge)
+        oder None. Geprüft werden nur Mapping-Codes, die Präfix von node_code sind:
         - Non-strict: exact oder startswith
         - Strict: exact oder startswith + folgendes Zeichen ist kein Buchstabe
         """
-        if not node_code or not mapping_code:
-            return False
-        if node_code == mapping_code:
-            return True
-        if node_code.startswith(mapping_code):
-            if not strict_flag:
-                return True
-            # strict: nur wenn folgendes Zeichen kein Buchstabe ist
-            if len(node_code) > len(mapping_code):
-                next_char = node_code[len(mapping_code)]
-                return not next_char.isalpha()
-        return False
-
-    def apply_general_labels_recursive(node, current_family=None, path="", depth=0):
-        """Rekursive Hilfsfunktion zum Anwenden von General-Labels."""
-        # Update Familie
-        if depth == 1 and 'code' in node:
-            current_family = node['code']
+        if node_code in first_match_cache:
+            return first_match_cache[node_code]
+        candidates = []
+        trie_node = mapping_trie
+        for ch in node_code:
+            trie_node = trie_node.get(ch)
+            if trie_node is None:
+                break
+            if None in trie_node:
+                candidates.append(trie_node[None])
+        if len(candidates) > 1:
+            candidates.sort(key=mapping_order.__getitem__)
+        match = None
+        for mapping_code in candidates:
+            meta = code_to_label[mapping_code]
+            mapping_len = len(mapping_code)
+            if (mapping_len == len(node_code) or not meta['strict'] or
+                    not node_code[mapping_len].isalpha()):
+                match = (mapping_code, meta)
+                break
+        first_match_cache[node_code] = match
+        return match
 
-        # Prüfe ob dieser Knoten zur Zielfamilie gehört und einen Code hat
-        code = node.get('code', '')
+    def apply_general_labels_iterative(root):
+        """
+        Iterative Tiefensuche (expliziter Stack) zum Anwenden von General-Labels.
+        Der Knoten-Rumpf steht direkt in der Schleife, damit pro Knoten kein
+        zusätzlicher Funktionsaufruf anfällt.
+        """
+        # Stack-Einträge: (node, current_family, path_ref, depth)
+        stack = deque([(root, None, None, 0)])
+        pop = stack.pop
+        push = stack.append
+        codes_matched = stats['codes_matched']
+        nodes_labeled = stats['nodes_labeled']
+        total_codes = len(code_to_label)
+        applied = not dry_run
+
+        while stack:
+            node, current_family, path_ref, depth = pop()
+
+            # Update Familie
+            if depth == 1 and 'code' in node:
+                current_family = node['code']
 
-        if (current_family == target_family and
-            code and
-            not code.startswith('pattern_')):
+            # Knoten fremder Familien oder ohne gefilterte Produkte (und deren Teilbäume) können nie matchen
+            if depth >= 1 and (current_family != target_family or not has_match[id(node)]):
+                continue
 
-            # Prüfe ob dieser Knoten zu einem gefilterten Produkt gehört
-            # Entweder direkt (wenn es ein Produkt ist) oder als Teil des Pfads
-            should_apply = False
+            # Prüfe ob dieser Knoten zur Zielfamilie gehört und einen Code hat
+            code = node.get('code', '')
 
-            if 'full_typecode' in node and node['full_typecode'] in matching_product_codes:
-                should_apply = True
-            elif has_matching_descendants(node, matching_product_codes):
-                should_apply = True
+            # Der Knoten gehört zu einem gefilterten Produkt - entweder direkt (wenn es ein
+            # Produkt ist) oder als Teil des Pfads (has_match)
+            if (current_family == target_family and
+                code and
+                not code.startswith('pattern_') and
+                (node.get('full_typecode') in matching_product_codes or has_match[id(node)])):
 
-            if should_apply:
                 # Prüfe ob der Code in unseren General-Mappings ist (mit strict-Berücksichtigung)
-                # Wir müssen alle mapping-codes prüfen, weil strict und prefix-Match relevant sind
-                for mapping_code, meta in code_to_label.items():
-                    label = meta['label']
-                    strict_flag = meta['strict']
+                # Pro Knoten wird nur das erste passende Mapping angewendet
+                match = _first_match(code)
+                if match is not None:
+                    mapping_code, meta = match
 
-                    if _matches_with_strict_rule(code, mapping_code, strict_flag):
-                        old_label = node.get('label', '')
-                        label_text = label_to_string(label)
+                    old_label = node.get('label', '')
+                    label_text = meta['text']
+                    path = _children_path(path_ref)
 
-                        if not dry_run:
-                            node['label'] = label_text
-                            
-                            # Speichere Bilder separat
-                            if 'pictures' not in node:
-                                node['pictures'] = []
-                            node['pictures'].extend(label.get('pictures', []))
-                            
-                            # Speichere Links separat
-                            if 'links' not in node:
-                                node['links'] = []
-                            node['links'].extend(label.get('links', []))
+                    if applied:
+                        node['label'] = label_text
+                        
+                        # Speichere Bilder separat
+                        if 'pictures' not in node:
+                            node['pictures'] = []
+                        node['pictures'].extend(meta['pictures'])
+                        
+                        # Speichere Links separat
+                        if 'links' not in node:
+                            node['links'] = []
+                        node['links'].extend(meta['links'])
 
-                        # Statistik
-                        if old_label and old_label.strip() and old_label != label_text:
-                            stats['labels_updated'] += 1
-                        else:
-                            stats['labels_applied'] += 1
-
-                        stats['codes_matched'].add(mapping_code)
-                        stats['nodes_labeled'].append({
-                            'node_path': path,
-                            'family': current_family,
-                            'position': 'N/A',  # General-Mappings sind position-unabhängig
-                            'code': code,
-                            'old_label': old_label,
-                            'new_label': label_text,
-                            'pictures': label.get('pictures', []),
-                            'links': label.get('links', []),
-                            'full_typecode': node.get('full_typecode', ''),
-                            'applied': not dry_run,
-                            'type': 'general'  # Markiere als general mapping
-                        })
+                    # Statistik
+                    if old_label and old_label.strip() and old_label != label_text:
+                        stats['labels_updated'] += 1
+                    else:
+                        stats['labels_applied'] += 1
 
-                        if verbose:
-                            print(f"    Code '{mapping_code}' → Label '{label_text}' (Pfad: {path})")
-                        # Wenn ein mapping_code matched, sollte das weitere matching für diesen node
-                        # optional unterbunden werden. Aktuell brechen wir, damit pro node nur das erste
-                        # passende mapping angewendet wird; entferne das `break`, falls mehrere Labels
-                        # pro Knoten gewünscht sind.
+                    codes_matched.add(mapping_code)
+                    nodes_labeled.append(NodeGeneral(
+                        node_path=path,
+                        family=current_family,
+                        position='N/A',  # General-Mappings sind position-unabhängig
+                        code=code,
+                        old_label=old_label,
+                        new_label=label_text,
+                        pictures=meta['pictures'],
+                        links=meta['links'],
+                        full_typecode=node.get('full_typecode', ''),
+                        applied=applied,
+                        type='general'  # Markiere als general mapping
+                    ))
+
+                    if verbose:
+                        print(f"    Code '{mapping_code}' → Label '{label_text}' (Pfad: {path})")
+
+                    # Optionaler Abbruch: alle Mapping-Codes wurden bereits gefunden
+                    if first_match_only and len(codes_matched) == total_codes:
                         break
 
-        # Rekursiv durch Children
-        if 'children' in node:
-            for i, child in enumerate(node['children']):
-                child_path = f"{path}/children[{i}]" if path else f"children[{i}]"
-                apply_general_labels_recursive(child, current_family, child_path, depth + 1)
+            # Children auf den Stack legen (umgekehrt, damit die Reihenfolge der Rekursion erhalten bleibt)
+            children = node.get('children')
+            if children:
+                next_depth = depth + 1
+                for i in range(len(children) - 1, -1, -1):
+                    push((children[i], current_family, (path_ref, i), next_depth))
 
     # Starte Anwendung
-    apply_general_labels_recursive(tree_data)
+    apply_general_labels_iterative(tree_data)
 
     if verbose:
         print(f"  Matched Codes: {len(stats['codes_matched'])}/{len(code_to_label)}")
@@ -2338,27 +2705,101 @@ def apply_general_mappings(tree_data, matching_products, general_mappings, targe
 
 
 
-def has_matching_descendants(node, matching_product_codes):
+def intern_tree_strings(tree_data):
+    """
+    Interniert die häufig verglichenen Strings ('code', 'full_typecode', 'group')
+    aller Knoten in-place. Gleiche Codes teilen sich danach ein String-Objekt,
+    Gleichheitsvergleiche mit ebenfalls internierten Werten werden zum Pointer-Vergleich.
+    
+    Args:
+        tree_data: JSON-Baum-Daten (werden modifiziert)
+    """
+    intern = sys.intern
+    stack = [tree_data]
+    while stack:
+        node = stack.pop()
+        for key in ('code', 'full_typecode', 'group'):
+            value = node.get(key)
+            if type(value) is str:
+                node[key] = intern(value)
+        children = node.get('children')
+        if children:
+            stack.extend(children)
+
+
+def flatten_tree(tree_data):
     """
-    Prüft ob ein Knoten Nachkommen hat, die zu den gefilterten Produkten gehören.
+    Legt den Baum einmalig als flache, parallele Listen in Pre-Order ab (Struct-of-Arrays).
+    
+    Die Knoten-Dicts selbst werden nicht kopiert; Änderungen an nodes[i] wirken
+    direkt auf den Originalbaum. Da Pre-Order jeden Elternknoten vor seinen
+    Kindern ablegt, lassen sich Bottom-up-Berechnungen als einfache Rückwärts-
+    Schleife über die Indizes formulieren (ohne Rekursion oder Stack).
     
     Args:
-        node: Der zu prüfende Knoten
+        tree_data: JSON-Baum-Daten
+        
+    Returns:
+        dict: {
+            'nodes': [node, ...],          # Knoten-Dicts in Pre-Order
+            'parent': [int, ...]           # Index des Elternknotens (-1 für die Wurzel)
+        }
+    """
+    nodes = []
+    parent = []
+    
+    # Stack-Einträge: (node, parent_index)
+    stack = [(tree_data, -1)]
+    while stack:
+        node, parent_index = stack.pop()
+        index = len(nodes)
+        nodes.append(node)
+        parent.append(parent_index)
+        children = node.get('children')
+        if children:
+            for child in reversed(children):
+                stack.append((child, index))
+    
+    return {
+        'nodes': nodes,
+        'parent': parent
+    }
+
+
+def build_descendant_match_index(tree_data, matching_product_codes, flat_tree=None):
+    """
+    Bestimmt in einem einzigen Bottom-up-Durchlauf für jeden Knoten, ob er selbst
+    oder einer seiner Nachkommen zu den gefilterten Produkten gehört.
+    
+    Statt pro Knoten den Teilbaum nach Treffern zu durchsuchen, genügt danach
+    ein O(1)-Lookup. Der Baum darf währenddessen nicht strukturell verändert
+    werden, da die Schlüssel auf id(node) basieren.
+    
+    Args:
+        tree_data: JSON-Baum-Daten
         matching_product_codes: Set von Typcode-Strings der gefilterten Produkte
+        flat_tree: Optional bereits flachgelegter Baum (siehe flatten_tree)
         
     Returns:
-        bool: True wenn mindestens ein Nachkomme in matching_product_codes ist
+        dict: {id(node): bool}
     """
-    # Direkter Match
-    if 'full_typecode' in node and node['full_typecode'] in matching_product_codes:
-        return True
+    if flat_tree is None:
+        flat_tree = flatten_tree(tree_data)
+    nodes = flat_tree['nodes']
+    parent = flat_tree['parent']
     
-    # Prüfe Kinder rekursiv
-    for child in node.get('children', []):
-        if has_matching_descendants(child, matching_product_codes):
-            return True
+    # Rückwärts über die Pre-Order: Kinder werden vor ihren Eltern besucht,
+    # Treffer werden direkt an den Elternknoten weitergereicht
+    matched = [False] * len(nodes)
+    for index in range(len(nodes) - 1, -1, -1):
+        if not matched[index]:
+            typecode = nodes[index].get('full_typecode')
+            if typecode is not None and typecode in matching_product_codes:
+                matched[index] = True
+        if matched[index] and parent[index] >= 0:
+            matched[parent[index]] = True
     
-    return False
+    return {id(node): matched[index] for index, node in enumerate(nodes)}
 
 
 def inherit_groups_to_children(tree_data, target_family):
@@ -2378,36 +2819,32 @@ def inherit_groups_to_children(tree_data, target_family):
         'nodes_updated': 0
     }
     
-    def inherit_groups_recursive(node, parent_group=None):
-        """Rekursive Hilfsfunktion für Group-Vererbung"""
-        current_group = parent_group
-        
-        # Wenn dieser Node eine eigene Group hat, verwende diese
-        if 'group' in node and node['group']:
-            current_group = node['group']
-        # Wenn dieser Node keine Group hat, aber ein Parent eine hat, vererbe sie
-        elif 'group' in node and not node['group'] and parent_group:
-            node['group'] = parent_group
-            current_group = parent_group
-            stats['groups_inherited'] += 1
-            stats['nodes_updated'] += 1
-        
-        # Rekursiv auf alle Children anwenden
-        if 'children' in node:
-            for child in node['children']:
-                inherit_groups_recursive(child, current_group)
-        
-        # Für Pattern-Nodes
-        if isinstance(node, dict) and 'children' in node:
-            for child in node['children']:
-                if isinstance(child, dict):
-                    inherit_groups_recursive(child, current_group)
+    def inherit_groups_iterative(root):
+        """Iterative Hilfsfunktion für Group-Vererbung (expliziter Stack statt Rekursion)"""
+        # Stack-Einträge: (node, parent_group)
+        stack = deque([(root, None)])
+        while stack:
+            node, parent_group = stack.pop()
+            
+            # Eigene Group hat Vorrang, sonst gilt die des Parents
+            current_group = node.get('group') or parent_group
+            
+            # Wenn dieser Node ein leeres 'group' Attribut hat, aber ein Parent eine Group hat, vererbe sie
+            if parent_group and 'group' in node and not node['group']:
+                node['group'] = parent_group
+                stats['groups_inherited'] += 1
+                stats['nodes_updated'] += 1
+            
+            # Children (inkl. Pattern-Nodes) einmalig auf den Stack legen
+            children = node.get('children')
+            if children:
+                stack.extend((child, current_group) for child in reversed(children))
     
     # Starte die Vererbung nur für die angegebene Familie
     if 'children' in tree_data:
         for family_node in tree_data['children']:
             if family_node.get('code') == target_family:
-                inherit_groups_recursive(family_node)
+                inherit_groups_iterative(family_node)
                 break
     
     return stats
@@ -2452,9 +2889,18 @@ Beispiele:
     parser.add_argument('--verbose', '-v',
                        action='store_true',
                        help='Zeige detaillierte Ausgaben')
+    parser.add_argument('--compact',
+                       action='store_true',
+                       help='Speichere Variantenbaum ohne Einrückung (kleiner und schneller)')
+    parser.add_argument('--first-match-only',
+                       action='store_true',
+                       help='General-Mappings: Durchlauf beenden, sobald jeder Code einmal gelabelt wurde (weitere Vorkommen bleiben ungelabelt)')
     
     args = parser.parse_args()
     
+    # --verbose schaltet die Debug-Ausgaben (z.B. Detaillisten der angewendeten Labels) frei
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING, format='%(message)s')
+    
     # BATCH-MODUS: Verzeichnis mit mehreren Mappings
     if args.batch:
         if not Path(args.batch).is_dir():
@@ -2467,7 +2913,9 @@ Beispiele:
             dry_run=args.dry_run,
             backup=args.backup,
             output=args.output,
-            verbose=args.verbose
+            verbose=args.verbose,
+            compact=args.compact,
+            first_match_only=args.first_match_only
         )
         
         if batch_stats is None:
@@ -2513,11 +2961,11 @@ Beispiele:
     
     # Lade Variantenbaum
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            tree_data = json.load(f)
+        tree_data = load_tree_json(json_file)
     except Exception as e:
         print(f"❌ Fehler beim Laden des Variantenbaums: {e}")
         sys.exit(1)
+    intern_tree_strings(tree_data)
     
     # Finde passende Produkte
     print("SUCHE NACH PASSENDEN PRODUKTEN...")
@@ -2563,13 +3011,18 @@ Beispiele:
         print("KEINE PRODUKTE GEFUNDEN die den Filter-Kriterien entsprechen.")
         sys.exit(1)
     
+    # Typcode-Menge einmalig für alle Mapping-Phasen aufbauen
+    matching_product_codes = build_matching_product_codes(results['matching_products'])
+    # Nachkommen-Index einmalig für alle Phasen aufbauen (die Baumstruktur ändert sich dabei nicht)
+    descendant_match_index = build_descendant_match_index(tree_data, matching_product_codes)
+    
     # Erstelle Code-Lookup
     code_lookup = build_code_lookup(mapping_data.get('code_mappings', []))
     
     # Zeige die code lookup Zusammenfassung
     # print("\nCODE-LOOKUP ZUSAMMENFASSUNG:")
-    # for position, codes in code_lookup.items():
-    #     print(f"  Position {position}: {len(codes)} Codes")
+    # for position, count in count_codes_per_position(code_lookup).items():
+    #     print(f"  Position {position}: {count} Codes")
     
     # Unterscheide zwischen alten und neuen group_mappings
     group_mappings = mapping_data.get('group_mappings', [])
@@ -2612,8 +3065,8 @@ Beispiele:
     
     if args.verbose:
         print("\nCODE-LOOKUP:")
-        for position, codes in code_lookup.items():
-            print(f"  Position {position}: {len(codes)} Labels")
+        for position, count in count_codes_per_position(code_lookup).items():
+            print(f"  Position {position}: {count} Labels")
         
         if relative_group_mappings:
             print("\nRELATIVE GROUP-MAPPINGS:")
@@ -2627,8 +3080,8 @@ Beispiele:
         
         if group_lookup:
             print("\n👥 ABSOLUTE GROUP-LOOKUP (deprecated):")
-            for position, codes in group_lookup.items():
-                print(f"  Position {position}: {len(codes)} Groups")
+            for position, count in count_codes_per_position(group_lookup).items():
+                print(f"  Position {position}: {count} Groups")
         
         if global_group_mappings:
             print("\nGLOBAL-GROUP-MAPPINGS:")
@@ -2666,7 +3119,7 @@ Beispiele:
     # Wende globale Group-Mappings an
     if global_group_mappings:
         print("\nWENDE GLOBALE GROUP-MAPPINGS AN...")
-        global_stats = apply_global_group_mappings(tree_data, results['matching_products'], global_group_mappings, filter_params['product_family'], args.dry_run)
+        global_stats = apply_global_group_mappings(tree_data, results['matching_products'], global_group_mappings, filter_params['product_family'], args.dry_run, matching_product_codes=matching_product_codes, descendant_match_index=descendant_match_index)
         
         # Integriere globale Statistiken
         stats['global_groups_applied'] = global_stats['global_groups_applied']
@@ -2676,7 +3129,7 @@ Beispiele:
     # Wende Name-Mappings an (NEUE FUNKTIONALITÄT)
     if name_mappings:
         print("\nWENDE NAME-MAPPINGS AN...")
-        name_stats = apply_name_mappings(tree_data, results['matching_products'], name_mappings, filter_params['product_family'], args.dry_run)
+        name_stats = apply_name_mappings(tree_data, results['matching_products'], name_mappings, filter_params['product_family'], args.dry_run, matching_product_codes=matching_product_codes, descendant_match_index=descendant_match_index)
         
         # Integriere Name-Statistiken
         stats['names_applied'] = name_stats['names_applied']
@@ -2686,7 +3139,7 @@ Beispiele:
     # Wende General-Mappings an (NEUE FUNKTIONALITÄT)
     if general_mappings:
         print("\nWENDE GENERAL-MAPPINGS AN...")
-        general_stats = apply_general_mappings(tree_data, results['matching_products'], general_mappings, filter_params['product_family'], args.dry_run, args.verbose)
+        general_stats = apply_general_mappings(tree_data, results['matching_products'], general_mappings, filter_params['product_family'], args.dry_run, args.verbose, matching_product_codes=matching_product_codes, descendant_match_index=descendant_match_index, first_match_only=args.first_match_only)
         
         # Kombiniere General-Statistiken mit Haupt-Stats
         stats['labels_applied'] += general_stats['labels_applied']
@@ -2736,14 +3189,13 @@ Beispiele:
             create_backup(json_file)
         
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(tree_data, f, ensure_ascii=False, indent=2)
+            save_tree_json(tree_data, output_file, compact=args.compact)
             
             print(f"✅ Labeled Variantenbaum gespeichert: {output_file}")
             
             # Automatische Validierung nach dem Speichern
             print("🔍 Validiere gespeicherte Datei...")
-            if validate_saved_file(output_file):
+            if validate_saved_file(output_file, tree_data):
                 print("✅ Validation erfolgreich - Datei ist gültig")
             else:
                 print("⚠️  Validation-Warnung - bitte manuell prüfen")
@@ -2755,7 +3207,51 @@ Beispiele:
         print("INFO: Dry-run Modus: Keine Änderungen gespeichert.")
 
 
-def find_mapping_files(directory):
+def _has_filter_criteria(file_path, parsed=None):
+    """
+    Prüft, ob eine JSON-Datei ein 'filter_criteria' enthält (= Mapping-Datei).
+    
+    Mit ijson wird die Datei nur bis zum ersten passenden Top-Level-Schlüssel gelesen,
+    statt sie vollständig zu parsen. Ohne ijson (oder bei unvollständigem JSON vor dem
+    Schlüssel) wird wie bisher die ganze Datei geladen.
+    
+    Args:
+        file_path: Pfad zur JSON-Datei
+        parsed: Optional dict - vollständig geladene Dateien werden darin abgelegt (Pfad -> Daten)
+        
+    Returns:
+        bool: True wenn 'filter_criteria' vorhanden ist
+        
+    Raises:
+        Exception: Bei ungültigen JSON-Dateien (vom Aufrufer ignoriert)
+    """
+    if IJSON_AVAILABLE:
+        try:
+            with open(file_path, 'rb') as f:
+                for prefix, event, value in ijson.parse(f):
+                    # Nur Ereignisse der obersten Ebene sind relevant
+                    if prefix != '':
+                        continue
+                    if event == 'map_key':
+                        if value == 'filter_criteria':
+                            return True
+                    elif event == 'end_map':
+                        return False
+                    elif event == 'start_array':
+                        # Kein Objekt auf oberster Ebene -> vollständig prüfen
+                        break
+        except ijson.IncompleteJSONError:
+            pass
+    
+    data = load_tree_json(file_path)
+    if 'filter_criteria' not in data:
+        return False
+    if parsed is not None:
+        parsed[file_path] = data
+    return True
+
+
+def find_mapping_files(directory, parsed=None):
     """
     Findet alle JSON-Mapping-Dateien in einem Verzeichnis (rekursiv).
     
@@ -2777,50 +3273,86 @@ def find_mapping_files(directory):
     
     Args:
         directory: Pfad zum Verzeichnis
+        parsed: Optional dict - wird mit bereits beim Prüfen vollständig geladenen
+                Mapping-Dateien befüllt (Pfad -> Daten), damit sie nicht erneut
+                geparst werden müssen. Überschreiten die Kandidaten zusammen
+                MAPPING_CACHE_MAX_BYTES, bleibt es leer.
         
     Returns:
         Liste von Pfaden zu Mapping-Dateien (sortiert wie VSCode Tree)
     """
     mapping_files = []
-    base_path = Path(directory)
+    # Path normalisiert den Startpfad (z.B. './mappings/' -> 'mappings'), entry.path baut darauf auf
+    base_path = str(Path(directory))
     
     def scan_directory(current_path):
         """Rekursiv scannen in Depth-First Reihenfolge."""
-        items = []
-        
-        # Sammle alle Items im aktuellen Verzeichnis
+        # Einträge in einem Durchlauf in JSON-Dateien und Unterverzeichnisse aufteilen.
+        # os.scandir liefert den Dateityp bereits beim Lesen des Verzeichnisses mit,
+        # is_file()/is_dir() brauchen dadurch (außer bei Symlinks) keinen weiteren stat-Aufruf.
+        # Sortiert werden danach nur diese beiden Listen, alle anderen Einträge fallen vorher weg.
+        json_files = []
+        subdirectories = []
         try:
-            for item in sorted(current_path.iterdir()):
-                items.append(item)
+            with os.scandir(current_path) as it:
+                for entry in it:
+                    if entry.is_file():
+                        if os.path.splitext(entry.name)[1] == '.json':
+                            json_files.append(entry)
+                    elif entry.is_dir() and not entry.name.startswith('.'):
+                        subdirectories.append(entry)
         except PermissionError:
             return
         
         # Verarbeite erst Dateien, dann Verzeichnisse (VSCode-Stil)
         # 1. Dateien in diesem Verzeichnis
-        for item in items:
-            if item.is_file() and item.suffix == '.json':
-                # Prüfe ob es eine gültige Mapping-Datei ist
-                try:
-                    with open(item, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        if 'filter_criteria' in data:
-                            mapping_files.append(str(item))
-                except Exception:
-                    # Ignoriere ungültige JSON-Dateien
-                    pass
+        # normcase entspricht dem Vergleich von Path-Objekten (unter Windows ohne Groß-/Kleinschreibung)
+        json_files.sort(key=lambda entry: os.path.normcase(entry.name))
+        for entry in json_files:
+            # Nur vormerken - Inhalt wird unten parallel geprüft
+            candidates.append(entry.path)
+            if parsed is not None:
+                candidate_bytes[0] += entry.stat().st_size
         
         # 2. Unterverzeichnisse (rekursiv)
-        for item in items:
-            if item.is_dir() and not item.name.startswith('.'):
-                scan_directory(item)
+        subdirectories.sort(key=lambda entry: os.path.normcase(entry.name))
+        for entry in subdirectories:
+            scan_directory(entry.path)
+    
+    def is_mapping_file(file_path):
+        """Prüft ob es eine gültige Mapping-Datei ist."""
+        try:
+            return _has_filter_criteria(file_path, cache)
+        except Exception:
+            # Ignoriere ungültige JSON-Dateien
+            return False
     
-    # Starte Scan
+    # Starte Scan (nur Verzeichnisse lesen, noch keine Datei öffnen)
+    candidates = []
+    candidate_bytes = [0]
     scan_directory(base_path)
     
+    # Geparste Inhalte nur behalten, solange der RAM-Bedarf überschaubar bleibt
+    cache = parsed if candidate_bytes[0] <= MAPPING_CACHE_MAX_BYTES else None
+    
+    # Kandidaten parallel öffnen und prüfen: die Arbeit ist I/O-gebunden,
+    # gleichzeitige Lesezugriffe verdecken die Latenz der einzelnen Dateien.
+    # executor.map liefert die Ergebnisse in Eingabereihenfolge -> Sortierung bleibt erhalten.
+    if len(candidates) > 1:
+        max_workers = min(32, (os.cpu_count() or 1) * 4, len(candidates))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(is_mapping_file, candidates))
+    else:
+        results = [is_mapping_file(file_path) for file_path in candidates]
+    
+    for file_path, is_mapping in zip(candidates, results):
+        if is_mapping:
+            mapping_files.append(file_path)
+    
     return mapping_files
 
 
-def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=False, output=None, verbose=False):
+def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=False, output=None, verbose=False, compact=False, first_match_only=False):
     """
     Verarbeitet alle Mapping-Dateien in einem Verzeichnis sequentiell.
     
@@ -2834,6 +3366,8 @@ def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=Fa
         backup: Backup erstellen
         output: Ausgabe-Datei
         verbose: Detaillierte Ausgaben
+        compact: Variantenbaum ohne Einrückung speichern
+        first_match_only: General-Mappings nur bis zum ersten Treffer jedes Codes anwenden
         
     Returns:
         dict: Statistiken über alle Mappings
@@ -2842,17 +3376,20 @@ def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=Fa
     print("BATCH-VERARBEITUNG VON MAPPING-DATEIEN")
     print("=" * 80)
     
-    # Finde alle Mapping-Dateien
-    mapping_files = find_mapping_files(mapping_dir)
+    # Finde alle Mapping-Dateien (beim Prüfen geladene Inhalte werden weiterverwendet)
+    parsed_mappings = {}
+    mapping_files = find_mapping_files(mapping_dir, parsed_mappings)
     
     if not mapping_files:
         print(f"❌ Keine Mapping-Dateien gefunden in: {mapping_dir}")
         return None
     
+    # Relative Pfade einmalig berechnen (für Übersicht, Fortschritt und Statistik)
+    rel_paths = [str(Path(mf).relative_to(mapping_dir)) for mf in mapping_files]
+    
     print(f"📁 Verzeichnis: {mapping_dir}")
     print(f"📄 Gefundene Mapping-Dateien: {len(mapping_files)}")
-    for i, mf in enumerate(mapping_files, 1):
-        rel_path = Path(mf).relative_to(mapping_dir)
+    for i, rel_path in enumerate(rel_paths, 1):
         print(f"   {i}. {rel_path}")
     print()
     
@@ -2862,8 +3399,8 @@ def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=Fa
     # Lade Baum EINMAL
     print(f"📦 Lade Variantenbaum: {json_file}")
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            tree_data = json.load(f)
+        tree_data = load_tree_json(json_file)
+        intern_tree_strings(tree_data)
         print(f"✅ Baum geladen")
     except FileNotFoundError:
         print(f"❌ Fehler: Datei nicht gefunden: {json_file}")
@@ -2876,6 +3413,10 @@ def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=Fa
     if backup and not dry_run:
         create_backup(json_file)
     
+    # Produkt-Index und flachen Baum EINMAL aufbauen: die Mappings ändern nur Labels/Groups, nie die Baumstruktur
+    product_index = build_product_index(tree_data)
+    flat_tree = flatten_tree(tree_data)
+    
     # Batch-Statistiken
     batch_stats = {
         'total_mappings': len(mapping_files),
@@ -2887,54 +3428,91 @@ def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=Fa
         'mapping_results': []
     }
     
+    # Memo für Filter-Parameter: wiederkehrende filter_criteria (z.B. mehrere Dateien derselben
+    # Familie) werden nur einmal geparst. Schlüssel ist der kanonische JSON-Text der (kleinen)
+    # filter_criteria; die Parameter werden von den Phasen nur gelesen.
+    filter_params_cache = {}
+    
+    # Familien, deren Group-Vererbung aktuell ist. Die Vererbung ist idempotent und muss
+    # erst wieder laufen, wenn ein Mapping Groups in der Familie neu gesetzt hat
+    # (in der Batch-Verarbeitung nur über Group-Werte in code_mappings).
+    inherited_families = set()
+    
+    # Statuszeilen des aktuellen Mappings: gesammelt und gebündelt mit einem write geschrieben,
+    # statt bei umgeleiteter Ausgabe (Pipe/CI-Log) jede Zeile einzeln abzusetzen
+    status_lines = []
+    
+    def write_status_lines():
+        if status_lines:
+            sys.stdout.write('\n'.join(status_lines) + '\n')
+            status_lines.clear()
+    
     # Verarbeite jedes Mapping sequentiell
     print("\n" + "=" * 80)
     print("VERARBEITE MAPPINGS")
     print("=" * 80)
     
-    for i, mapping_file in enumerate(mapping_files, 1):
-        rel_path = Path(mapping_file).relative_to(mapping_dir)
-        print(f"\n[{i}/{len(mapping_files)}] {rel_path}")
-        print("-" * 80)
+    for i, (mapping_file, rel_path) in enumerate(zip(mapping_files, rel_paths), 1):
+        status_lines.append(f"\n[{i}/{len(mapping_files)}] {rel_path}")
+        status_lines.append("-" * 80)
         
-        start_time = datetime.now()
+        start_ns = time.perf_counter_ns()
         
         try:
             # Lade Mapping
-            mapping_data = load_mapping_file(mapping_file)
+            mapping_data = load_mapping_file(mapping_file, parsed_mappings.pop(mapping_file, None))
             if mapping_data is None:
-                print(f"⚠️  Überspringe ungültiges Mapping: {rel_path}")
+                status_lines.append(f"⚠️  Überspringe ungültiges Mapping: {rel_path}")
                 batch_stats['failed_mappings'] += 1
                 continue
             
             # Parse Filter
             filter_criteria = mapping_data['filter_criteria']
-            filter_params = parse_filter_criteria(filter_criteria)
+            filter_key = json.dumps(filter_criteria, sort_keys=True, ensure_ascii=False)
+            filter_params = filter_params_cache.get(filter_key)
+            if filter_params is None:
+                filter_params = filter_params_cache[filter_key] = parse_filter_criteria(filter_criteria)
             
             # Zeige kurze Zusammenfassung
             family = filter_params.get('product_family', 'N/A')
-            print(f"   Familie: {family}")
+            status_lines.append(f"   Familie: {family}")
+            
+            # Leere target_schemas-Liste wie im Einzel-Modus als None behandeln
+            target_schemas_param = filter_params['target_schemas']
+            if isinstance(target_schemas_param, list) and len(target_schemas_param) == 0:
+                target_schemas_param = None
             
-            # Finde passende Produkte
+            # Finde passende Produkte (über den einmalig aufgebauten Produkt-Index)
             results = find_products_by_schema(
                 tree_data,
-                filter_params['product_family'],
-                filter_params['target_schemas'],
-                filter_params['pattern_rules'],
-                filter_params['position_rules'],
-                filter_params['group_start_rules'],
-                filter_params['group_rules'],
-                filter_params['group_position_filter'],
-                filter_params['group_count_filter']
+                target_schemas=target_schemas_param,
+                product_family=filter_params['product_family'],
+                pattern_rules=filter_params['pattern_rules'],
+                group_position_rules=filter_params['group_position_filter'],
+                position_rules=filter_params['position_rules'],
+                group_start_rules=filter_params['group_start_rules'],
+                group_rules=filter_params['group_rules'],
+                group_count_config=filter_params['group_count_filter'],
+                and_mode=filter_params['and_mode'],
+                negate_exclude=filter_params['negate_exclude'],
+                product_index=product_index
             )
             
-            print(f"   Passende Produkte: {results['match_count']:,}")
+            status_lines.append(f"   Passende Produkte: {results['match_count']:,}")
+            # Kopfzeilen vor den Mapping-Phasen schreiben: der Fortschritt ist sofort sichtbar
+            # und Warnungen der Phasen erscheinen wie bisher hinter dem Kopf des Mappings
+            write_status_lines()
+            
+            # Typcode-Menge einmalig für alle Mapping-Phasen aufbauen
+            matching_product_codes = build_matching_product_codes(results['matching_products'])
+            # Nachkommen-Index einmalig für alle Phasen aufbauen (die Baumstruktur ändert sich dabei nicht)
+            descendant_match_index = build_descendant_match_index(tree_data, matching_product_codes, flat_tree=flat_tree)
             
             # Wende Mappings an
             stats = {
                 'labels_applied': 0,
                 'labels_updated': 0,
-                'nodes_labeled': [],
+                'nodes_labeled_count': 0,
                 'groups_applied': 0,
                 'groups_updated': 0
             }
@@ -2944,10 +3522,12 @@ def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=Fa
             if code_mappings:
                 code_lookup = build_code_lookup(code_mappings)
                 group_lookup = build_group_lookup(code_mappings)
+                if group_lookup:
+                    inherited_families.discard(filter_params['product_family'])
                 code_stats = apply_labels_to_tree(tree_data, results['matching_products'], code_lookup, group_lookup, filter_params['product_family'], dry_run)
                 stats['labels_applied'] += code_stats['labels_applied']
                 stats['labels_updated'] += code_stats['labels_updated']
-                stats['nodes_labeled'].extend(code_stats['nodes_labeled'])
+                stats['nodes_labeled_count'] += len(code_stats['nodes_labeled'])
             
             # Group-Mappings
             group_mappings = mapping_data.get('group_mappings', [])
@@ -2955,7 +3535,7 @@ def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=Fa
                 group_stats = apply_relative_group_mappings(tree_data, results['matching_products'], group_mappings, filter_params['product_family'], dry_run, verbose)
                 stats['labels_applied'] += group_stats['labels_applied']
                 stats['labels_updated'] += group_stats['labels_updated']
-                stats['nodes_labeled'].extend(group_stats['nodes_labeled'])
+                stats['nodes_labeled_count'] += len(group_stats['nodes_labeled'])
             
             # Special-Mappings
             special_mappings = mapping_data.get('special_mappings', [])
@@ -2963,40 +3543,41 @@ def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=Fa
                 special_stats = apply_special_mappings(tree_data, results['matching_products'], special_mappings, filter_params['product_family'], dry_run, verbose)
                 stats['labels_applied'] += special_stats['labels_applied']
                 stats['labels_updated'] += special_stats['labels_updated']
-                stats['nodes_labeled'].extend(special_stats['nodes_labeled'])
+                stats['nodes_labeled_count'] += len(special_stats['nodes_labeled'])
             
             # General-Mappings
             general_mappings = mapping_data.get('general_mappings', [])
             if general_mappings:
-                general_stats = apply_general_mappings(tree_data, results['matching_products'], general_mappings, filter_params['product_family'], dry_run, verbose)
+                general_stats = apply_general_mappings(tree_data, results['matching_products'], general_mappings, filter_params['product_family'], dry_run, verbose, matching_product_codes=matching_product_codes, descendant_match_index=descendant_match_index, first_match_only=first_match_only)
                 stats['labels_applied'] += general_stats['labels_applied']
                 stats['labels_updated'] += general_stats['labels_updated']
-                stats['nodes_labeled'].extend(general_stats['nodes_labeled'])
+                stats['nodes_labeled_count'] += len(general_stats['nodes_labeled'])
             
             # Name-Mappings
             name_mappings = mapping_data.get('name_mappings', [])
             if name_mappings:
-                name_stats = apply_name_mappings(tree_data, results['matching_products'], name_mappings, filter_params['product_family'], dry_run)
+                name_stats = apply_name_mappings(tree_data, results['matching_products'], name_mappings, filter_params['product_family'], dry_run, matching_product_codes=matching_product_codes, descendant_match_index=descendant_match_index)
                 stats['names_applied'] = name_stats['names_applied']
                 stats['names_updated'] = name_stats['names_updated']
             
-            # Vererbe Groups
-            if not dry_run:
+            # Vererbe Groups (nur falls sich seit dem letzten Durchlauf Groups der Familie geändert haben)
+            if not dry_run and filter_params['product_family'] not in inherited_families:
                 inheritance_stats = inherit_groups_to_children(tree_data, filter_params['product_family'])
+                inherited_families.add(filter_params['product_family'])
             
             # Zeige Ergebnis
-            duration = (datetime.now() - start_time).total_seconds()
-            print(f"   ✅ Labels angewendet: {stats['labels_applied']}")
-            print(f"   ✅ Labels aktualisiert: {stats['labels_updated']}")
-            print(f"   ⏱️  Dauer: {duration:.2f}s")
+            duration = (time.perf_counter_ns() - start_ns) / 1e9
+            status_lines.append(f"   ✅ Labels angewendet: {stats['labels_applied']}")
+            status_lines.append(f"   ✅ Labels aktualisiert: {stats['labels_updated']}")
+            status_lines.append(f"   ⏱️  Dauer: {duration:.2f}s")
             
             # Update Batch-Stats
             batch_stats['successful_mappings'] += 1
             batch_stats['total_labels_applied'] += stats['labels_applied']
             batch_stats['total_labels_updated'] += stats['labels_updated']
-            batch_stats['total_nodes_labeled'] += len(stats['nodes_labeled'])
+            batch_stats['total_nodes_labeled'] += stats['nodes_labeled_count']
             batch_stats['mapping_results'].append({
-                'file': str(rel_path),
+                'file': rel_path,
                 'family': family,
                 'labels_applied': stats['labels_applied'],
                 'labels_updated': stats['labels_updated'],
@@ -3004,11 +3585,15 @@ def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=Fa
             })
             
         except Exception as e:
-            print(f"   ❌ FEHLER: {e}")
+            status_lines.append(f"   ❌ FEHLER: {e}")
             if verbose:
-                import traceback
+                # Traceback geht nach stderr: vorher die Statuszeilen schreiben, damit die Reihenfolge stimmt
+                write_status_lines()
+                sys.stdout.flush()
                 traceback.print_exc()
             batch_stats['failed_mappings'] += 1
+        finally:
+            write_status_lines()
     
     # Speichere Ergebnis (nur einmal am Ende!)
     if not dry_run:
@@ -3019,14 +3604,13 @@ def batch_process_mappings(mapping_dir, tree_file=None, dry_run=False, backup=Fa
         print("=" * 80)
         
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(tree_data, f, ensure_ascii=False, indent=2)
+            save_tree_json(tree_data, output_file, compact=compact)
             
             print(f"✅ Labeled Variantenbaum gespeichert: {output_file}")
             
             # Validierung
             print("🔍 Validiere gespeicherte Datei...")
-            if validate_saved_file(output_file):
+            if validate_saved_file(output_file, tree_data):
                 print("✅ Validation erfolgreich")
             else:
                 print("⚠️  Validation-Warnung")
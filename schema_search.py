@@ -15,15 +15,211 @@ Beispiele:
 """
 
 import json
+import mmap
+import os
+import pickle
+import re
 import sys
+import time
 import argparse
+import io
 from pathlib import Path
-from datetime import datetime
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+
+# orjson (optional): deutlich schnelleres Laden großer Bäume und Schreiben des Filter-Exports, sonst Standard-json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# pyahocorasick (optional): ein Durchlauf pro Produkt für viele Contains-Suchwerte, sonst Schleife mit 'in'
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Ab dieser Anzahl Contains-Suchwerte lohnt sich der Automat gegenüber einzelnen 'in'-Suchen
+AHOCORASICK_MIN_NEEDLES = 8
 
 # JSON file in der die Suche durchgeführt wird
 # JSONFILE = "output/variantenbaum.json"
 JSONFILE = "output/baum.json"
 
+# Format-Version der Produkt-Tupel aus build_product_index (für den Pickle-Cache, bei Änderungen erhöhen)
+PRODUCT_INDEX_VERSION = 1
+
+
+class _RuleAccess:
+    """Dict-kompatibler Zugriff (rule['feld'], rule.get('feld')) für die Filter-Regeln."""
+    __slots__ = ()
+    
+    def __getitem__(self, key):
+        # Nur Felder, nicht die Methoden (get) zurückgeben
+        if isinstance(key, str) and key in self.__dataclass_fields__:
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__dataclass_fields__ else default
+
+
+# Schlanke, unveränderliche und hashbare Filter-Regeln (statt eines Dicts pro Regel).
+# slots=True: direkter Slot-Zugriff in den Matchern, weniger Speicher als ein Tupel.
+# Ausgabe/Export nutzt weiter rule['feld'].
+@dataclass(slots=True, frozen=True)
+class PatternRule(_RuleAccess):
+    position: object  # int oder 'last'
+    min_len: int
+    max_len: int
+    negate: bool
+
+
+@dataclass(slots=True, frozen=True)
+class GroupLengthRule(_RuleAccess):
+    type: str
+    group: int
+    allowed_lengths: tuple
+
+
+@dataclass(slots=True, frozen=True)
+class PositionRule(_RuleAccess):
+    position: int
+    value: str
+    is_prefix: bool
+
+
+@dataclass(slots=True, frozen=True)
+class GroupStartRule(_RuleAccess):
+    group: int
+    start_position: int
+
+
+@dataclass(slots=True, frozen=True)
+class ContainsRule(_RuleAccess):
+    value: str
+    case_sensitive: bool
+    or_group: int
+    value_upper: str  # beim Parsen einmalig berechnet, für Suchen ohne :case
+
+
+@dataclass(slots=True, frozen=True)
+class GroupValueRule(_RuleAccess):
+    group: int
+    value: str
+    is_prefix: bool
+
+
+@dataclass(slots=True, frozen=True)
+class GroupPositionRule(_RuleAccess):
+    group: int
+    start_pos: int
+    end_pos: int
+    value: str
+    negate: bool
+    is_prefix: bool
+    explicit_range: bool
+
+
+def load_json_file(file_path):
+    """
+    Lädt eine JSON-Datei. Mit orjson wird direkt aus der per mmap gemappten Datei geparst,
+    ohne die Bytes vorher in den Python-Heap zu kopieren; sonst Standard-json.
+    
+    orjson akzeptiert nur striktes JSON: bei NaN/Infinity (oder sonst nicht lesbaren Dateien)
+    wird mit json.load erneut gelesen, Fehler kommen dann wie bisher als json.JSONDecodeError.
+    Ganzzahlen über 64 Bit liest orjson dagegen ohne Fehler als float (Genauigkeitsverlust);
+    exakt bleiben solche Werte nur ohne orjson.
+    
+    Args:
+        file_path: Pfad zur JSON-Datei
+        
+    Returns:
+        Geladene JSON-Daten
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    # Leere Datei lässt sich nicht mappen -> orjson meldet den JSONDecodeError
+                    return orjson.loads(f.read())
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    with memoryview(mapped) as view:
+                        return orjson.loads(view)
+        except orjson.JSONDecodeError:
+            # Kein striktes JSON -> Standard-json (akzeptiert NaN/Infinity, meldet echte Syntaxfehler)
+            pass
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_json_file_cached(file_path, with_product_index=False):
+    """
+    Lädt eine JSON-Datei über einen Pickle-Cache neben der Datei (z.B. output/.baum.json.cache.pkl).
+    
+    Nur auf ausdrücklichen Wunsch verwenden (CLI: --cache): der Cache wird neben der Datei
+    geschrieben und beim nächsten Aufruf ungeprüft entpickelt.
+    
+    Der Cache enthält zuerst einen Kopf (mtime_ns, Größe) der Quelldatei und danach die Daten.
+    Passt der Kopf nicht mehr, wird die JSON-Datei neu geladen und der Cache neu geschrieben.
+    Fehler beim Lesen oder Schreiben des Caches werden gemeldet und führen zum normalen Laden.
+    
+    Mit with_product_index wird der Produkt-Index (build_product_index) zusammen mit den Daten
+    gespeichert; pickle erhält dabei die Verweise des Index auf die Knoten der Daten.
+    
+    Args:
+        file_path: Pfad zur JSON-Datei
+        with_product_index: Zusätzlich den Produkt-Index laden bzw. aufbauen und cachen
+        
+    Returns:
+        Geladene JSON-Daten, mit with_product_index das Tupel (Daten, Produkt-Index)
+    """
+    path = Path(file_path)
+    cache_path = path.with_name(f".{path.name}.cache.pkl")
+    stat = path.stat()
+    # Index-Version im Kopf: ein Cache mit anderem Inhalt oder älterem Index-Format wird neu geschrieben
+    key = (stat.st_mtime_ns, stat.st_size, PRODUCT_INDEX_VERSION if with_product_index else None)
+    
+    try:
+        with open(cache_path, 'rb') as f:
+            if pickle.load(f) == key:
+                return pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        # Beschädigter oder fremder Cache: melden und neu aufbauen
+        print(f"⚠️  Cache {cache_path} nicht lesbar, lade JSON neu: {e}", file=sys.stderr)
+    
+    data = load_json_file(path)
+    if with_product_index:
+        data = (data, build_product_index(data))
+    
+    # Atomar schreiben, damit parallele Aufrufe nie einen halben Cache lesen
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except (OSError, pickle.PickleError, RecursionError) as e:
+        print(f"⚠️  Cache {cache_path} konnte nicht geschrieben werden: {e}", file=sys.stderr)
+    finally:
+        # Nach os.replace existiert die Temp-Datei nicht mehr, sonst Reste entfernen
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    
+    return data
+
+
+def _split_strip(text, sep=','):
+    """Zerlegt einen Filter-String an sep und liefert die getrimmten, nicht-leeren Teile."""
+    return [part for part in map(str.strip, text.split(sep)) if part]
+
 
 def parse_multiple_schemas(schema_args):
     """
@@ -60,10 +256,9 @@ def parse_schema(schema_str):
     """
     try:
         # Prüfe auf :prefix Suffix
-        is_prefix = False
-        if ':prefix' in schema_str:
-            schema_str = schema_str.replace(':prefix', '')
-            is_prefix = True
+        stripped = schema_str.strip()
+        schema_str = stripped.removesuffix(':prefix')
+        is_prefix = len(schema_str) != len(stripped)
         
         # Entferne Klammern und Leerzeichen
         clean_str = schema_str.strip('[]').replace(' ', '')
@@ -79,6 +274,7 @@ def parse_schema(schema_str):
         return None
 
 
+@lru_cache(maxsize=256)
 def parse_pattern_filter(pattern_str):
     """
     Parst einen Pattern-Filter-String zu einer Liste von Regeln.
@@ -89,7 +285,7 @@ def parse_pattern_filter(pattern_str):
             - Neues Format (Gruppen-Längen): "1:2|3|4,2:4|5"
         
     Returns:
-        list: Liste von Dictionaries mit Pattern-Regeln oder None bei Fehlern
+        tuple: Unveränderliches Tupel von Pattern-Regeln (PatternRule bzw. GroupLengthRule) oder None bei Fehlern
         
     Beispiele (altes Format):
         "1=3,2=4" → [{'position': 1, 'min_len': 3, 'max_len': 3, 'negate': False}, {'position': 2, 'min_len': 4, 'max_len': 4, 'negate': False}]
@@ -101,7 +297,7 @@ def parse_pattern_filter(pattern_str):
                            {'type': 'group_length', 'group': 2, 'allowed_lengths': [4,5]}]
     """
     if not pattern_str:
-        return []
+        return ()
     
     # Erkenne Format: Wenn ":" enthalten ist und kein "=" → neues Gruppen-Längen-Format
     if ':' in pattern_str and '=' not in pattern_str:
@@ -110,17 +306,17 @@ def parse_pattern_filter(pattern_str):
     # Altes Format (Position-basiert)
     try:
         rules = []
-        parts = [p.strip() for p in pattern_str.split(',') if p.strip()]
+        parts = _split_strip(pattern_str)
         
         for part in parts:
             # Prüfe auf != (ungleich) oder = (gleich)
             negate = False
             if '!=' in part:
                 negate = True
-                position_str, length_str = part.split('!=', 1)
+                position_str, _, length_str = part.partition('!=')
             elif '=' in part:
                 negate = False
-                position_str, length_str = part.split('=', 1)
+                position_str, _, length_str = part.partition('=')
             else:
                 continue
                 
@@ -137,7 +333,7 @@ def parse_pattern_filter(pattern_str):
             
             # Parse Länge (kann Bereich sein: "3-5" oder einzelner Wert: "4")
             if '-' in length_str:
-                min_str, max_str = length_str.split('-', 1)
+                min_str, _, max_str = length_str.partition('-')
                 min_len = int(min_str.strip())
                 max_len = int(max_str.strip())
                 if min_len > max_len:
@@ -148,18 +344,14 @@ def parse_pattern_filter(pattern_str):
             if min_len < 0 or max_len < 0:
                 raise ValueError("Längen müssen >= 0 sein")
             
-            rules.append({
-                'position': position,
-                'min_len': min_len,
-                'max_len': max_len,
-                'negate': negate
-            })
+            rules.append(PatternRule(position, min_len, max_len, negate))
         
-        return rules
+        return tuple(rules)
     except (ValueError, AttributeError) as e:
         return None
 
 
+@lru_cache(maxsize=256)
 def parse_group_length_pattern(pattern_str):
     """
     Parst Gruppen-Längen-Pattern im Format "1:2|3|4,2:4|5"
@@ -168,26 +360,26 @@ def parse_group_length_pattern(pattern_str):
         pattern_str: String im Format "gruppe:länge|länge|länge,gruppe:länge|länge"
         
     Returns:
-        list: Liste von Dictionaries mit Gruppen-Längen-Regeln
+        tuple: Unveränderliches Tupel von Gruppen-Längen-Regeln (GroupLengthRule)
         
     Beispiel:
         "1:2|3|4,2:4|5" → [{'type': 'group_length', 'group': 1, 'allowed_lengths': [2,3,4]},
                            {'type': 'group_length', 'group': 2, 'allowed_lengths': [4,5]}]
     """
     if not pattern_str:
-        return []
+        return ()
     
     try:
         rules = []
         # Split by comma to get individual group rules
-        group_parts = [p.strip() for p in pattern_str.split(',') if p.strip()]
+        group_parts = _split_strip(pattern_str)
         
         for part in group_parts:
             # Format: "gruppe:länge|länge|länge"
             if ':' not in part:
                 continue
                 
-            group_str, lengths_str = part.split(':', 1)
+            group_str, _, lengths_str = part.partition(':')
             group_num = int(group_str.strip())
             
             # Parse allowed lengths (separated by |)
@@ -197,18 +389,15 @@ def parse_group_length_pattern(pattern_str):
             if not allowed_lengths:
                 continue
                 
-            rules.append({
-                'type': 'group_length',
-                'group': group_num,
-                'allowed_lengths': sorted(allowed_lengths)
-            })
+            rules.append(GroupLengthRule('group_length', group_num, tuple(sorted(allowed_lengths))))
         
-        return rules
+        return tuple(rules)
     except (ValueError, AttributeError) as e:
         print(f"⚠️  Fehler beim Parsen von Gruppen-Längen-Pattern '{pattern_str}': {e}")
         return None
 
 
+@lru_cache(maxsize=256)
 def parse_position_filter(position_str):
     """
     Parst einen Absolute-Position-Filter-String zu einer Liste von Regeln.
@@ -217,7 +406,7 @@ def parse_position_filter(position_str):
         position_str: String im Format "5=M,11=PX" oder "5=M423,22=PX0334" oder "5=M:prefix"
         
     Returns:
-        list: Liste von Dictionaries mit Position-Regeln oder None bei Fehlern
+        tuple: Unveränderliches Tupel von Position-Regeln (PositionRule) oder None bei Fehlern
         
     Beispiele:
         "5=M,11=PX" → [{'position': 5, 'value': 'M', 'is_prefix': False}, {'position': 11, 'value': 'PX', 'is_prefix': False}]
@@ -226,26 +415,22 @@ def parse_position_filter(position_str):
         "5=M:prefix,22=PX0334" → [{'position': 5, 'value': 'M', 'is_prefix': True}, {'position': 22, 'value': 'PX0334', 'is_prefix': False}]
     """
     if not position_str:
-        return []
+        return ()
     
     try:
         rules = []
-        parts = [p.strip() for p in position_str.split(',') if p.strip()]
+        parts = _split_strip(position_str)
         
         for part in parts:
             if '=' not in part:
                 continue
                 
-            position_str_part, value_with_prefix = part.split('=', 1)
+            position_str_part, _, value_with_prefix = part.partition('=')
             position = int(position_str_part.strip())
             
             # Prüfe auf :prefix Suffix
-            is_prefix = False
-            if ':prefix' in value_with_prefix:
-                value = value_with_prefix.replace(':prefix', '')
-                is_prefix = True
-            else:
-                value = value_with_prefix
+            value = value_with_prefix.removesuffix(':prefix')
+            is_prefix = len(value) != len(value_with_prefix)
             
             value = value.strip()
             
@@ -255,17 +440,14 @@ def parse_position_filter(position_str):
             if not value:
                 raise ValueError("Wert darf nicht leer sein")
             
-            rules.append({
-                'position': position,
-                'value': value,
-                'is_prefix': is_prefix
-            })
+            rules.append(PositionRule(position, value, is_prefix))
         
-        return rules
+        return tuple(rules)
     except (ValueError, AttributeError) as e:
         return None
 
 
+@lru_cache(maxsize=256)
 def parse_group_start_filter(group_start_str):
     """
     Parst einen Gruppen-Start-Position-Filter-String zu einer Liste von Regeln.
@@ -274,24 +456,24 @@ def parse_group_start_filter(group_start_str):
         group_start_str: String im Format "1=5,2=9" oder "1=5"
         
     Returns:
-        list: Liste von Dictionaries mit Gruppen-Start-Regeln oder None bei Fehlern
+        tuple: Unveränderliches Tupel von Gruppen-Start-Regeln (GroupStartRule) oder None bei Fehlern
         
     Beispiele:
         "1=5,2=9" → [{'group': 1, 'start_position': 5}, {'group': 2, 'start_position': 9}]
         "1=5" → [{'group': 1, 'start_position': 5}]
     """
     if not group_start_str:
-        return []
+        return ()
     
     try:
         rules = []
-        parts = [p.strip() for p in group_start_str.split(',') if p.strip()]
+        parts = _split_strip(group_start_str)
         
         for part in parts:
             if '=' not in part:
                 continue
                 
-            group_str, position_str = part.split('=', 1)
+            group_str, _, position_str = part.partition('=')
             group = int(group_str.strip())
             position = int(position_str.strip())
             
@@ -301,16 +483,14 @@ def parse_group_start_filter(group_start_str):
             if position < 1:
                 raise ValueError(f"Start-Position muss >= 1 sein, nicht {position}")
             
-            rules.append({
-                'group': group,
-                'start_position': position
-            })
+            rules.append(GroupStartRule(group, position))
         
-        return rules
+        return tuple(rules)
     except (ValueError, AttributeError) as e:
         return None
 
 
+@lru_cache(maxsize=256)
 def parse_contains_filter(contains_str):
     """
     Parst einen Contains-Filter-String zu einer Liste von Regeln.
@@ -319,7 +499,7 @@ def parse_contains_filter(contains_str):
         contains_str: String im Format "M313" oder "M313,PX" (UND) oder "M314|M111" (ODER) oder "M313:case"
         
     Returns:
-        list: Liste von Dictionaries mit Contains-Regeln oder None bei Fehlern
+        tuple: Unveränderliches Tupel von Contains-Regeln (ContainsRule) oder None bei Fehlern
         
     Beispiele:
         "M313" → [{'value': 'M313', 'case_sensitive': False, 'or_group': 0}]
@@ -334,18 +514,18 @@ def parse_contains_filter(contains_str):
     - Kombination: "M313,PX|050" = M313 UND (PX ODER 050)
     """
     if not contains_str:
-        return []
+        return ()
     
     try:
         rules = []
         or_group_id = 0
         
         # Erst nach Komma teilen (UND-Gruppen)
-        and_parts = [p.strip() for p in contains_str.split(',') if p.strip()]
+        and_parts = _split_strip(contains_str)
         
         for and_part in and_parts:
             # Dann jede UND-Gruppe nach Pipe teilen (ODER-Alternativen)
-            or_parts = [p.strip() for p in and_part.split('|') if p.strip()]
+            or_parts = _split_strip(and_part, '|')
             
             if len(or_parts) > 1:
                 # Mehrere ODER-Alternativen in dieser UND-Gruppe
@@ -357,27 +537,21 @@ def parse_contains_filter(contains_str):
             
             for or_part in or_parts:
                 # Parse Case-Sensitivity
-                case_sensitive = False
-                if ':case' in or_part:
-                    or_part = or_part.replace(':case', '')
-                    case_sensitive = True
-                
-                value = or_part.strip()
+                value = or_part.removesuffix(':case')
+                case_sensitive = len(value) != len(or_part)
+                value = value.strip()
                 
                 if not value:
                     raise ValueError("Suchwert darf nicht leer sein")
                 
-                rules.append({
-                    'value': value,
-                    'case_sensitive': case_sensitive,
-                    'or_group': current_or_group
-                })
+                rules.append(ContainsRule(value, case_sensitive, current_or_group, value.upper()))
         
-        return rules
+        return tuple(rules)
     except (ValueError, AttributeError) as e:
         return None
 
 
+@lru_cache(maxsize=256)
 def parse_group_content_filter(group_content_str):
     """
     Parst einen Gruppen-Inhalt-Filter-String zu einer Liste von Regeln.
@@ -386,7 +560,7 @@ def parse_group_content_filter(group_content_str):
         group_content_str: String im Format "1=M313" oder "1=M:prefix,2=PX" oder "1=M313,3=050"
         
     Returns:
-        list: Liste von Dictionaries mit Gruppen-Inhalt-Regeln oder None bei Fehlern
+        tuple: Unveränderliches Tupel von Gruppen-Inhalt-Regeln (GroupValueRule) oder None bei Fehlern
         
     Beispiele:
         "1=M313" → [{'group': 1, 'value': 'M313', 'is_prefix': False}]
@@ -395,26 +569,22 @@ def parse_group_content_filter(group_content_str):
         "1=M:prefix,3=050" → [{'group': 1, 'value': 'M', 'is_prefix': True}, {'group': 3, 'value': '050', 'is_prefix': False}]
     """
     if not group_content_str:
-        return []
+        return ()
     
     try:
         rules = []
-        parts = [p.strip() for p in group_content_str.split(',') if p.strip()]
+        parts = _split_strip(group_content_str)
         
         for part in parts:
             if '=' not in part:
                 continue
                 
-            group_str, value_with_prefix = part.split('=', 1)
+            group_str, _, value_with_prefix = part.partition('=')
             group = int(group_str.strip())
             
             # Prüfe auf :prefix Suffix
-            is_prefix = False
-            if ':prefix' in value_with_prefix:
-                value = value_with_prefix.replace(':prefix', '')
-                is_prefix = True
-            else:
-                value = value_with_prefix
+            value = value_with_prefix.removesuffix(':prefix')
+            is_prefix = len(value) != len(value_with_prefix)
             
             value = value.strip()
             
@@ -424,13 +594,9 @@ def parse_group_content_filter(group_content_str):
             if not value:
                 raise ValueError("Wert darf nicht leer sein")
             
-            rules.append({
-                'group': group,
-                'value': value,
-                'is_prefix': is_prefix
-            })
+            rules.append(GroupValueRule(group, value, is_prefix))
         
-        return rules
+        return tuple(rules)
     except (ValueError, AttributeError) as e:
         return None
 
@@ -443,7 +609,7 @@ def parse_exclude_group_filter(exclude_group_str):
         exclude_group_str: String im Format "1=Z" oder "1=Z:prefix" oder "1=Z,2=ZA123" oder "3=Z:prefix,5=SPECIAL"
         
     Returns:
-        list: Liste von Dictionaries mit Exclude-Gruppen-Regeln oder None bei Fehlern
+        tuple: Unveränderliches Tupel von Exclude-Gruppen-Regeln (GroupValueRule) oder None bei Fehlern
         
     Beispiele:
         "1=Z" → [{'group': 1, 'value': 'Z', 'is_prefix': False}]
@@ -451,45 +617,8 @@ def parse_exclude_group_filter(exclude_group_str):
         "1=Z,2=SPECIAL" → [{'group': 1, 'value': 'Z', 'is_prefix': False}, {'group': 2, 'value': 'SPECIAL', 'is_prefix': False}]
         "1=Z:prefix,3=X:prefix" → [{'group': 1, 'value': 'Z', 'is_prefix': True}, {'group': 3, 'value': 'X', 'is_prefix': True}]
     """
-    if not exclude_group_str:
-        return []
-    
-    try:
-        rules = []
-        parts = [p.strip() for p in exclude_group_str.split(',') if p.strip()]
-        
-        for part in parts:
-            if '=' not in part:
-                continue
-                
-            group_str, value_with_prefix = part.split('=', 1)
-            group = int(group_str.strip())
-            
-            # Prüfe auf :prefix Suffix
-            is_prefix = False
-            if ':prefix' in value_with_prefix:
-                value = value_with_prefix.replace(':prefix', '')
-                is_prefix = True
-            else:
-                value = value_with_prefix
-            
-            value = value.strip()
-            
-            if group < 1:
-                raise ValueError(f"Gruppen-Nummer muss >= 1 sein, nicht {group}")
-            
-            if not value:
-                raise ValueError("Exclude-Wert darf nicht leer sein")
-            
-            rules.append({
-                'group': group,
-                'value': value,
-                'is_prefix': is_prefix
-            })
-        
-        return rules
-    except (ValueError, AttributeError) as e:
-        return None
+    # Gleiche Syntax wie der positive Filter, nur die Auswertung ist umgekehrt
+    return parse_group_content_filter(exclude_group_str)
 
 
 def parse_exclude_position_filter(exclude_position_str):
@@ -500,7 +629,7 @@ def parse_exclude_position_filter(exclude_position_str):
         exclude_position_str: String im Format "5=Z" oder "5=Z:prefix" oder "5=Z,22=SPECIAL" oder "5=ZA123:prefix"
         
     Returns:
-        list: Liste von Dictionaries mit Exclude-Position-Regeln oder None bei Fehlern
+        tuple: Unveränderliches Tupel von Exclude-Position-Regeln (PositionRule) oder None bei Fehlern
         
     Beispiele:
         "5=Z" → [{'position': 5, 'value': 'Z', 'is_prefix': False}]
@@ -508,45 +637,8 @@ def parse_exclude_position_filter(exclude_position_str):
         "5=Z,22=SPECIAL" → [{'position': 5, 'value': 'Z', 'is_prefix': False}, {'position': 22, 'value': 'SPECIAL', 'is_prefix': False}]
         "5=ZA123:prefix,11=X:prefix" → [{'position': 5, 'value': 'ZA123', 'is_prefix': True}, {'position': 11, 'value': 'X', 'is_prefix': True}]
     """
-    if not exclude_position_str:
-        return []
-    
-    try:
-        rules = []
-        parts = [p.strip() for p in exclude_position_str.split(',') if p.strip()]
-        
-        for part in parts:
-            if '=' not in part:
-                continue
-                
-            position_str_part, value_with_prefix = part.split('=', 1)
-            position = int(position_str_part.strip())
-            
-            # Prüfe auf :prefix Suffix
-            is_prefix = False
-            if ':prefix' in value_with_prefix:
-                value = value_with_prefix.replace(':prefix', '')
-                is_prefix = True
-            else:
-                value = value_with_prefix
-            
-            value = value.strip()
-            
-            if position < 1:
-                raise ValueError(f"Position muss >= 1 sein, nicht {position}")
-            
-            if not value:
-                raise ValueError("Exclude-Wert darf nicht leer sein")
-            
-            rules.append({
-                'position': position,
-                'value': value,
-                'is_prefix': is_prefix
-            })
-        
-        return rules
-    except (ValueError, AttributeError) as e:
-        return None
+    # Gleiche Syntax wie der positive Filter, nur die Auswertung ist umgekehrt
+    return parse_position_filter(exclude_position_str)
 
 
 def parse_exclude_contains_filter(exclude_contains_str):
@@ -557,7 +649,7 @@ def parse_exclude_contains_filter(exclude_contains_str):
         exclude_contains_str: String im Format "Z" oder "ZA123" oder "Z,SPECIAL" oder "ZA123|ZB456" oder "Z:case"
         
     Returns:
-        list: Liste von Dictionaries mit Exclude-Contains-Regeln oder None bei Fehlern
+        tuple: Unveränderliches Tupel von Exclude-Contains-Regeln (ContainsRule) oder None bei Fehlern
         
     Beispiele:
         "Z" → [{'value': 'Z', 'case_sensitive': False, 'or_group': 0}]
@@ -570,49 +662,8 @@ def parse_exclude_contains_filter(exclude_contains_str):
     - Komma (,) = UND-Verknüpfung (ausschließen wenn ALLE Teile gefunden)
     - Pipe (|) = ODER-Verknüpfung (ausschließen wenn EINER der Teile gefunden)
     """
-    if not exclude_contains_str:
-        return []
-    
-    try:
-        rules = []
-        or_group_id = 0
-        
-        # Erst nach Komma teilen (UND-Gruppen)
-        and_parts = [p.strip() for p in exclude_contains_str.split(',') if p.strip()]
-        
-        for and_part in and_parts:
-            # Dann jede UND-Gruppe nach Pipe teilen (ODER-Alternativen)
-            or_parts = [p.strip() for p in and_part.split('|') if p.strip()]
-            
-            if len(or_parts) > 1:
-                # Mehrere ODER-Alternativen in dieser UND-Gruppe
-                or_group_id += 1
-                current_or_group = or_group_id
-            else:
-                # Einzelner Wert (normale UND-Verknüpfung)
-                current_or_group = 0
-            
-            for or_part in or_parts:
-                # Parse Case-Sensitivity
-                case_sensitive = False
-                if ':case' in or_part:
-                    or_part = or_part.replace(':case', '')
-                    case_sensitive = True
-                
-                value = or_part.strip()
-                
-                if not value:
-                    raise ValueError("Exclude-Suchwert darf nicht leer sein")
-                
-                rules.append({
-                    'value': value,
-                    'case_sensitive': case_sensitive,
-                    'or_group': current_or_group
-                })
-        
-        return rules
-    except (ValueError, AttributeError) as e:
-        return None
+    # Gleiche Syntax wie der positive Filter, nur die Auswertung ist umgekehrt
+    return parse_contains_filter(exclude_contains_str)
 
 
 def parse_group_filter(group_str):
@@ -638,14 +689,14 @@ def parse_group_filter(group_str):
     
     try:
         rules = {}
-        parts = [p.strip() for p in group_str.split(',') if p.strip()]
+        parts = _split_strip(group_str)
         
         current_family = 'default'  # Standard Familie
         
         for part in parts:
             if '=' in part:
                 # Format: "FAMILIE=GRUPPE"
-                family, group = part.split('=', 1)
+                family, _, group = part.partition('=')
                 family = family.strip()
                 group = group.strip()
                 
@@ -766,7 +817,7 @@ def parse_analyze_group_position(analyze_str):
             return None
             
         # Split bei erstem Doppelpunkt: "3:1" → ["3", "1"] oder "3:1-2" → ["3", "1-2"]
-        group_str, position_part = analyze_str.split(':', 1)
+        group_str, _, position_part = analyze_str.partition(':')
         group = int(group_str.strip())
         
         if group < 1:
@@ -775,7 +826,7 @@ def parse_analyze_group_position(analyze_str):
         position_part = position_part.strip()
         if '-' in position_part:
             # Expliziter Bereich: "1-2"
-            start_str, end_str = position_part.split('-', 1)
+            start_str, _, end_str = position_part.partition('-')
             start_pos = int(start_str.strip())
             end_pos = int(end_str.strip())
             
@@ -803,6 +854,7 @@ def parse_analyze_group_position(analyze_str):
         return None
 
 
+@lru_cache(maxsize=256)
 def parse_group_position_filter(group_position_str):
     """
     Parst einen Gruppen-Position-Filter-String mit OR-Verknüpfung.
@@ -813,8 +865,8 @@ def parse_group_position_filter(group_position_str):
                            Komma ist weiterhin UND: "1:2=A,2:1=X|3:1=BD" bedeutet (1:2=A UND 2:1=X) ODER (3:1=BD)
         
     Returns:
-        list: Liste von Listen mit Gruppen-Position-Regeln (OR-Gruppen) oder None bei Fehlern
-              Äußere Liste = OR-Verknüpfung, innere Liste = UND-Verknüpfung
+        tuple: Tupel von Tupeln mit Gruppen-Position-Regeln (GroupPositionRule, OR-Gruppen) oder None bei Fehlern
+              Äußeres Tupel = OR-Verknüpfung, inneres Tupel = UND-Verknüpfung
         
     Beispiele:
         "3:1=M" → [[{'group': 3, 'start_pos': 1, 'end_pos': 1, 'value': 'M', 'is_prefix': False}]]
@@ -824,43 +876,39 @@ def parse_group_position_filter(group_position_str):
         "1:2=A,2:1=X|3:1=BD" → [[rule1, rule2], [rule3]] (Gruppe1 UND Gruppe2) ODER Gruppe3
     """
     if not group_position_str:
-        return []
+        return ()
     
     try:
         # Teile zuerst nach '|' für OR-Verknüpfung
-        or_groups = [g.strip() for g in group_position_str.split('|') if g.strip()]
+        or_groups = _split_strip(group_position_str, '|')
         all_or_groups = []
         
         for or_group in or_groups:
             # Innerhalb jeder OR-Gruppe: Teile nach ',' für UND-Verknüpfung
             and_rules = []
-            parts = [p.strip() for p in or_group.split(',') if p.strip()]
+            parts = _split_strip(or_group)
             for part in parts:
                 if ':' not in part or '=' not in part:
                     continue
-                group_str, position_value_part = part.split(':', 1)
+                group_str, _, position_value_part = part.partition(':')
                 group = int(group_str.strip())
                 if group < 1:
                     raise ValueError(f"Gruppen-Nummer muss >= 1 sein, nicht {group}")
                 negate = False
                 if '!=' in position_value_part:
                     negate = True
-                    position_part, value_with_prefix = position_value_part.split('!=', 1)
+                    position_part, _, value_with_prefix = position_value_part.partition('!=')
                 elif '=' in position_value_part:
                     negate = False
-                    position_part, value_with_prefix = position_value_part.split('=', 1)
+                    position_part, _, value_with_prefix = position_value_part.partition('=')
                 else:
                     continue
                 
                 position_part = position_part.strip()
                 value_with_prefix = value_with_prefix.strip()
 
-                is_prefix = False
-                if ':prefix' in value_with_prefix:
-                    value = value_with_prefix.replace(':prefix', '')
-                    is_prefix = True
-                else:
-                    value = value_with_prefix
+                value = value_with_prefix.removesuffix(':prefix')
+                is_prefix = len(value) != len(value_with_prefix)
                 value = value.strip()
                 if not value:
                     raise ValueError("Wert darf nicht leer sein")
@@ -871,7 +919,7 @@ def parse_group_position_filter(group_position_str):
                     start_pos = -1
                     end_pos = -1
                 elif '-' in position_part:
-                    start_str, end_str = position_part.split('-', 1)
+                    start_str, _, end_str = position_part.partition('-')
                     start_pos = int(start_str.strip())
                     end_pos = int(end_str.strip())
                     explicit_range = True
@@ -883,22 +931,12 @@ def parse_group_position_filter(group_position_str):
                     start_pos = int(position_part)
                     end_pos = start_pos + len(value) - 1
                 # start_pos kann jetzt auch -1 sein
-                rule = {
-                    'group': group,
-                    'start_pos': start_pos,
-                    'end_pos': end_pos,
-                    'value': value,
-                    'negate': negate,
-                    'is_prefix': is_prefix
-                }
-                if explicit_range:
-                    rule['explicit_range'] = True
-                and_rules.append(rule)
+                and_rules.append(GroupPositionRule(group, start_pos, end_pos, value, negate, is_prefix, explicit_range))
             
             if and_rules:  # Nur hinzufügen wenn Regeln vorhanden
-                all_or_groups.append(and_rules)
+                all_or_groups.append(tuple(and_rules))
         
-        return all_or_groups if all_or_groups else []
+        return tuple(all_or_groups)
     except (ValueError, AttributeError) as e:
         return None
 
@@ -933,12 +971,12 @@ def matches_pattern_filter(schema, pattern_rules, code_parts=None):
     
     for rule in pattern_rules:
         # Neues Format: Gruppen-Längen
-        if rule.get('type') == 'group_length':
+        if isinstance(rule, GroupLengthRule):
             if not code_parts:
                 continue  # Kann nicht validieren ohne code_parts
                 
-            group_num = rule['group']
-            allowed_lengths = rule['allowed_lengths']
+            group_num = rule.group
+            allowed_lengths = rule.allowed_lengths
             
             # Finde die Länge der Gruppe
             if group_num < 1 or group_num > len(code_parts):
@@ -954,10 +992,10 @@ def matches_pattern_filter(schema, pattern_rules, code_parts=None):
             continue
         
         # Altes Format: Position-basiert
-        position = rule['position']
-        min_len = rule['min_len']
-        max_len = rule['max_len']
-        negate = rule.get('negate', False)
+        position = rule.position
+        min_len = rule.min_len
+        max_len = rule.max_len
+        negate = rule.negate
         
         # Bestimme die tatsächliche Position
         if position == 'last':
@@ -988,67 +1026,40 @@ def matches_pattern_filter(schema, pattern_rules, code_parts=None):
     return True
 
 
-def matches_position_filter(full_typecode, position_rules):
+def _position_rule_pattern(start_index, value, is_prefix):
     """
-    Prüft ob ein Produktcode den Absolute-Position-Filter-Regeln entspricht.
+    Regex-Baustein für eine Positions-Regel ab Code-Anfang (für re.match mit re.DOTALL).
+    
+    Exakte Regeln verlangen danach String-Ende oder ein Trennzeichen: [^\\W_] entspricht
+    genau str.isalnum(), die negative Vorausschau verbietet also ein direkt folgendes alphanumerisches Zeichen.
+    """
+    pattern = f".{{{start_index}}}{re.escape(value)}"
+    if not is_prefix:
+        pattern += r"(?![^\W_])"
+    return pattern
+
+
+def compile_position_rules(position_rules):
+    """
+    Übersetzt Position-Regeln einmalig in einen einzigen regulären Ausdruck.
+    
+    Jede Regel wird zu einer Vorausschau ab Code-Anfang, ein re.match-Aufruf prüft damit
+    alle Regeln (UND) in C statt pro Regel in Python.
     
     Args:
-        full_typecode: Vollständiger Produktcode (z.B. "BCC M423-0000-2A-002-PX0334-050")
         position_rules: Liste von Position-Regeln mit 'is_prefix' Flag
         
     Returns:
-        bool: True wenn alle Regeln erfüllt sind
+        function: matches(full_typecode) -> bool
     """
-    if not position_rules:
-        return True
+    pattern = ''.join(f"(?={_position_rule_pattern(rule.position - 1, rule.value, rule.is_prefix)})"
+                      for rule in position_rules)
+    match = re.compile(pattern, re.DOTALL).match
     
-    # Verwende den Code so wie er ist (mit Leerzeichen und Bindestrichen)
-    code = full_typecode
-    
-    for rule in position_rules:
-        position = rule['position']
-        expected_value = rule['value']
-        is_prefix = rule.get('is_prefix', False)
-        
-        # Konvertiere zu 0-basiertem Index
-        start_index = position - 1
-        
-        if is_prefix:
-            # Präfix-Match: Der erwartete Wert muss am Anfang der Position stehen
-            end_index = start_index + len(expected_value)
-            
-            # Prüfe ob Position im Code existiert
-            if start_index < 0 or end_index > len(code):
-                return False
-            
-            # Prüfe Präfix an Position
-            actual_value = code[start_index:end_index]
-            if actual_value != expected_value:
-                return False
-        else:
-            # Exakter Match: Bestimme das Ende basierend auf der nächsten Nicht-Alphanumerischen Zeichen oder String-Ende
-            # Oder basierend auf der Länge des erwarteten Werts
-            end_index = start_index + len(expected_value)
-            
-            # Prüfe ob Position im Code existiert
-            if start_index < 0 or end_index > len(code):
-                return False
-            
-            # Für exakten Match: Prüfe ob der Wert genau passt UND
-            # dass danach ein Trennzeichen kommt (oder String-Ende)
-            actual_value = code[start_index:end_index]
-            if actual_value != expected_value:
-                return False
-            
-            # Zusätzliche Prüfung für exakten Match: 
-            # Nach dem Wert sollte ein Trennzeichen kommen oder das String-Ende
-            if end_index < len(code):
-                next_char = code[end_index]
-                # Erlaubte Trennzeichen: Leerzeichen, Bindestrich, etc.
-                if next_char.isalnum():  # Wenn das nächste Zeichen alphanumerisch ist, ist es kein exakter Match
-                    return False
+    def matches(full_typecode):
+        return match(full_typecode) is not None
     
-    return True
+    return matches
 
 
 def matches_group_start_filter(full_typecode, code_parts, group_start_rules, node_position=None):
@@ -1067,298 +1078,214 @@ def matches_group_start_filter(full_typecode, code_parts, group_start_rules, nod
     if not group_start_rules:
         return True
     
-    # Berechne Start-Positionen für jede Gruppe
-    group_positions = {}
-    
-    if node_position is not None and len(code_parts) > 0:
-        # Nutze die position aus dem JSON für die letzte Gruppe
-        # und berechne rückwärts für die anderen Gruppen
-        last_group_index = len(code_parts)
-        last_group_position = node_position
-        
-        # Berechne Positionen rückwärts
-        current_position = last_group_position
-        for i in range(last_group_index, 0, -1):
-            group_positions[i] = current_position
-            if i > 1:  # Nicht beim ersten Element
-                current_position -= len(code_parts[i-1]) + 1  # -1 für Trennzeichen
-    else:
-        # Fallback: Berechne Start-Positionen manuell
-        # Familie + Leerzeichen + Code-Teile getrennt durch '-'
-        family_and_space_length = full_typecode.find(' ') + 1 if ' ' in full_typecode else 0
-        
-        current_position = family_and_space_length + 1  # +1 für 1-basierte Indexierung
-        for i, part in enumerate(code_parts):
-            group_positions[i + 1] = current_position  # Gruppe 1, 2, 3, ...
-            current_position += len(part) + 1  # +1 für '-' Trennzeichen
+    # Start-Position nur für die in den Regeln abgefragten Gruppen berechnen (statt eine Tabelle für alle Gruppen)
+    group_count = len(code_parts)
+    if node_position is None:
+        # Fallback: Familie + Leerzeichen + Code-Teile getrennt durch '-' (+1 für 1-basierte Indexierung)
+        first_group_position = full_typecode.find(' ') + 1 + 1
     
-    # Prüfe alle Regeln
     for rule in group_start_rules:
-        group = rule['group']
-        expected_position = rule['start_position']
+        group = rule.group
         
         # Prüfe ob Gruppe existiert
-        if group not in group_positions:
+        if not 1 <= group <= group_count:
             return False
         
+        if node_position is not None:
+            # Die position aus dem JSON gilt für die letzte Gruppe, rückwärts je Code-Teil + Trennzeichen abziehen
+            actual_position = node_position - sum(len(part) + 1 for part in code_parts[group:])
+        else:
+            actual_position = first_group_position + sum(len(part) + 1 for part in code_parts[:group - 1])
+        
         # Prüfe Start-Position
-        actual_position = group_positions[group]
-        if actual_position != expected_position:
+        if actual_position != rule.start_position:
             return False
     
     return True
 
 
-def matches_contains_filter(full_typecode, code_parts, product_family, contains_rules):
+def compile_contains_rules(contains_rules):
     """
-    Prüft ob ein Produktcode den Contains-Filter-Regeln entspricht.
+    Bereitet Contains-Regeln einmalig für die Prüfung vieler Produkte auf.
+    
+    UND-Regeln (or_group = 0) werden zu Klauseln mit genau einer Alternative, Regeln
+    derselben ODER-Gruppe zu einer gemeinsamen Klausel. Suchwerte ohne Case-Sensitivity
+    kommen als value_upper bereits in Großbuchstaben aus dem Parser.
     
     Args:
-        full_typecode: Vollständiger Produktcode (z.B. "BCC M423-0000-2A-002-PX0334-050")
-        code_parts: Code-Teile ohne Produktfamilie (z.B. ["M423", "0000", "2A", "002", "PX0334", "050"])
-        product_family: Produktfamilie (z.B. "BCC")
         contains_rules: Liste von Contains-Regeln mit or_group
         
     Returns:
-        bool: True wenn alle Regeln erfüllt sind
+        tuple: Klauseln, jede ein Tupel von (suchwert, case_sensitive)-Alternativen
     """
-    if not contains_rules:
-        return True
-    
-    # Suche nur im Code-Teil (ohne Familie, da Familie über -f gefiltert wird)
-    search_text = '-'.join(code_parts)
-    
-    # Gruppiere Regeln nach or_group
+    and_clauses = []
     or_groups = {}
-    and_rules = []  # or_group = 0
     
     for rule in contains_rules:
-        or_group = rule['or_group']
-        if or_group == 0:
-            and_rules.append(rule)
+        case_sensitive = rule.case_sensitive
+        needle = (rule.value if case_sensitive else rule.value_upper, case_sensitive)
+        if rule.or_group == 0:
+            and_clauses.append((needle,))
         else:
-            if or_group not in or_groups:
-                or_groups[or_group] = []
-            or_groups[or_group].append(rule)
+            or_groups.setdefault(rule.or_group, []).append(needle)
     
-    # Prüfe UND-Regeln (or_group = 0)
-    for rule in and_rules:
-        search_value = rule['value']
-        case_sensitive = rule['case_sensitive']
-        
-        # Case-Sensitivity behandeln
-        check_text = search_text if case_sensitive else search_text.upper()
-        check_value = search_value if case_sensitive else search_value.upper()
-        
-        if check_value not in check_text:
-            return False
+    return tuple(and_clauses) + tuple(tuple(needles) for needles in or_groups.values())
+
+
+def _matches_contains_clauses(search_text, upper_text, clauses):
+    """
+    Prüft ob jede Klausel mindestens einen Treffer im Suchtext hat.
     
-    # Prüfe ODER-Gruppen (or_group > 0)
-    for or_group_id, or_rules in or_groups.items():
-        # Mindestens eine Regel in dieser ODER-Gruppe muss erfüllt sein
-        group_matched = False
-        
-        for rule in or_rules:
-            search_value = rule['value']
-            case_sensitive = rule['case_sensitive']
-            
-            # Case-Sensitivity behandeln
-            check_text = search_text if case_sensitive else search_text.upper()
-            check_value = search_value if case_sensitive else search_value.upper()
-            
-            if check_value in check_text:
-                group_matched = True
-                break  # Eine Regel in der ODER-Gruppe erfüllt
-        
-        if not group_matched:
-            return False  # Diese ODER-Gruppe nicht erfüllt
+    search_text ist der Code-Teil ohne Familie ('-'.join(code_parts)), upper_text dessen
+    Großschreibung oder None (wird dann bei Bedarf einmal berechnet).
+    """
+    for clause in clauses:
+        for needle, case_sensitive in clause:
+            if case_sensitive:
+                if needle in search_text:
+                    break
+            else:
+                if upper_text is None:
+                    upper_text = search_text.upper()
+                if needle in upper_text:
+                    break
+        else:
+            # Keine Alternative dieser Klausel gefunden
+            return False
     
     return True
 
 
-def matches_exclude_group_filter(code_parts, exclude_group_rules):
+def compile_contains_matcher(contains_rules):
     """
-    Prüft ob Code-Teile den Exclude-Gruppen-Filter-Regeln entsprechen.
+    Baut aus Contains-Regeln einmalig eine Prüf-Funktion matches(search_text, upper_text) -> bool.
+    
+    Bei vielen Suchwerten und installiertem pyahocorasick werden alle Suchwerte in einen
+    Aho-Corasick-Automaten (je einer für case-sensitive und case-insensitive) geladen; pro Produkt
+    genügt dann ein Durchlauf über den Code. Sonst werden die Klauseln einzeln mit 'in' geprüft.
+    Ergebnis ist in beiden Fällen gleich: jede Klausel braucht mindestens einen Treffer.
     
     Args:
-        code_parts: Code-Teile ohne Produktfamilie (z.B. ["M423", "0000", "2A", "002", "PX0334", "050"])
-        exclude_group_rules: Liste von Exclude-Gruppen-Regeln mit 'is_prefix' Flag
+        contains_rules: Liste von Contains-Regeln mit or_group
         
     Returns:
-        bool: True wenn das Produkt AUSGESCHLOSSEN werden soll (gefunden in Exclude-Liste)
+        function: matches(search_text, upper_text) -> bool (Suchtext wie bei _matches_contains_clauses)
     """
-    if not exclude_group_rules:
-        return False  # Keine Exclude-Regeln = nicht ausschließen
+    clauses = compile_contains_rules(contains_rules)
+    needle_count = sum(len(clause) for clause in clauses)
     
-    for rule in exclude_group_rules:
-        group_number = rule['group']
-        exclude_value = rule['value']
-        is_prefix = rule.get('is_prefix', False)
-        
-        # Konvertiere zu 0-basiertem Index
-        group_index = group_number - 1
-        
-        # Prüfe ob Gruppe existiert
-        if group_index < 0 or group_index >= len(code_parts):
-            continue  # Gruppe existiert nicht, diese Regel überspringen
-        
-        # Hole den tatsächlichen Wert der Gruppe
-        actual_value = code_parts[group_index]
-        
-        if is_prefix:
-            # Präfix-Match: Wenn der exclude_value am Anfang der Gruppe steht, ausschließen
-            if actual_value.startswith(exclude_value):
-                return True  # Produkt soll ausgeschlossen werden
-        else:
-            # Exakter Match: Wenn der exclude_value exakt der Gruppe entspricht, ausschließen
-            if actual_value == exclude_value:
-                return True  # Produkt soll ausgeschlossen werden
+    if not AHOCORASICK_AVAILABLE or needle_count < AHOCORASICK_MIN_NEEDLES:
+        return lambda search_text, upper_text: _matches_contains_clauses(search_text, upper_text, clauses)
+    
+    # Suchwert -> Indizes der Klauseln, die er erfüllt (ein Wert kann in mehreren Klauseln stehen)
+    clause_ids = ({}, {})  # (case-insensitive, case-sensitive)
+    for clause_index, clause in enumerate(clauses):
+        for needle, case_sensitive in clause:
+            clause_ids[case_sensitive].setdefault(needle, set()).add(clause_index)
     
-    return False  # Keine Exclude-Regel getroffen = nicht ausschließen
+    automatons = []
+    for case_sensitive, ids_by_needle in enumerate(clause_ids):
+        if not ids_by_needle:
+            continue
+        automaton = ahocorasick.Automaton()
+        for needle, ids in ids_by_needle.items():
+            automaton.add_word(needle, frozenset(ids))
+        automaton.make_automaton()
+        automatons.append((bool(case_sensitive), automaton))
+    
+    clause_count = len(clauses)
+    
+    def matches(search_text, upper_text):
+        hit_clauses = set()
+        for case_sensitive, automaton in automatons:
+            if case_sensitive:
+                text = search_text
+            else:
+                text = upper_text if upper_text is not None else search_text.upper()
+            for _, ids in automaton.iter(text):
+                hit_clauses |= ids
+                if len(hit_clauses) == clause_count:
+                    return True
+        return len(hit_clauses) == clause_count
+    
+    return matches
 
 
-def matches_exclude_position_filter(full_typecode, exclude_position_rules):
+def compile_exclude_group_rules(exclude_group_rules):
     """
-    Prüft ob ein Produktcode den Exclude-Position-Filter-Regeln entspricht.
+    Fasst Exclude-Gruppen-Regeln einmalig pro Gruppe zusammen.
+    
+    Alle Präfixe einer Gruppe landen in einem Tupel (ein str.startswith-Aufruf prüft alle),
+    alle exakten Werte in einem frozenset.
     
     Args:
-        full_typecode: Vollständiger Produktcode (z.B. "BCC M423-0000-2A-002-PX0334-050")
-        exclude_position_rules: Liste von Exclude-Position-Regeln mit 'is_prefix' Flag
+        exclude_group_rules: Liste von Exclude-Gruppen-Regeln mit 'is_prefix' Flag
         
     Returns:
-        bool: True wenn das Produkt AUSGESCHLOSSEN werden soll (gefunden in Exclude-Liste)
+        function: excluded(code_parts) -> bool
     """
-    if not exclude_position_rules:
-        return False  # Keine Exclude-Regeln = nicht ausschließen
-    
-    # Verwende den Code so wie er ist (mit Leerzeichen und Bindestrichen)
-    code = full_typecode
+    prefixes_by_group = {}
+    exact_by_group = {}
+    for rule in exclude_group_rules:
+        group_index = rule.group - 1
+        if group_index < 0:
+            continue  # Gruppe existiert nie, Regel wird wie bisher übersprungen
+        target = prefixes_by_group if rule.is_prefix else exact_by_group
+        target.setdefault(group_index, []).append(rule.value)
+    
+    groups = tuple(
+        (group_index, tuple(prefixes_by_group.get(group_index, ())), frozenset(exact_by_group.get(group_index, ())))
+        for group_index in sorted(prefixes_by_group.keys() | exact_by_group.keys())
+    )
     
-    for rule in exclude_position_rules:
-        position = rule['position']
-        exclude_value = rule['value']
-        is_prefix = rule.get('is_prefix', False)
-        
-        # Konvertiere zu 0-basiertem Index
-        start_index = position - 1
-        
-        if is_prefix:
-            # Präfix-Match: Der exclude_value darf NICHT am Anfang der Position stehen
-            end_index = start_index + len(exclude_value)
-            
-            # Prüfe ob Position im Code existiert
-            if start_index < 0 or end_index > len(code):
-                continue  # Position existiert nicht, diese Regel überspringen
-            
-            # Prüfe Präfix an Position
-            actual_value = code[start_index:end_index]
-            if actual_value == exclude_value:
-                return True  # Produkt soll ausgeschlossen werden
-        else:
-            # Exakter Match: Der exclude_value darf NICHT exakt an dieser Position stehen
-            end_index = start_index + len(exclude_value)
-            
-            # Prüfe ob Position im Code existiert
-            if start_index < 0 or end_index > len(code):
-                continue  # Position existiert nicht, diese Regel überspringen
-            
-            # Für exakten Match: Prüfe ob der Wert genau passt UND
-            # dass danach ein Trennzeichen kommt (oder String-Ende)
-            actual_value = code[start_index:end_index]
-            if actual_value == exclude_value:
-                # Zusätzliche Prüfung für exakten Match: 
-                # Nach dem Wert sollte ein Trennzeichen kommen oder das String-Ende
-                if end_index >= len(code):
-                    return True  # String-Ende erreicht = exakter Match
-                else:
-                    next_char = code[end_index]
-                    # Erlaubte Trennzeichen: Leerzeichen, Bindestrich, etc.
-                    if not next_char.isalnum():  # Wenn das nächste Zeichen kein alphanumerisches ist, ist es ein exakter Match
-                        return True  # Produkt soll ausgeschlossen werden
+    def excluded(code_parts):
+        part_count = len(code_parts)
+        for group_index, prefixes, exact_values in groups:
+            if group_index >= part_count:
+                continue
+            actual_value = code_parts[group_index]
+            if actual_value in exact_values or (prefixes and actual_value.startswith(prefixes)):
+                return True
+        return False
     
-    return False  # Keine Exclude-Regel getroffen = nicht ausschließen
+    return excluded
 
 
-def matches_exclude_contains_filter(full_typecode, code_parts, product_family, exclude_contains_rules):
+def compile_exclude_position_rules(exclude_position_rules):
     """
-    Prüft ob ein Produktcode den Exclude-Contains-Filter-Regeln entspricht.
+    Übersetzt Exclude-Position-Regeln einmalig in einen einzigen regulären Ausdruck.
+    
+    Jede Regel wird zu einer Alternative ab Code-Anfang (Präfix-Regeln derselben Position
+    zusammengefasst), exakte Regeln behalten die Prüfung auf ein folgendes Trennzeichen.
+    Ein re.match-Aufruf entscheidet damit alle Regeln.
     
     Args:
-        full_typecode: Vollständiger Produktcode (z.B. "BCC M423-0000-2A-002-PX0334-050")
-        code_parts: Code-Teile ohne Produktfamilie (z.B. ["M423", "0000", "2A", "002", "PX0334", "050"])
-        product_family: Produktfamilie (z.B. "BCC")
-        exclude_contains_rules: Liste von Exclude-Contains-Regeln mit or_group
+        exclude_position_rules: Liste von Exclude-Position-Regeln mit 'is_prefix' Flag
         
     Returns:
-        bool: True wenn das Produkt AUSGESCHLOSSEN werden soll (gefunden in Exclude-Liste)
+        function: excluded(full_typecode) -> bool
     """
-    if not exclude_contains_rules:
-        return False  # Keine Exclude-Regeln = nicht ausschließen
-    
-    # Suche nur im Code-Teil (ohne Familie, da Familie über -f gefiltert wird)
-    search_text = '-'.join(code_parts)
-    
-    # Gruppiere Regeln nach or_group
-    or_groups = {}
-    and_rules = []  # or_group = 0
-    
-    for rule in exclude_contains_rules:
-        or_group = rule['or_group']
-        if or_group == 0:
-            and_rules.append(rule)
+    # Präfix-Regeln derselben Position teilen sich eine Alternation nach dem Positions-Sprung
+    prefixes_by_start = {}
+    alternatives = []
+    for rule in exclude_position_rules:
+        start_index = rule.position - 1
+        if start_index < 0:
+            continue  # Position existiert nie, Regel wird wie bisher übersprungen
+        if rule.is_prefix:
+            prefixes_by_start.setdefault(start_index, []).append(re.escape(rule.value))
         else:
-            if or_group not in or_groups:
-                or_groups[or_group] = []
-            or_groups[or_group].append(rule)
-    
-    # Prüfe UND-Regeln (or_group = 0)
-    # ALLE UND-Regeln müssen erfüllt sein, damit ausgeschlossen wird
-    all_and_matched = True
-    if and_rules:  # Nur prüfen wenn UND-Regeln existieren
-        for rule in and_rules:
-            search_value = rule['value']
-            case_sensitive = rule['case_sensitive']
-            
-            # Case-Sensitivity behandeln
-            check_text = search_text if case_sensitive else search_text.upper()
-            check_value = search_value if case_sensitive else search_value.upper()
-            
-            if check_value not in check_text:
-                all_and_matched = False
-                break
+            alternatives.append(_position_rule_pattern(start_index, rule.value, False))
+    alternatives[:0] = [f".{{{start_index}}}(?:{'|'.join(values)})" for start_index, values in prefixes_by_start.items()]
     
-    # Prüfe ODER-Gruppen (or_group > 0)
-    # Mindestens eine Regel in jeder ODER-Gruppe muss erfüllt sein
-    all_or_groups_matched = True
-    if or_groups:  # Nur prüfen wenn ODER-Gruppen existieren
-        for or_group_id, or_rules in or_groups.items():
-            # Mindestens eine Regel in dieser ODER-Gruppe muss erfüllt sein
-            group_matched = False
-            
-            for rule in or_rules:
-                search_value = rule['value']
-                case_sensitive = rule['case_sensitive']
-                
-                # Case-Sensitivity behandeln
-                check_text = search_text if case_sensitive else search_text.upper()
-                check_value = search_value if case_sensitive else search_value.upper()
-                
-                if check_value in check_text:
-                    group_matched = True
-                    break  # Eine Regel in der ODER-Gruppe erfüllt
-            
-            if not group_matched:
-                all_or_groups_matched = False
-                break  # Diese ODER-Gruppe nicht erfüllt
+    if not alternatives:
+        return lambda code: False
+    match = re.compile('|'.join(alternatives), re.DOTALL).match
     
-    # Exclude-Logik: Wenn keine Regeln definiert sind, ist die Gruppe automatisch "erfüllt"
-    if not and_rules:
-        all_and_matched = True
-    if not or_groups:
-        all_or_groups_matched = True
+    def excluded(code):
+        return match(code) is not None
     
-    # Ausschließen wenn alle Bedingungen erfüllt sind
-    return all_and_matched and all_or_groups_matched
+    return excluded
 
 
 def matches_group_position_filter(code_parts, group_position_rules):
@@ -1376,177 +1303,427 @@ def matches_group_position_filter(code_parts, group_position_rules):
         return True
     
     for rule in group_position_rules:
-        group_number = rule['group']
-        start_pos = rule['start_pos']
-        end_pos = rule['end_pos']
-        expected_value = rule['value']
-        negate = rule.get('negate', False)
-        is_prefix = rule.get('is_prefix', False)
+        group_number = rule.group
+        start_pos = rule.start_pos
+        end_pos = rule.end_pos
+        expected_value = rule.value
+        negate = rule.negate
+        is_prefix = rule.is_prefix
         group_index = group_number - 1        
         
         if group_index < 0 or group_index >= len(code_parts):
             return False  # Gruppe existiert nicht
         group_content = code_parts[group_index]
+        group_length = len(group_content)
+        # Vergleiche direkt im Gruppen-String mit Start-/End-Index statt über einen Slice (keine Kopie pro Regel)
         # Erweiterung: -1 bedeutet letzte Position
         if start_pos == -1:
-            start_idx = len(group_content) - len(expected_value)
-            end_idx = len(group_content)
-            if start_idx < 0 or end_idx > len(group_content):
+            if group_length < len(expected_value):
                 return False
+            # Der Ausschnitt ist genau so lang wie der Wert: Präfix- und exakter Vergleich fallen zusammen
+            found = group_content.endswith(expected_value)
         else:
             start_idx = start_pos - 1
-            end_idx = end_pos if end_pos <= len(group_content) else len(group_content)
-            if start_idx < 0 or start_idx >= len(group_content):
-                return False
-            if end_idx > len(group_content):
-                # print(f"  ❌ End-Index {end_idx} überschreitet die Länge der Gruppe {group_number} ({len(group_content)}).")
-                return False
-        actual_value = group_content[start_idx:end_idx]
-        if is_prefix:
-            if not actual_value.startswith(expected_value) and not negate:
-                return False
-            if actual_value.startswith(expected_value) and negate:
-                return False
-        else:
-            if actual_value != expected_value and not negate:
-                return False
-            if actual_value == expected_value and negate:
+            end_idx = end_pos if end_pos <= group_length else group_length
+            if start_idx < 0 or start_idx >= group_length:
                 return False
+            if is_prefix:
+                found = group_content.startswith(expected_value, start_idx, end_idx)
+            else:
+                found = end_idx - start_idx == len(expected_value) and group_content.startswith(expected_value, start_idx)
+        if found == negate:
+            return False
     # print("  ✅ Alle Gruppen-Position-Regeln erfüllt.")
     return True
 
 
-def matches_group_content_filter(code_parts, group_content_rules):
+def compile_group_content_rules(group_content_rules):
     """
-    Prüft ob Code-Teile den Gruppen-Inhalt-Filter-Regeln entsprechen.
+    Fasst Gruppen-Inhalt-Regeln einmalig zu höchstens einer Prüfung pro Gruppe zusammen.
+    
+    Alle Regeln sind UND-verknüpft: mehrere exakte Werte für dieselbe Gruppe können nie gleichzeitig
+    zutreffen, mehrere Präfixe reduzieren sich auf das längste (wenn die kürzeren darin enthalten sind),
+    und ein exakter Wert macht passende Präfixe überflüssig.
     
     Args:
-        code_parts: Code-Teile ohne Produktfamilie (z.B. ["M423", "0000", "2A", "002", "PX0334", "050"])
-        group_content_rules: Liste von Gruppen-Inhalt-Regeln mit 'is_prefix' Flag
+        group_content_rules: Liste von Gruppen-Inhalt-Regeln
         
     Returns:
-        bool: True wenn alle Regeln erfüllt sind
+        function: matches(code_parts) -> bool
     """
-    if not group_content_rules:
-        return True
-    
+    exact_by_group = {}
+    prefixes_by_group = {}
     for rule in group_content_rules:
-        group_number = rule['group']
-        expected_value = rule['value']
-        is_prefix = rule.get('is_prefix', False)
-        
-        # Konvertiere zu 0-basiertem Index
-        group_index = group_number - 1
-        
-        # Prüfe ob Gruppe existiert
-        if group_index < 0 or group_index >= len(code_parts):
-            return False
-        
-        # Hole den tatsächlichen Wert der Gruppe
-        actual_value = code_parts[group_index]
-        
-        if is_prefix:
-            # Präfix-Match: Der erwartete Wert muss am Anfang der Gruppe stehen
-            if not actual_value.startswith(expected_value):
-                return False
+        group_index = rule.group - 1
+        if group_index < 0:
+            return lambda code_parts: False  # Gruppe existiert nie
+        target = prefixes_by_group if rule.is_prefix else exact_by_group
+        target.setdefault(group_index, set()).add(rule.value)
+    
+    checks = []
+    for group_index in sorted(exact_by_group.keys() | prefixes_by_group.keys()):
+        exact_values = exact_by_group.get(group_index, set())
+        prefixes = sorted(prefixes_by_group.get(group_index, ()), key=len)
+        
+        if len(exact_values) > 1:
+            return lambda code_parts: False  # Verschiedene exakte Werte für dieselbe Gruppe
+        longest_prefix = prefixes[-1] if prefixes else None
+        if longest_prefix is not None and not all(longest_prefix.startswith(prefix) for prefix in prefixes):
+            return lambda code_parts: False  # Präfixe widersprechen sich
+        
+        if exact_values:
+            exact_value = next(iter(exact_values))
+            if longest_prefix is not None and not exact_value.startswith(longest_prefix):
+                return lambda code_parts: False  # Exakter Wert passt nicht zum Präfix
+            checks.append((group_index, exact_value, True))
         else:
-            # Exakter Match
-            if actual_value != expected_value:
+            checks.append((group_index, longest_prefix, False))
+    
+    checks = tuple(checks)
+    
+    def matches(code_parts):
+        part_count = len(code_parts)
+        for group_index, expected_value, is_exact in checks:
+            if group_index >= part_count:
+                return False
+            actual_value = code_parts[group_index]
+            if is_exact:
+                if actual_value != expected_value:
+                    return False
+            elif not actual_value.startswith(expected_value):
                 return False
+        return True
     
-    return True
+    return matches
 
 
-def matches_extended_group_count_filter(product_schema, group_count_config):
+def compile_group_count_filter(group_count_config):
     """
-    Prüft ob ein Produkt-Schema dem erweiterten Gruppen-Anzahl-Filter entspricht.
+    Übersetzt eine Gruppen-Count-Konfiguration einmalig in eine Prüf-Funktion auf der Gruppen-Anzahl.
+    
+    Die Typ-Verzweigung der Konfiguration wird dabei einmalig statt pro Produkt ausgewertet.
     
     Args:
-        product_schema: Schema des Produkts (Liste von Längen)
         group_count_config: Gruppen-Count-Konfiguration von parse_group_count_filter()
         
     Returns:
-        bool: True wenn das Schema dem Filter entspricht
+        function: predicate(actual_count) -> bool, oder None wenn kein Filter gesetzt ist
     """
     if not group_count_config:
-        return True
+        return None
     
-    actual_count = len(product_schema)
     filter_type = group_count_config['type']
     
     if filter_type == 'exact':
-        return actual_count == group_count_config['value']
+        return lambda n, v=group_count_config['value']: n == v
     elif filter_type == 'greater':
-        return actual_count > group_count_config['value']
+        return lambda n, v=group_count_config['value']: n > v
     elif filter_type == 'greater_equal':
-        return actual_count >= group_count_config['value']
+        return lambda n, v=group_count_config['value']: n >= v
     elif filter_type == 'less':
-        return actual_count < group_count_config['value']
+        return lambda n, v=group_count_config['value']: n < v
     elif filter_type == 'less_equal':
-        return actual_count <= group_count_config['value']
+        return lambda n, v=group_count_config['value']: n <= v
     elif filter_type == 'range':
-        return group_count_config['min'] <= actual_count <= group_count_config['max']
+        return lambda n, lo=group_count_config['min'], hi=group_count_config['max']: lo <= n <= hi
     elif filter_type == 'multiple':
-        return actual_count in group_count_config['values']
+        return lambda n, values=frozenset(group_count_config['values']): n in values
     
-    return False
+    return lambda n: False
 
 
-def matches_group_filter(node, product_family, group_rules):
+def compile_group_rules(group_rules):
     """
-    Prüft ob ein Produktknoten den Gruppen-Filter-Regeln entspricht.
+    Übersetzt Gruppen-Filter-Regeln einmalig in frozensets pro Produktfamilie.
+    
+    Familienspezifische Regel hat Vorrang vor 'default', ohne passende Regel kein Treffer.
     
     Args:
-        node: JSON-Knoten des Produkts
-        product_family: Produktfamilie des aktuellen Produkts
-        group_rules: Dictionary mit Gruppen-Regeln (jetzt Listen von erlaubten Gruppen)
+        group_rules: Dictionary mit Gruppen-Regeln von parse_group_filter()
         
     Returns:
-        bool: True wenn die Gruppen-Regeln erfüllt sind
+        function: matches(node, product_family) -> bool
     """
-    if not group_rules:
-        return True
-    
-    # Hole das group-Attribut des Knotens
-    node_group = node.get('group', '')
+    allowed_by_family = {family: frozenset(groups) for family, groups in group_rules.items()}
+    default_groups = allowed_by_family.get('default')
     
-    # Prüfe familienspezifische Regel zuerst
-    if product_family and product_family in group_rules:
-        expected_groups = group_rules[product_family]
-        # ODER-Verknüpfung: node_group muss in einer der erlaubten Gruppen sein
-        return node_group in expected_groups
-    
-    # Prüfe Default-Regel
-    if 'default' in group_rules:
-        expected_groups = group_rules['default']
-        # ODER-Verknüpfung: node_group muss in einer der erlaubten Gruppen sein
-        return node_group in expected_groups
+    def matches(node, product_family):
+        allowed_groups = allowed_by_family.get(product_family, default_groups) if product_family else default_groups
+        if allowed_groups is None:
+            return False
+        return node.get('group', '') in allowed_groups
     
-    # Keine passende Regel gefunden
-    return False
+    return matches
+
+
+def compile_schema_matcher(target_schemas, and_mode=False):
+    """
+    Übersetzt die Ziel-Schemas einmalig in einen Präfix-Baum (Trie) über die Gruppenlängen.
+
+    Statt jedes Ziel-Schema pro Produkt einzeln zu vergleichen, wird das Produkt-Schema
+    einmal durch den Trie gelaufen: Präfix-Schemas treffen an jedem erreichten Endknoten,
+    exakte Schemas nur am Ende des Produkt-Schemas.
+
+    Args:
+        target_schemas: Liste von Schema-Objekten [{'schema': [3,3,3,4], 'is_prefix': False}]
+        and_mode: Wenn True, müssen ALLE Schemas erfüllt sein
+
+    Returns:
+        function: matches(product_schema) -> Liste der erfüllten Schema-Objekte
+                  (in Reihenfolge von target_schemas) oder None, wenn das Produkt nicht passt
+    """
+    root = {}
+    for index, schema_obj in enumerate(target_schemas):
+        trie_node = root
+        for length in schema_obj['schema']:
+            trie_node = trie_node.setdefault(length, {})
+        # Schlüssel None markiert das Ende eines Ziel-Schemas (Gruppenlängen sind immer int)
+        trie_node.setdefault(None, []).append((index, schema_obj['is_prefix'], schema_obj))
+
+    required_count = len(target_schemas)
+
+    def matches(product_schema):
+        hits = []
+        trie_node = root
+        last_depth = len(product_schema)
+        depth = 0
+        while True:
+            terminals = trie_node.get(None)
+            if terminals:
+                for index, is_prefix, schema_obj in terminals:
+                    if is_prefix or depth == last_depth:
+                        hits.append((index, schema_obj))
+            if depth == last_depth:
+                break
+            trie_node = trie_node.get(product_schema[depth])
+            if trie_node is None:
+                break
+            depth += 1
+
+        if and_mode:
+            # UND-Modus: ALLE Schemas müssen erfüllt sein
+            if len(hits) != required_count:
+                return None
+        elif not hits:
+            return None
 
+        if len(hits) > 1:
+            hits.sort(key=lambda hit: hit[0])
+        return [schema_obj for _, schema_obj in hits]
 
-def extract_code_path(node_path):
+    return matches
+
+
+# Geschätzte Kosten pro Produkt für compile_product_filters (kleiner = früher prüfen)
+FILTER_COST_SCHEMA = 0      # Vergleich auf dem vorberechneten Schema
+FILTER_COST_SLICE = 1       # Index-Zugriff / Slice-Vergleich auf Code-Teilen
+FILTER_COST_LOOKUP = 2      # Dictionary-Zugriff auf den Knoten
+FILTER_COST_SCAN = 3        # Positionsberechnung über mehrere Gruppen
+FILTER_COST_SUBSTRING = 4   # Teilstring-Suche im zusammengesetzten Code
+
+
+def compile_product_filters(pattern_rules=None, position_rules=None, group_start_rules=None, group_rules=None, contains_rules=None, group_content_rules=None, group_count_config=None, group_position_rules=None, exclude_group_rules=None, exclude_position_rules=None, exclude_contains_rules=None):
     """
-    Extrahiert den Code-Pfad aus einem vollständigen Pfad (entfernt root und Pattern-Knoten).
+    Stellt die gesetzten Filter einmalig zu Prüf-Funktionen zusammen.
+    
+    Jede Prüf-Funktion hat die Signatur check(node, family, full_typecode, code_parts, schema, texts) -> bool,
+    texts ist das vorberechnete (search_text, upper_text) des Produkts aus build_product_index.
+    Nicht gesetzte Filter tauchen nicht auf, pro Produkt werden also nur noch die aktiven
+    Regeln ausgewertet. Alle matches_*-Funktionen sind seiteneffektfrei, die Auswertung
+    darf daher beim ersten eindeutigen Ergebnis abbrechen. Positive und Exclude-Prüfungen
+    werden gemeinsam nach geschätzten Kosten sortiert (FILTER_COST_*), günstige zuerst.
     
     Args:
-        node_path: Vollständiger Pfad als String "root-FAMILIE-pattern_3-Teil1-pattern_4-Teil2-..."
+        Filter-Regeln wie bei find_products_by_schema
         
     Returns:
-        list: Code-Teile ohne root, Produktfamilie und Pattern-Knoten
+        list: (check, is_exclude)-Paare; ein Produkt erfüllt die Filter, wenn alle positiven
+              Prüfungen True und alle Exclude-Prüfungen (is_exclude=True) False liefern
     """
-    parts = node_path.split('-')
-    code_parts = []
+    positive_checks = []
+    exclude_checks = []
+    
+    # Positive Filter
+    if pattern_rules:
+        # Das Ergebnis hängt nur vom Schema ab (Gruppen-Längen sind die Schema-Werte),
+        # viele Produkte teilen sich dasselbe Schema-Objekt (build_product_index) -> einmal pro Schema auswerten
+        pattern_results = {}
+        
+        def check_pattern(node, family, full_typecode, code_parts, schema, texts):
+            key = id(schema)
+            result = pattern_results.get(key)
+            if result is None:
+                result = pattern_results[key] = matches_pattern_filter(schema, pattern_rules, code_parts)
+            return result
+        
+        positive_checks.append((FILTER_COST_SCHEMA, check_pattern))
+    if position_rules:
+        position_matcher = compile_position_rules(position_rules)
+        positive_checks.append((FILTER_COST_SLICE, lambda node, family, full_typecode, code_parts, schema, texts:
+                                position_matcher(full_typecode)))
+    if group_start_rules:
+        positive_checks.append((FILTER_COST_SCAN, lambda node, family, full_typecode, code_parts, schema, texts:
+                                matches_group_start_filter(full_typecode, code_parts, group_start_rules, node.get('position'))))
+    if group_rules:
+        group_matcher = compile_group_rules(group_rules)
+        positive_checks.append((FILTER_COST_LOOKUP, lambda node, family, full_typecode, code_parts, schema, texts:
+                                group_matcher(node, family)))
+    if contains_rules:
+        contains_matcher = compile_contains_matcher(contains_rules)
+        positive_checks.append((FILTER_COST_SUBSTRING, lambda node, family, full_typecode, code_parts, schema, texts:
+                                contains_matcher(*texts)))
+    if group_content_rules:
+        group_content_matcher = compile_group_content_rules(group_content_rules)
+        positive_checks.append((FILTER_COST_SLICE, lambda node, family, full_typecode, code_parts, schema, texts:
+                                group_content_matcher(code_parts)))
+    group_count_predicate = compile_group_count_filter(group_count_config)
+    if group_count_predicate is not None:
+        positive_checks.append((FILTER_COST_SCHEMA, lambda node, family, full_typecode, code_parts, schema, texts:
+                                group_count_predicate(len(schema))))
+    if group_position_rules:
+        # group_position_rules ist eine Liste von OR-Gruppen: [[rule1, rule2], [rule3]]
+        # Äußere Liste = OR, innere Liste = UND. matches_group_position_filter prüft eine
+        # UND-Gruppe in einem Durchlauf und bricht bei der ersten nicht erfüllten Regel ab.
+        def check_group_position(node, family, full_typecode, code_parts, schema, texts):
+            # Mindestens eine OR-Gruppe muss vollständig erfüllt sein
+            for or_group in group_position_rules:
+                if matches_group_position_filter(code_parts, or_group):
+                    return True
+            return False
+        
+        positive_checks.append((FILTER_COST_SCAN, check_group_position))
+    
+    # Exclude-Filter
+    if exclude_group_rules:
+        excluded_by_group = compile_exclude_group_rules(exclude_group_rules)
+        exclude_checks.append((FILTER_COST_SLICE, lambda node, family, full_typecode, code_parts, schema, texts:
+                               excluded_by_group(code_parts)))
+    if exclude_position_rules:
+        excluded_by_position = compile_exclude_position_rules(exclude_position_rules)
+        exclude_checks.append((FILTER_COST_SLICE, lambda node, family, full_typecode, code_parts, schema, texts:
+                               excluded_by_position(full_typecode)))
+    if exclude_contains_rules:
+        exclude_contains_matcher = compile_contains_matcher(exclude_contains_rules)
+        exclude_checks.append((FILTER_COST_SUBSTRING, lambda node, family, full_typecode, code_parts, schema, texts:
+                               exclude_contains_matcher(*texts)))
+    
+    # Günstige und trennscharfe Filter zuerst, damit die meisten Produkte früh scheitern.
+    # "alle positiven erfüllt UND kein Exclude" ist eine reine UND-Verknüpfung seiteneffektfreier
+    # Prüfungen, die Reihenfolge ändert das Ergebnis nicht - ein günstiger Exclude-Treffer
+    # erspart also teure positive Prüfungen. sorted() ist stabil, bei gleichen Kosten zuerst positive.
+    filter_checks = [(cost, check, False) for cost, check in positive_checks]
+    filter_checks += [(cost, check, True) for cost, check in exclude_checks]
+    filter_checks.sort(key=lambda entry: entry[0])
+    
+    return [(check, is_exclude) for cost, check, is_exclude in filter_checks]
+
+
+def build_product_index(data):
+    """
+    Sammelt alle Produkte des Variantenbaums in einem Durchlauf (Endknoten und Zwischenknoten mit Excel-Code).
+    
+    Der Index hängt nur von der Baumstruktur ab (Codes, Pattern-Knoten, Children), nicht von
+    Labels oder Groups. Er kann daher für mehrere Suchen auf demselben Baum wiederverwendet
+    werden, solange keine Knoten hinzugefügt oder entfernt werden.
     
-    for i, part in enumerate(parts):
-        # Überspringe root, Pattern-Knoten und die Produktfamilie (Index 1)
-        if part != 'root' and not part.startswith('pattern_') and i != 1:
-            code_parts.append(part)
+    Args:
+        data: JSON-Daten des Variantenbaums
+        
+    Returns:
+        dict: {
+            'families': Produktfamilien (Tiefe 1) in Baum-Reihenfolge,
+            'products': Liste von (family, node, code_path, is_leaf, code_parts, schema, full_typecode, search_texts)
+                        in Baum-Reihenfolge; code_parts als Tupel (unveränderlich, hashbar); search_texts = ('-'.join(code_parts), dessen Großschreibung) für Contains-Filter,
+            'by_family': Familie -> Liste der Produkte dieser Familie
+        }
+    """
+    families = []
+    products = []
+    by_family = {}
+    
+    # Pfad-Segmente (root, Familie, pattern_N, Codes) und Code-Teile (ohne root, Familie und Pattern)
+    # als Stapel: pro Knoten ein append/pop statt Pfad-String zusammenbauen und wieder zerlegen
+    path_segments = []
+    code_stack = []
+    # Gleiche Schemas teilen sich ein Listen-Objekt, Filter können ihre Ergebnisse
+    # daher über id(schema) cachen statt pro Produkt ein Tupel zu bilden
+    schema_pool = {}
+    
+    # Iterativ mit explizitem Stapel statt Rekursion (kein Frame pro Knoten, keine Rekursionsgrenze).
+    # Nach den Kindern eines Knotens wird eine Marke abgearbeitet, die seine Pfad-Einträge wieder entfernt.
+    leave_code = object()
+    leave_segment = object()
+    stack = [(data, None, 0)]
+    
+    while stack:
+        entry = stack.pop()
+        if entry is leave_code:
+            code_stack.pop()
+            path_segments.pop()
+            continue
+        if entry is leave_segment:
+            path_segments.pop()
+            continue
+        node, current_family, depth = entry
+        
+        # Produktfamilien sind auf Tiefe 1 (erste Code-Ebene)
+        if 'code' in node and depth == 1:
+            if node['code'] not in families:
+                families.append(node['code'])
+        
+        # Behandle Pattern-Knoten und Code-Knoten unterschiedlich
+        leave_marker = None
+        if 'pattern' in node:
+            # Pattern-Knoten: verwende Pattern-Wert im Pfad, aber überspringe bei Produktsuche
+            path_segments.append(f"pattern_{node['pattern']}")
+            leave_marker = leave_segment
+        elif 'code' in node:
+            path_segments.append(node['code'])
+            leave_marker = leave_segment
+            # Bestimme Produktfamilie (erste Code-Ebene - Tiefe 1)
+            if depth == 1:
+                current_family = node['code']
+            elif depth > 1:
+                code_stack.append(node['code'])
+                leave_marker = leave_code
+        
+        # Prüfe nur Knoten mit Code (keine Pattern-Knoten)
+        if 'code' in node:
+            # Gültiges Produkt: Endknoten oder Zwischenknoten mit Excel-Code
+            is_leaf = not node.get('children', [])
+            if is_leaf or node.get('is_intermediate_code', False):
+                # Code-Pfad (ohne root und Produktfamilie), Schema und full_typecode hängen nur von der Struktur ab
+                current_path = '-'.join(path_segments)
+                code_parts = tuple(code_stack)
+                product_schema = None
+                if code_parts:
+                    product_schema = calculate_code_schema(code_parts)
+                    product_schema = schema_pool.setdefault(tuple(product_schema), product_schema)
+                # Ersatzwert (Familie und Code durch Leerzeichen getrennt) nur bilden, wenn der Knoten keinen hat
+                if 'full_typecode' in node:
+                    full_typecode = node['full_typecode']
+                else:
+                    full_typecode = current_path.replace('-', ' ', 1)
+                search_text = '-'.join(code_parts)
+                search_texts = (search_text, search_text.upper())
+                product = (current_family, node, current_path, is_leaf, code_parts, product_schema, full_typecode, search_texts)
+                products.append(product)
+                by_family.setdefault(current_family, []).append(product)
+        
+        if leave_marker is not None:
+            stack.append(leave_marker)
+        # Kinder umgekehrt auflegen, damit sie in Baum-Reihenfolge abgearbeitet werden
+        child_depth = depth + 1
+        stack.extend([(child, current_family, child_depth) for child in reversed(node.get('children', []))])
     
-    return code_parts
+    return {
+        'families': families,
+        'products': products,
+        'by_family': by_family
+    }
+
 
-def find_products_by_schema(data, target_schemas=None, include_dates=False, product_family=None, prefix_match=False, pattern_rules=None, position_rules=None, group_start_rules=None, group_rules=None, group_count_config=None, contains_rules=None, group_content_rules=None, group_position_rules=None, analyze_group_position=None, exclude_group_rules=None, exclude_position_rules=None, exclude_contains_rules=None, negate_exclude=False, and_mode=False):
+def find_products_by_schema(data, target_schemas=None, include_dates=False, product_family=None, prefix_match=False, pattern_rules=None, position_rules=None, group_start_rules=None, group_rules=None, group_count_config=None, contains_rules=None, group_content_rules=None, group_position_rules=None, analyze_group_position=None, exclude_group_rules=None, exclude_position_rules=None, exclude_contains_rules=None, negate_exclude=False, and_mode=False, product_index=None):
     """
     Findet alle Produkte, die einem bestimmten Schema entsprechen.
     
@@ -1570,6 +1747,8 @@ def find_products_by_schema(data, target_schemas=None, include_dates=False, prod
         exclude_contains_rules: Liste von Exclude-Contains-Filter-Regeln
         negate_exclude: Wenn True, wird die Logik aller Filter umgekehrt (finde Produkte die NICHT den Kriterien entsprechen)
         and_mode: Wenn True, müssen ALLE Schemas erfüllt sein (UND-Verknüpfung), sonst reicht eines (ODER-Verknüpfung)
+        product_index: Optional - vorab mit build_product_index(data) aufgebauter Produkt-Index
+                       (spart die Baum-Traversierung bei mehreren Suchen auf demselben Baum)
         
     Returns:
         dict: Ergebnisse mit gefundenen Produkten
@@ -1592,209 +1771,97 @@ def find_products_by_schema(data, target_schemas=None, include_dates=False, prod
         # Liste von alten Schema-Listen zu neuen Schema-Objekten konvertieren
         target_schemas = [{'schema': schema, 'is_prefix': prefix_match} for schema in target_schemas]
     
-    # Erste Phase: Sammle alle verfügbaren Produktfamilien
-    def collect_families(node, depth=0):
-        # Produktfamilien sind auf Tiefe 1 (erste Code-Ebene)
-        if 'code' in node and depth == 1:
-            if node['code'] not in searched_families:
-                searched_families.append(node['code'])
-        
-        # Rekursiv für alle Children
-        for child in node.get('children', []):
-            collect_families(child, depth + 1)
+    # Produkte aus dem Index (einmalig pro Baum aufbaubar) statt den Baum bei jeder Suche neu zu durchlaufen
+    if product_index is None:
+        product_index = build_product_index(data)
     
-    # Sammle zuerst alle Familien
-    collect_families(data)
+    searched_families = list(product_index['families'])
     
-    def traverse_node(node, path="", current_family=None, depth=0):
-        nonlocal total_products_checked
-        
-        # Behandle Pattern-Knoten und Code-Knoten unterschiedlich
-        if 'pattern' in node:
-            # Pattern-Knoten: verwende Pattern-Wert im Pfad, aber überspringe bei Produktsuche
-            current_path = f"{path}-pattern_{node['pattern']}" if path else f"pattern_{node['pattern']}"
-        elif 'code' in node:
-            current_path = f"{path}-{node['code']}" if path else node['code']
-            # Bestimme Produktfamilie (erste Code-Ebene - Tiefe 1)
-            if depth == 1:
-                current_family = node['code']
+    # Wenn Produktfamilien-Filter gesetzt ist, nur Produkte dieser Familie prüfen
+    if product_family:
+        by_family = product_index['by_family']
+        if None in by_family:
+            # Produkte ohne Familie werden (wie bei der Traversierung) nie übersprungen
+            candidates = [product for product in product_index['products'] if product[0] is None or product[0] == product_family]
         else:
-            current_path = path
+            candidates = by_family.get(product_family, [])
+    else:
+        candidates = product_index['products']
+    
+    # Gesetzte Filter einmalig zu Prüf-Funktionen zusammenstellen statt pro Produkt alle Regeln abzufragen
+    filter_checks = compile_product_filters(
+        pattern_rules=pattern_rules,
+        position_rules=position_rules,
+        group_start_rules=group_start_rules,
+        group_rules=group_rules,
+        contains_rules=contains_rules,
+        group_content_rules=group_content_rules,
+        group_count_config=group_count_config,
+        group_position_rules=group_position_rules,
+        exclude_group_rules=exclude_group_rules,
+        exclude_position_rules=exclude_position_rules,
+        exclude_contains_rules=exclude_contains_rules
+    )
+    
+    # Ziel-Schemas einmalig zu einem Präfix-Baum zusammenstellen
+    # (Ergebnis pro Schema-Objekt gecacht, gleiche Schemas teilen sich ein Objekt)
+    schema_matcher = compile_schema_matcher(target_schemas, and_mode) if target_schemas is not None else None
+    schema_results = {}
+    # Als bool für den Vergleich in der Schleife (Aufrufer dürfen beliebige Wahrheitswerte übergeben)
+    negate_results = bool(negate_exclude)
+    
+    for current_family, node, current_path, is_leaf, code_parts, product_schema, full_typecode, search_texts in candidates:
+        total_products_checked += 1
         
-        # Wenn Produktfamilien-Filter gesetzt ist, überspringe andere Familien
-        skip_family = product_family and current_family and current_family != product_family
+        if not code_parts:
+            continue
         
-        # Prüfe nur Knoten mit Code (keine Pattern-Knoten)
-        if 'code' in node and not skip_family:
-            # Prüfe ob es ein gültiges Produkt ist (Endknoten oder Zwischenknoten mit Excel-Code)
-            is_leaf = not node.get('children', [])
-            is_intermediate_with_code = node.get('is_intermediate_code', False)
+        # Vergleiche mit Ziel-Schemas (nur wenn target_schemas angegeben)
+        schema_matches = True  # Standardmäßig True für Pattern-only Suchen
+        matched_schema_objs = []
+        if schema_matcher is not None:
+            schema_key = id(product_schema)
+            if schema_key in schema_results:
+                matched = schema_results[schema_key]
+            else:
+                matched = schema_results[schema_key] = schema_matcher(product_schema)
+            if matched is None:
+                schema_matches = False
+            else:
+                matched_schema_objs = matched
+        
+        # Kombiniere alle Filter-Bedingungen (Abbruch beim ersten nicht erfüllten Filter):
+        # positive Prüfungen müssen True liefern, Exclude-Prüfungen (wenn eines matcht, Produkt ausschließen) False
+        filters_match = schema_matches
+        if filters_match:
+            for check, is_exclude in filter_checks:
+                if (not check(node, current_family, full_typecode, code_parts, product_schema, search_texts)) != is_exclude:
+                    filters_match = False
+                    break
+        
+        # Bestimme finale Bedingung basierend auf negate_exclude Flag:
+        # Normal: Alle positiven Filter müssen erfüllt sein UND Exclude-Filter dürfen nicht matchen
+        # Negiert: Finde Produkte die NICHT alle positiven Filter erfüllen ODER die Exclude-Kriterien erfüllen,
+        # also genau das Gegenteil -> ohne Verzweigung über != mit dem (schleifeninvarianten) Flag
+        final_condition = filters_match != negate_results
+        
+        if final_condition:
+            product_info = {
+                'full_typecode': full_typecode,
+                'code_path': current_path,
+                'schema': product_schema,
+                'matched_schema_objs': matched_schema_objs,
+                'type': 'leaf' if is_leaf else 'intermediate',
+                'position': node.get('position'),
+                'code_parts': code_parts,
+                'family': current_family
+            }
             
-            if is_leaf or is_intermediate_with_code:
-                total_products_checked += 1
-                
-                # Extrahiere Code-Pfad (ohne root und Produktfamilie)
-                # print(f"\nÜberprüfe Produkt: {current_path}")
-                code_parts = extract_code_path(current_path)
-                
-                if code_parts:
-                    # Berechne Schema
-                    product_schema = calculate_code_schema(code_parts)
-                    
-                    # Hole full_typecode für Filter
-                    full_typecode = node.get('full_typecode', current_path.replace('-', ' ', 1).replace('-', '-'))
-                    
-                    # Prüfe Pattern-Filter
-                    pattern_matches = True
-                    if pattern_rules:
-                        pattern_matches = matches_pattern_filter(product_schema, pattern_rules, code_parts)
-                    
-                    # Prüfe Absolute-Position-Filter
-                    position_matches = True
-                    if position_rules:
-                        position_matches = matches_position_filter(full_typecode, position_rules)
-                    
-                    # Prüfe Gruppen-Start-Position-Filter
-                    group_start_matches = True
-                    if group_start_rules:
-                        node_position = node.get('position')
-                        group_start_matches = matches_group_start_filter(full_typecode, code_parts, group_start_rules, node_position)
-                    
-                    # Prüfe Gruppen-Filter
-                    group_matches = True
-                    if group_rules:
-                        group_matches = matches_group_filter(node, current_family, group_rules)
-                    
-                    # Prüfe Contains-Filter
-                    contains_matches = True
-                    if contains_rules:
-                        contains_matches = matches_contains_filter(full_typecode, code_parts, current_family, contains_rules)
-                    
-                    # Prüfe Gruppen-Inhalt-Filter
-                    group_content_matches = True
-                    if group_content_rules:
-                        group_content_matches = matches_group_content_filter(code_parts, group_content_rules)
-                    
-                    # Prüfe Exclude-Filter (wenn eines matcht, Produkt ausschließen)
-                    exclude_matches = False
-                    if exclude_group_rules:
-                        exclude_matches = exclude_matches or matches_exclude_group_filter(code_parts, exclude_group_rules)
-                    if not exclude_matches and exclude_position_rules:
-                        exclude_matches = exclude_matches or matches_exclude_position_filter(full_typecode, exclude_position_rules)
-                    if not exclude_matches and exclude_contains_rules:
-                        exclude_matches = exclude_matches or matches_exclude_contains_filter(full_typecode, code_parts, current_family, exclude_contains_rules)
-                    
-                    # Prüfe erweiterten Gruppen-Anzahl-Filter
-                    group_count_matches = True
-                    if group_count_config is not None:
-                        group_count_matches = matches_extended_group_count_filter(product_schema, group_count_config)
-                    
-                    # Prüfe Gruppen-Position-Filter mit OR-Verknüpfung
-                    group_position_matches = True
-                    if group_position_rules:
-                        # group_position_rules ist jetzt eine Liste von OR-Gruppen: [[rule1, rule2], [rule3]]
-                        # Äußere Liste = OR, innere Liste = UND
-                        # Mindestens eine OR-Gruppe muss erfüllt sein
-                        or_results = []
-                        for or_group in group_position_rules:
-                            # Alle Regeln in dieser OR-Gruppe müssen erfüllt sein (UND)
-                            and_result = all(matches_group_position_filter(code_parts, [rule]) for rule in or_group)
-                            or_results.append(and_result)
-                        # Mindestens ein OR-Ergebnis muss True sein
-                        group_position_matches = any(or_results) if or_results else True
-                    
-                    # Vergleiche mit Ziel-Schemas (nur wenn target_schemas angegeben)
-                    schema_matches = True  # Standardmäßig True für Pattern-only Suchen
-                    matched_schema_objs = []
-                    if target_schemas is not None:
-                        if and_mode:
-                            # UND-Modus: ALLE Schemas müssen erfüllt sein
-                            schema_matches = True
-                            for schema_obj in target_schemas:
-                                target_schema = schema_obj['schema']
-                                is_prefix_match = schema_obj['is_prefix']
-                                current_match = False
-                                
-                                if is_prefix_match:
-                                    # Präfix-Match: Ziel-Schema muss am Anfang des Produkt-Schemas stehen
-                                    if len(product_schema) >= len(target_schema):
-                                        if product_schema[:len(target_schema)] == target_schema:
-                                            current_match = True
-                                            matched_schema_objs.append(schema_obj)
-                                else:
-                                    # Exakter Match
-                                    if product_schema == target_schema:
-                                        current_match = True
-                                        matched_schema_objs.append(schema_obj)
-                                
-                                # Bei UND-Modus: Wenn ein Schema nicht erfüllt ist, ist das ganze Produkt ungültig
-                                if not current_match:
-                                    schema_matches = False
-                                    break
-                            
-                            # Wenn nicht alle Schemas erfüllt sind, leere die matched_schema_objs
-                            if not schema_matches:
-                                matched_schema_objs = []
-                        else:
-                            # ODER-Modus: Mindestens ein Schema muss erfüllt sein (bisheriges Verhalten)
-                            schema_matches = False
-                            for schema_obj in target_schemas:
-                                target_schema = schema_obj['schema']
-                                is_prefix_match = schema_obj['is_prefix']
-                                
-                                if is_prefix_match:
-                                    # Präfix-Match: Ziel-Schema muss am Anfang des Produkt-Schemas stehen
-                                    if len(product_schema) >= len(target_schema):
-                                        if product_schema[:len(target_schema)] == target_schema:
-                                            schema_matches = True
-                                            matched_schema_objs.append(schema_obj)
-                                            # Im ODER-Modus: Weiter suchen, um alle passenden Schemas zu sammeln
-                                else:
-                                    # Exakter Match
-                                    if product_schema == target_schema:
-                                        schema_matches = True
-                                        matched_schema_objs.append(schema_obj)
-                                        # Im ODER-Modus: Weiter suchen, um alle passenden Schemas zu sammeln
-                    
-                    # Kombiniere alle Filter-Bedingungen
-                    all_positive_filters_match = (schema_matches and pattern_matches and position_matches and 
-                                               group_start_matches and group_matches and contains_matches and 
-                                               group_content_matches and group_count_matches and group_position_matches)
-                    
-                    # Bestimme finale Bedingung basierend auf negate_exclude Flag
-                    if negate_exclude:
-                        # Negiert: Finde Produkte die NICHT alle positiven Filter erfüllen ODER die Exclude-Kriterien erfüllen
-                        final_condition = not all_positive_filters_match or exclude_matches
-                    else:
-                        # Normal: Alle positiven Filter müssen erfüllt sein UND Exclude-Filter dürfen nicht matchen
-                        final_condition = all_positive_filters_match and not exclude_matches
-                    
-                    if final_condition:
-                        product_info = {
-                            'full_typecode': full_typecode,
-                            'code_path': current_path,
-                            'schema': product_schema,
-                            'matched_schema_objs': matched_schema_objs,
-                            'type': 'leaf' if is_leaf else 'intermediate',
-                            'position': node.get('position'),
-                            'code_parts': code_parts,
-                            'family': current_family
-                        }
-                        
-                        # Füge Datumsangaben hinzu falls gewünscht
-                        if include_dates and 'date_info' in node:
-                            product_info['date_info'] = node['date_info']
-                        
-                        matching_products.append(product_info)
-        
-        # Rekursiv für alle Children (auch Pattern-Knoten durchlaufen)
-        # Nur durchlaufen wenn Familie nicht übersprungen wird
-        if not skip_family:
-            for child in node.get('children', []):
-                traverse_node(child, current_path, current_family, depth + 1)
-    
-    # Starte Traversierung
-    traverse_node(data)
+            # Füge Datumsangaben hinzu falls gewünscht
+            if include_dates and 'date_info' in node:
+                product_info['date_info'] = node['date_info']
+            
+            matching_products.append(product_info)
     
     return {
         'target_schemas': target_schemas,
@@ -2062,7 +2129,7 @@ def export_filter_criteria(results, output_file=None):
         ],
         "metadata": {
             "description": "Auto-generated filter criteria from schema_search.py",
-            "created": datetime.now().strftime("%Y-%m-%d"),
+            "created": time.strftime("%Y-%m-%d"),
             "version": "1.0",
             "search_results": {
                 "match_count": results['match_count'],
@@ -2167,8 +2234,13 @@ def export_filter_criteria(results, output_file=None):
             export_data["group_mappings"] = group_mappings
     
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
+        if ORJSON_AVAILABLE:
+            # Gleiche Ausgabe (UTF-8, 2 Leerzeichen Einrückung), nur nativ serialisiert
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(export_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(export_data, f, ensure_ascii=False, indent=2)
         
         return output_file
     except Exception as e:
@@ -2176,260 +2248,276 @@ def export_filter_criteria(results, output_file=None):
         return None
 
 
-def print_results(results, show_details=False):
+def print_results(results, show_details=False, limit=None):
     """
     Druckt die Suchergebnisse formatiert aus.
     
     Args:
         results: Ergebnisse von find_products_by_schema
         show_details: Ob Details der gefundenen Produkte angezeigt werden sollen
+        limit: Maximale Anzahl detailliert angezeigter Endprodukte bzw. Zwischenprodukte (None = alle)
     """
-    print(f"=== SCHEMA-SUCHE ERGEBNISSE ===")
-    if results.get('target_schemas'):
-        if len(results['target_schemas']) == 1:
-            schema_obj = results['target_schemas'][0]
-            prefix_suffix = ':prefix' if schema_obj['is_prefix'] else ''
-            print(f"Gesuchtes Schema: {schema_obj['schema']}{prefix_suffix}")
-        else:
-            schema_strs = []
-            for schema_obj in results['target_schemas']:
-                prefix_suffix = ':prefix' if schema_obj['is_prefix'] else ''
-                schema_strs.append(f"{schema_obj['schema']}{prefix_suffix}")
-            print(f"Gesuchte Schemas: {', '.join(schema_strs)}")
-    if results.get('pattern_rules'):
-        pattern_desc = []
-        for rule in results['pattern_rules']:
-            pos = "letzte" if rule['position'] == 'last' else f"{rule['position']}."
-            negate = rule.get('negate', False)
-            operator_text = " ≠ " if negate else " = "
-            
-            if rule['min_len'] == rule['max_len']:
-                pattern_desc.append(f"{pos} Gruppe{operator_text}{rule['min_len']}")
-            else:
-                pattern_desc.append(f"{pos} Gruppe{operator_text}{rule['min_len']}-{rule['max_len']}")
-        print(f"Pattern-Filter: {', '.join(pattern_desc)}")
+    # Ausgabe sammeln und am Ende in einem Rutsch schreiben (auch bei vorzeitigem return)
+    buf = io.StringIO()
+    p = buf.write
     
-    if results.get('position_rules'):
-        position_desc = []
-        for rule in results['position_rules']:
-            if rule.get('is_prefix', False):
-                position_desc.append(f"Pos {rule['position']} beginnt mit '{rule['value']}'")
+    try:
+        p(f"=== SCHEMA-SUCHE ERGEBNISSE ===\n")
+        if results.get('target_schemas'):
+            if len(results['target_schemas']) == 1:
+                schema_obj = results['target_schemas'][0]
+                prefix_suffix = ':prefix' if schema_obj['is_prefix'] else ''
+                p(f"Gesuchtes Schema: {schema_obj['schema']}{prefix_suffix}\n")
             else:
-                position_desc.append(f"Pos {rule['position']} = '{rule['value']}' (exakt)")
-        print(f"Position-Filter: {', '.join(position_desc)}")
-    
-    if results.get('group_start_rules'):
-        group_start_desc = []
-        for rule in results['group_start_rules']:
-            group_start_desc.append(f"Gruppe {rule['group']} startet bei Pos {rule['start_position']}")
-        print(f"Gruppen-Start-Filter: {', '.join(group_start_desc)}")
-    
-    if results.get('group_rules'):
-        group_desc = []
-        for family, groups in results['group_rules'].items():
-            if family == 'default':
-                if len(groups) == 1:
-                    group_desc.append(f"Gruppe = '{groups[0]}' (alle Familien)")
+                schema_strs = []
+                for schema_obj in results['target_schemas']:
+                    prefix_suffix = ':prefix' if schema_obj['is_prefix'] else ''
+                    schema_strs.append(f"{schema_obj['schema']}{prefix_suffix}")
+                p(f"Gesuchte Schemas: {', '.join(schema_strs)}\n")
+        if results.get('pattern_rules'):
+            pattern_desc = []
+            for rule in results['pattern_rules']:
+                pos = "letzte" if rule['position'] == 'last' else f"{rule['position']}."
+                negate = rule.get('negate', False)
+                operator_text = " ≠ " if negate else " = "
+                
+                if rule['min_len'] == rule['max_len']:
+                    pattern_desc.append(f"{pos} Gruppe{operator_text}{rule['min_len']}")
                 else:
-                    group_desc.append(f"Gruppe = '{' oder '.join(groups)}' (alle Familien)")
-            else:
-                if len(groups) == 1:
-                    group_desc.append(f"{family} = '{groups[0]}'")
+                    pattern_desc.append(f"{pos} Gruppe{operator_text}{rule['min_len']}-{rule['max_len']}")
+            p(f"Pattern-Filter: {', '.join(pattern_desc)}\n")
+        
+        if results.get('position_rules'):
+            position_desc = []
+            for rule in results['position_rules']:
+                if rule.get('is_prefix', False):
+                    position_desc.append(f"Pos {rule['position']} beginnt mit '{rule['value']}'")
                 else:
-                    group_desc.append(f"{family} = '{' oder '.join(groups)}'")
-        print(f"Gruppen-Filter: {', '.join(group_desc)}")
-    
-    # Gruppen-Anzahl-Filter (erweitert)
-    if results.get('group_count_config') is not None:
-        config = results['group_count_config']
-        if config['type'] == 'exact':
-            count = config['value']
-            print(f"Gruppen-Anzahl-Filter: Genau {count} {'Gruppe' if count == 1 else 'Gruppen'}")
-        elif config['type'] == 'greater':
-            print(f"Gruppen-Anzahl-Filter: Mehr als {config['value']} Gruppen")
-        elif config['type'] == 'greater_equal':
-            print(f"Gruppen-Anzahl-Filter: {config['value']} oder mehr Gruppen")
-        elif config['type'] == 'less':
-            print(f"Gruppen-Anzahl-Filter: Weniger als {config['value']} Gruppen")
-        elif config['type'] == 'less_equal':
-            print(f"Gruppen-Anzahl-Filter: {config['value']} oder weniger Gruppen")
-        elif config['type'] == 'range':
-            print(f"Gruppen-Anzahl-Filter: Zwischen {config['min']} und {config['max']} Gruppen")
-        elif config['type'] == 'multiple':
-            values_str = ', '.join(map(str, config['values']))
-            print(f"Gruppen-Anzahl-Filter: Genau {values_str} Gruppen")
-    
-    if results.get('contains_rules'):
-        contains_desc = []
-        
-        # Gruppiere nach or_group für bessere Anzeige
-        or_groups = {}
-        and_rules = []
-        
-        for rule in results['contains_rules']:
-            or_group = rule['or_group']
-            if or_group == 0:
-                and_rules.append(rule)
-            else:
-                if or_group not in or_groups:
-                    or_groups[or_group] = []
-                or_groups[or_group].append(rule)
-        
-        # UND-Regeln anzeigen
-        for rule in and_rules:
-            case_info = " (case-sensitive)" if rule.get('case_sensitive', False) else ""
-            contains_desc.append(f"Code enthält '{rule['value']}'{case_info}")
-        
-        # ODER-Gruppen anzeigen
-        for or_group_id, or_rules in or_groups.items():
-            or_values = []
-            for rule in or_rules:
+                    position_desc.append(f"Pos {rule['position']} = '{rule['value']}' (exakt)")
+            p(f"Position-Filter: {', '.join(position_desc)}\n")
+        
+        if results.get('group_start_rules'):
+            group_start_desc = []
+            for rule in results['group_start_rules']:
+                group_start_desc.append(f"Gruppe {rule['group']} startet bei Pos {rule['start_position']}")
+            p(f"Gruppen-Start-Filter: {', '.join(group_start_desc)}\n")
+        
+        if results.get('group_rules'):
+            group_desc = []
+            for family, groups in results['group_rules'].items():
+                if family == 'default':
+                    if len(groups) == 1:
+                        group_desc.append(f"Gruppe = '{groups[0]}' (alle Familien)")
+                    else:
+                        group_desc.append(f"Gruppe = '{' oder '.join(groups)}' (alle Familien)")
+                else:
+                    if len(groups) == 1:
+                        group_desc.append(f"{family} = '{groups[0]}'")
+                    else:
+                        group_desc.append(f"{family} = '{' oder '.join(groups)}'")
+            p(f"Gruppen-Filter: {', '.join(group_desc)}\n")
+        
+        # Gruppen-Anzahl-Filter (erweitert)
+        if results.get('group_count_config') is not None:
+            config = results['group_count_config']
+            if config['type'] == 'exact':
+                count = config['value']
+                p(f"Gruppen-Anzahl-Filter: Genau {count} {'Gruppe' if count == 1 else 'Gruppen'}\n")
+            elif config['type'] == 'greater':
+                p(f"Gruppen-Anzahl-Filter: Mehr als {config['value']} Gruppen\n")
+            elif config['type'] == 'greater_equal':
+                p(f"Gruppen-Anzahl-Filter: {config['value']} oder mehr Gruppen\n")
+            elif config['type'] == 'less':
+                p(f"Gruppen-Anzahl-Filter: Weniger als {config['value']} Gruppen\n")
+            elif config['type'] == 'less_equal':
+                p(f"Gruppen-Anzahl-Filter: {config['value']} oder weniger Gruppen\n")
+            elif config['type'] == 'range':
+                p(f"Gruppen-Anzahl-Filter: Zwischen {config['min']} und {config['max']} Gruppen\n")
+            elif config['type'] == 'multiple':
+                values_str = ', '.join(map(str, config['values']))
+                p(f"Gruppen-Anzahl-Filter: Genau {values_str} Gruppen\n")
+        
+        if results.get('contains_rules'):
+            contains_desc = []
+            
+            # Gruppiere nach or_group für bessere Anzeige
+            or_groups = {}
+            and_rules = []
+            
+            for rule in results['contains_rules']:
+                or_group = rule['or_group']
+                if or_group == 0:
+                    and_rules.append(rule)
+                else:
+                    if or_group not in or_groups:
+                        or_groups[or_group] = []
+                    or_groups[or_group].append(rule)
+            
+            # UND-Regeln anzeigen
+            for rule in and_rules:
                 case_info = " (case-sensitive)" if rule.get('case_sensitive', False) else ""
-                or_values.append(f"'{rule['value']}'{case_info}")
-            contains_desc.append(f"Code enthält ({' ODER '.join(or_values)})")
+                contains_desc.append(f"Code enthält '{rule['value']}'{case_info}")
+            
+            # ODER-Gruppen anzeigen
+            for or_group_id, or_rules in or_groups.items():
+                or_values = []
+                for rule in or_rules:
+                    case_info = " (case-sensitive)" if rule.get('case_sensitive', False) else ""
+                    or_values.append(f"'{rule['value']}'{case_info}")
+                contains_desc.append(f"Code enthält ({' ODER '.join(or_values)})")
+            
+            p(f"Contains-Filter: {', '.join(contains_desc)}\n")
         
-        print(f"Contains-Filter: {', '.join(contains_desc)}")
-    
-    if results.get('group_content_rules'):
-        group_content_desc = []
-        for rule in results['group_content_rules']:
-            if rule.get('is_prefix', False):
-                group_content_desc.append(f"Gruppe {rule['group']} beginnt mit '{rule['value']}'")
-            else:
-                group_content_desc.append(f"Gruppe {rule['group']} = '{rule['value']}' (exakt)")
-        print(f"Gruppen-Inhalt-Filter: {', '.join(group_content_desc)}")
-    
-    if results.get('group_position_rules'):
-        group_position_desc = []
-        for or_idx, or_group in enumerate(results['group_position_rules']):
-            # Jede OR-Gruppe ist eine Liste von AND-Regeln
-            and_parts = []
-            for rule in or_group:
-                negate = rule.get('negate', False)
-                is_prefix = rule.get('is_prefix', False)
-                operator_text = " ≠ " if negate else " = "
-                prefix_text = "beginnt mit " if is_prefix else ""
-                if rule.get('explicit_range', False):
-                    and_parts.append(f"Gruppe {rule['group']} Position {rule['start_pos']}-{rule['end_pos']} {operator_text} {prefix_text}'{rule['value']}'")
+        if results.get('group_content_rules'):
+            group_content_desc = []
+            for rule in results['group_content_rules']:
+                if rule.get('is_prefix', False):
+                    group_content_desc.append(f"Gruppe {rule['group']} beginnt mit '{rule['value']}'")
                 else:
-                    and_parts.append(f"Gruppe {rule['group']} Position {rule['start_pos']} {operator_text} {prefix_text}'{rule['value']}'")
-            # Wenn mehr als eine OR-Gruppe existiert, gruppiere mit Klammern
-            if len(results['group_position_rules']) > 1:
-                group_position_desc.append(f"({' UND '.join(and_parts)})")
+                    group_content_desc.append(f"Gruppe {rule['group']} = '{rule['value']}' (exakt)")
+            p(f"Gruppen-Inhalt-Filter: {', '.join(group_content_desc)}\n")
+        
+        if results.get('group_position_rules'):
+            group_position_desc = []
+            for or_idx, or_group in enumerate(results['group_position_rules']):
+                # Jede OR-Gruppe ist eine Liste von AND-Regeln
+                and_parts = []
+                for rule in or_group:
+                    negate = rule.get('negate', False)
+                    is_prefix = rule.get('is_prefix', False)
+                    operator_text = " ≠ " if negate else " = "
+                    prefix_text = "beginnt mit " if is_prefix else ""
+                    if rule.get('explicit_range', False):
+                        and_parts.append(f"Gruppe {rule['group']} Position {rule['start_pos']}-{rule['end_pos']} {operator_text} {prefix_text}'{rule['value']}'")
+                    else:
+                        and_parts.append(f"Gruppe {rule['group']} Position {rule['start_pos']} {operator_text} {prefix_text}'{rule['value']}'")
+                # Wenn mehr als eine OR-Gruppe existiert, gruppiere mit Klammern
+                if len(results['group_position_rules']) > 1:
+                    group_position_desc.append(f"({' UND '.join(and_parts)})")
+                else:
+                    group_position_desc.extend(and_parts)
+            # Verbinde OR-Gruppen mit " ODER "
+            p(f"Gruppen-Position-Filter: {' ODER '.join(group_position_desc)}\n")
+        
+        if results.get('prefix_match'):
+            p(f"Match-Typ: Präfix-Match (findet auch längere Schemas)\n")
+        elif results.get('target_schemas'):
+            # Prüfe ob gemischte Match-Typen verwendet werden
+            # Ein Durchlauf: Menge der vorkommenden is_prefix-Werte
+            prefix_flags = {bool(s['is_prefix']) for s in results['target_schemas']}
+            has_prefix = True in prefix_flags
+            has_exact = False in prefix_flags
+            
+            and_mode = results.get('and_mode', False)
+            and_suffix = " (UND-Verknüpfung)" if and_mode else " (ODER-Verknüpfung)"
+            
+            if has_prefix and has_exact:
+                p(f"Match-Typ: Gemischte Matches (exakt + präfix){and_suffix}\n")
+            elif has_prefix:
+                p(f"Match-Typ: Präfix-Match{and_suffix}\n")
             else:
-                group_position_desc.extend(and_parts)
-        # Verbinde OR-Gruppen mit " ODER "
-        print(f"Gruppen-Position-Filter: {' ODER '.join(group_position_desc)}")
-    
-    if results.get('prefix_match'):
-        print(f"Match-Typ: Präfix-Match (findet auch längere Schemas)")
-    elif results.get('target_schemas'):
-        # Prüfe ob gemischte Match-Typen verwendet werden
-        has_prefix = any(s['is_prefix'] for s in results['target_schemas'])
-        has_exact = any(not s['is_prefix'] for s in results['target_schemas'])
-        
-        and_mode = results.get('and_mode', False)
-        and_suffix = " (UND-Verknüpfung)" if and_mode else " (ODER-Verknüpfung)"
-        
-        if has_prefix and has_exact:
-            print(f"Match-Typ: Gemischte Matches (exakt + präfix){and_suffix}")
-        elif has_prefix:
-            print(f"Match-Typ: Präfix-Match{and_suffix}")
+                p(f"Match-Typ: Exakter Match{and_suffix}\n")
         else:
-            print(f"Match-Typ: Exakter Match{and_suffix}")
-    else:
-        print(f"Match-Typ: Filter-basierte Suche")
-    if results.get('product_family_filter'):
-        print(f"Produktfamilie: {results['product_family_filter']}")
-        # Prüfe ob die Familie in den durchsuchten Familien ist
-        if results['product_family_filter'] not in results.get('searched_families', []):
-            print(f"❌ Produktfamilie '{results['product_family_filter']}' nicht gefunden!")
-            print(f"Verfügbare Familien: {', '.join(results.get('searched_families', [])[:10])}")
+            p(f"Match-Typ: Filter-basierte Suche\n")
+        if results.get('product_family_filter'):
+            p(f"Produktfamilie: {results['product_family_filter']}\n")
+            # Prüfe ob die Familie in den durchsuchten Familien ist
+            if results['product_family_filter'] not in results.get('searched_families', []):
+                p(f"❌ Produktfamilie '{results['product_family_filter']}' nicht gefunden!\n")
+                p(f"Verfügbare Familien: {', '.join(results.get('searched_families', [])[:10])}\n")
+                return
+        else:
+            families_found = results.get('searched_families', [])
+            if families_found:
+                p(f"Durchsuchte Produktfamilien: {len(families_found)} ({', '.join(families_found[:5])}{'...' if len(families_found) > 5 else ''})\n")
+        
+        p(f"Gefundene Produkte: {results['match_count']}\n")
+        p(f"Geprüfte Produkte: {results['total_products_checked']}\n")
+        p(f"Trefferquote: {results['match_percentage']}%\n")
+        p("\n")
+        
+        if results['match_count'] == 0:
+            p("❌ Keine Produkte mit diesem Schema gefunden.\n")
             return
-    else:
-        families_found = results.get('searched_families', [])
-        if families_found:
-            print(f"Durchsuchte Produktfamilien: {len(families_found)} ({', '.join(families_found[:5])}{'...' if len(families_found) > 5 else ''})")
-    
-    print(f"Gefundene Produkte: {results['match_count']}")
-    print(f"Geprüfte Produkte: {results['total_products_checked']}")
-    print(f"Trefferquote: {results['match_percentage']}%")
-    print()
-    
-    if results['match_count'] == 0:
-        print("❌ Keine Produkte mit diesem Schema gefunden.")
-        return
-    
-    # Gruppiere nach Typ
-    leaves = [p for p in results['matching_products'] if p['type'] == 'leaf']
-    intermediates = [p for p in results['matching_products'] if p['type'] == 'intermediate']
-    
-    print(f"📊 Verteilung:")
-    print(f"  - Endprodukte (Blätter): {len(leaves)}")
-    print(f"  - Zwischenprodukte: {len(intermediates)}")
-    print()
-    
-    if show_details:
-        print("📋 DETAILS DER GEFUNDENEN PRODUKTE:")
-        print()
-        
-        if leaves:
-            print("🔹 ENDPRODUKTE:")
-            for i, product in enumerate(leaves[0:], 1):  # Zeige maximal 10
-                print(f"  {i}. {product['full_typecode']}")
-                # print(f"     Teile: {' → '.join(product['code_parts'])}")
-                if show_details and product.get('matched_schema_objs'):
-                    # Zeige alle gematchten Schemas
-                    matched_info = []
-                    for schema_obj in product['matched_schema_objs']:
-                        if schema_obj['is_prefix'] and product['schema'] != schema_obj['schema']:
-                            matched_info.append(f"präfix {schema_obj['schema']}")
-                        else:
-                            matched_info.append(f"exakt {schema_obj['schema']}")
-                    if matched_info:
-                        print(f"     Schema: {product['schema']} (erfüllt: {', '.join(matched_info)})")
-                if 'date_info' in product:
-                    date_info = product['date_info']
-                    if 'creation_date' in date_info:
-                        print(f"     Erstellt: {date_info['creation_date']['earliest']}")
-                print()
+        
+        # Gruppiere nach Typ (ein Durchlauf über die Treffer)
+        leaves = []
+        intermediates = []
+        for product in results['matching_products']:
+            product_type = product['type']
+            if product_type == 'leaf':
+                leaves.append(product)
+            elif product_type == 'intermediate':
+                intermediates.append(product)
+        
+        p(f"📊 Verteilung:\n")
+        p(f"  - Endprodukte (Blätter): {len(leaves)}\n")
+        p(f"  - Zwischenprodukte: {len(intermediates)}\n")
+        p("\n")
+        
+        if show_details:
+            p("📋 DETAILS DER GEFUNDENEN PRODUKTE:\n")
+            p("\n")
             
-            # if len(leaves) > 10:
-            #     print(f"     ... und {len(leaves) - 10} weitere Endprodukte")
-            #     print()
-        
-        if intermediates:
-            print("🔹 ZWISCHENPRODUKTE:")
-            for i, product in enumerate(intermediates[0:], 1):  # Zeige maximal 5
-                print(f"  {i}. {product['full_typecode']}")
-                # print(f"     Teile: {' → '.join(product['code_parts'])}")
-                if show_details and product.get('matched_schema_objs'):
-                    # Zeige alle gematchten Schemas
-                    matched_info = []
-                    for schema_obj in product['matched_schema_objs']:
-                        if schema_obj['is_prefix'] and product['schema'] != schema_obj['schema']:
-                            matched_info.append(f"präfix {schema_obj['schema']}")
-                        else:
-                            matched_info.append(f"exakt {schema_obj['schema']}")
-                    if matched_info:
-                        print(f"     Schema: {product['schema']} (erfüllt: {', '.join(matched_info)})")
-                if 'date_info' in product:
-                    date_info = product['date_info']
-                    if 'creation_date' in date_info:
-                        print(f"     Erstellt: {date_info['creation_date']['earliest']}")
-                print()
+            if leaves:
+                p("🔹 ENDPRODUKTE:\n")
+                for i, product in enumerate(islice(leaves, limit), 1):
+                    p(f"  {i}. {product['full_typecode']}\n")
+                    # print(f"     Teile: {' → '.join(product['code_parts'])}")
+                    if show_details and product.get('matched_schema_objs'):
+                        # Zeige alle gematchten Schemas
+                        matched_info = []
+                        for schema_obj in product['matched_schema_objs']:
+                            if schema_obj['is_prefix'] and product['schema'] != schema_obj['schema']:
+                                matched_info.append(f"präfix {schema_obj['schema']}")
+                            else:
+                                matched_info.append(f"exakt {schema_obj['schema']}")
+                        if matched_info:
+                            p(f"     Schema: {product['schema']} (erfüllt: {', '.join(matched_info)})\n")
+                    if 'date_info' in product:
+                        date_info = product['date_info']
+                        if 'creation_date' in date_info:
+                            p(f"     Erstellt: {date_info['creation_date']['earliest']}\n")
+                    p("\n")
+                
+                if limit is not None and len(leaves) > limit:
+                    p(f"     ... und {len(leaves) - limit} weitere Endprodukte\n")
+                    p("\n")
             
-            # if len(intermediates) > 5:
-            #     print(f"     ... und {len(intermediates) - 5} weitere Zwischenprodukte")
-    else:
-        # Zeige nur erste paar Beispiele
-        print("📋 BEISPIELE (verwende --details für vollständige Liste):")
-        examples = results['matching_products'][:5]
-        for i, product in enumerate(examples, 1):
-            print(f"  {i}. {product['full_typecode']} ({product['type']})")
-        
-        if len(results['matching_products']) > 5:
-            print(f"     ... und {len(results['matching_products']) - 5} weitere")
+            if intermediates:
+                p("🔹 ZWISCHENPRODUKTE:\n")
+                for i, product in enumerate(islice(intermediates, limit), 1):
+                    p(f"  {i}. {product['full_typecode']}\n")
+                    # print(f"     Teile: {' → '.join(product['code_parts'])}")
+                    if show_details and product.get('matched_schema_objs'):
+                        # Zeige alle gematchten Schemas
+                        matched_info = []
+                        for schema_obj in product['matched_schema_objs']:
+                            if schema_obj['is_prefix'] and product['schema'] != schema_obj['schema']:
+                                matched_info.append(f"präfix {schema_obj['schema']}")
+                            else:
+                                matched_info.append(f"exakt {schema_obj['schema']}")
+                        if matched_info:
+                            p(f"     Schema: {product['schema']} (erfüllt: {', '.join(matched_info)})\n")
+                    if 'date_info' in product:
+                        date_info = product['date_info']
+                        if 'creation_date' in date_info:
+                            p(f"     Erstellt: {date_info['creation_date']['earliest']}\n")
+                    p("\n")
+                
+                if limit is not None and len(intermediates) > limit:
+                    p(f"     ... und {len(intermediates) - limit} weitere Zwischenprodukte\n")
+        else:
+            # Zeige nur erste paar Beispiele
+            p("📋 BEISPIELE (verwende --details für vollständige Liste):\n")
+            examples = results['matching_products'][:5]
+            for i, product in enumerate(examples, 1):
+                p(f"  {i}. {product['full_typecode']} ({product['type']})\n")
+            
+            if len(results['matching_products']) > 5:
+                p(f"     ... und {len(results['matching_products']) - 5} weitere\n")
+    finally:
+        sys.stdout.write(buf.getvalue())
 
 
 def main():
@@ -2515,14 +2603,24 @@ Beispiele:
     parser.add_argument('--with-dates', 
                        action='store_true',
                        help='Verwende JSON-Datei mit Datumsangaben')
+    parser.add_argument('--cache',
+                       action='store_true',
+                       help='Baum und Produkt-Index als Pickle-Cache neben der JSON-Datei ablegen bzw. von dort laden')
     parser.add_argument('--details', 
                        action='store_true',
                        help='Zeige detaillierte Informationen zu den gefundenen Produkten')
+    parser.add_argument('--limit',
+                       type=int,
+                       help='Zeige mit --details höchstens N Endprodukte und N Zwischenprodukte (Standard: alle)')
     parser.add_argument('--export-filter', 
                        help='Exportiere Filter-Kriterien als JSON für label_mapper.py (z.B. --export-filter filter_bcc.json)')
     
     args = parser.parse_args()
     
+    if args.limit is not None and args.limit < 0:
+        print("❌ Fehler: --limit muss >= 0 sein!")
+        sys.exit(1)
+    
     # Parse Schemas (optional wenn --pattern verwendet wird)
     target_schemas = None
     if args.schemas:
@@ -2745,8 +2843,11 @@ Beispiele:
     
     # Lade JSON-Daten
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if args.cache:
+            data, product_index = load_json_file_cached(json_file, with_product_index=True)
+        else:
+            data = load_json_file(json_file)
+            product_index = build_product_index(data)
     except Exception as e:
         print(f"❌ Fehler beim Laden der JSON-Datei: {e}")
         sys.exit(1)
@@ -2754,10 +2855,11 @@ Beispiele:
     # Führe Suche durch
     results = find_products_by_schema(data, target_schemas, args.with_dates, args.family, args.prefix, 
                                     pattern_rules, position_rules, group_start_rules, group_rules, group_count_config,
-                                    contains_rules, group_content_rules, group_position_rules, analyze_group_position, exclude_group_rules, exclude_position_rules, exclude_contains_rules, args.negate, args.and_mode)
+                                    contains_rules, group_content_rules, group_position_rules, analyze_group_position, exclude_group_rules, exclude_position_rules, exclude_contains_rules, args.negate, args.and_mode,
+                                    product_index=product_index)
     
     # Zeige Ergebnisse
-    print_results(results, args.details)
+    print_results(results, args.details, args.limit)
     
     # Exportiere Filter-Kriterien falls gewünscht
     if args.export_filter: